@@ -1,18 +1,52 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import joblib
-import io
-from gridfs import GridFS
+import os
+import time
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
 from bson import ObjectId
 
 from app.db.mongo import (
-    get_database,
     get_model_registry,
-    get_feature_store
+    get_registry_version
 )
+from app.db.indexes import ensure_indexes
+from app.pipelines.online_features import get_latest_features
+from app.pipelines.feature_spec import compile_spec, spec_from_doc, spec_id
+from app.utils.artifact_store import artifact_key, cache_stats, load_flat_model, load_model
+from app.utils.fast_predictor import FastPredictor, sample_rows
+from app.utils.multi_output import output_index
+from app.utils.tree_intervals import DEFAULT_COVERAGE, per_tree_predictions, prediction_interval
 
-app = FastAPI(title="Karachi AQI Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    # Background threads, defined with their sections below
+    start_index_bootstrap()
+    start_preload()
+    start_registry_watcher()
+    start_forecast_refresher()
+
+    yield
+
+
+app = FastAPI(title="Karachi AQI Backend", lifespan=lifespan)
+
+# Opt-in: load and warm every horizon before reporting ready
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "").lower() in ("1", "true", "yes")
+PRELOAD_RETRY_SECONDS = float(os.getenv("PRELOAD_RETRY_SECONDS", "15"))
+
+app_state = {
+    "ready": not PRELOAD_MODELS,
+    "preload_error": None
+}
 
 # ======================================================
 # HEALTH
@@ -21,7 +55,29 @@ app = FastAPI(title="Karachi AQI Backend")
 @app.get("/health")
 @app.head("/health")
 def health():
-    return {"status": "ok"}
+
+    if not app_state["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "starting",
+                "ready": False,
+                "error": app_state["preload_error"]
+            }
+        )
+
+    return {"status": "ok", "ready": True}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        **load_metrics,
+        **cache_stats(),
+        "predictors": {
+            str(horizon): entry[4].kind
+            for horizon, entry in models_cache.items()
+        }
+    }
 
 @app.get("/")
 def root():
@@ -31,48 +87,341 @@ def root():
     }
 
 # ======================================================
-# GLOBAL MODEL CACHE (LAZY LOAD ONLY)
+# GLOBAL MODEL CACHE
 # ======================================================
 
+HORIZONS = [1, 2, 3]
+
+# horizon -> (model, features, registry _id, output index, fast predictor)
+# Entries are replaced whole, never mutated, so readers
+# always see a consistent (model, features) pair.
+# Horizons served by one multi-output artifact share the
+# same model object; output index picks their column.
 models_cache = {}
 
 # ======================================================
-# LOAD PRODUCTION MODEL FROM GRIDFS
+# SINGLE-FLIGHT LOADING
 # ======================================================
+# Concurrent requests for the same artifact share one
+# download/unpickle instead of each running their own.
 
-def load_production_model(horizon: int):
+load_metrics = {
+    "model_loads": 0,
+    "model_loads_deduplicated": 0
+}
+
+inflight_loads = {}  # artifact key -> Future
+inflight_lock = threading.Lock()
+
+
+def load_model_once(doc):
+
+    key = artifact_key(doc)
+
+    with inflight_lock:
+        future = inflight_loads.get(key)
+        leader = future is None
+
+        if leader:
+            future = Future()
+            inflight_loads[key] = future
+            load_metrics["model_loads"] += 1
+        else:
+            load_metrics["model_loads_deduplicated"] += 1
+
+    if leader:
+        try:
+            future.set_result(load_model(doc))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with inflight_lock:
+                inflight_loads.pop(key, None)
+
+    return future.result()
+
+# ======================================================
+# LOAD PRODUCTION MODEL (MEMORY -> DISK -> GRIDFS)
+# ======================================================
+
+def find_production_doc(horizon: int):
 
     registry = get_model_registry()
-    db = get_database()
-    fs = GridFS(db)
 
-    doc = registry.find_one({
+    return registry.find_one({
         "horizon": horizon,
         "is_best": True
     })
 
+
+def load_production_model(horizon: int):
+
+    doc = find_production_doc(horizon)
+
     if not doc:
         raise HTTPException(status_code=404, detail="No production model found")
 
     if "gridfs_id" not in doc:
         raise HTTPException(status_code=500, detail="Model missing gridfs_id")
 
-    model_bytes = fs.get(doc["gridfs_id"]).read()
-    model = joblib.load(io.BytesIO(model_bytes))
+    model = load_model_once(doc)
 
     return model, doc["features"], doc
 
+
+def warm_up_model(model, features):
+
+    # First predict pays for sklearn/joblib setup; do it here
+    X = pd.DataFrame([[0.0] * len(features)], columns=features)
+    model.predict(X)
+
+
+def build_predictor(model, doc):
+    """
+    Single-row fast path, verified against model.predict on the
+    latest feature row (and jittered copies) before it serves.
+    """
+
+    features = doc["features"]
+
+    try:
+        flat = load_flat_model(doc)
+    except Exception as e:
+        print(f"⚠️ Flat artifact unavailable for {doc['_id']}: {e}")
+        flat = None
+
+    predictor = FastPredictor(model, features, flat)
+
+    try:
+        latest = get_latest_features(features) or {}
+    except Exception:
+        latest = {}
+
+    predictor.verify(sample_rows({col: latest.get(col, 0.0) for col in features}, features))
+
+    return predictor
+
+
+def install_model(horizon: int, model, doc):
+
+    trained_spec = spec_id(spec_from_doc(doc))
+    if trained_spec != compile_spec().id:
+        print(
+            f"⚠️ H{horizon} model was trained with feature spec {trained_spec}; "
+            f"the feature store is built with {compile_spec().id}"
+        )
+
+    warm_up_model(model, doc["features"])
+    predictor = build_predictor(model, doc)
+
+    models_cache[horizon] = (model, doc["features"], doc["_id"], output_index(doc), predictor)
+
+
+def get_cached_model(horizon: int):
+
+    # Lazy load
+    if horizon not in models_cache:
+        model, _, doc = load_production_model(horizon)
+        install_model(horizon, model, doc)
+
+    return models_cache[horizon]
+
 # ======================================================
-# GET LATEST FEATURE ROW
+# REGISTRY WATCHER (HOT RELOAD)
 # ======================================================
+# Promotions (select_best_model, train_all_models,
+# rollback_model, ...) are picked up from a change stream,
+# or by polling the registry version counter where change
+# streams are unavailable. New models are loaded and warmed
+# on this thread, then swapped into models_cache.
 
-def get_latest_feature_row(feature_columns):
+REGISTRY_POLL_SECONDS = float(os.getenv("REGISTRY_POLL_SECONDS", "10"))
+REGISTRY_RESYNC_SECONDS = float(os.getenv("REGISTRY_RESYNC_SECONDS", "300"))
 
-    feature_store = get_feature_store()
+sync_lock = threading.Lock()
 
-    latest_doc = feature_store.find_one(
-        sort=[("datetime", -1)]
-    )
+
+def sync_production_models():
+    """
+    Reload every horizon whose production model changed.
+    Returns the list of horizons that were swapped.
+    """
+
+    changed = []
+
+    with sync_lock:
+
+        for horizon in sorted(set(HORIZONS) | set(models_cache)):
+
+            doc = find_production_doc(horizon)
+
+            if not doc or "gridfs_id" not in doc:
+                continue
+
+            cached = models_cache.get(horizon)
+            if cached and cached[2] == doc["_id"]:
+                continue
+
+            model = load_model_once(doc)
+            install_model(horizon, model, doc)
+
+            print(f"🔁 Hot-reloaded model for H{horizon}: {doc['_id']}")
+            changed.append(horizon)
+
+    return changed
+
+
+def on_registry_change():
+
+    try:
+        if sync_production_models():
+            refresh_forecast_cache()
+    except Exception as e:
+        print(f"⚠️ Model hot reload failed: {e}")
+
+
+def watch_registry_changes():
+
+    registry = get_model_registry()
+
+    pipeline = [{
+        "$match": {
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }
+    }]
+
+    with registry.watch(pipeline) as stream:
+
+        # Catch anything promoted before the stream opened
+        on_registry_change()
+
+        for _ in stream:
+            on_registry_change()
+
+
+def poll_registry_version():
+
+    last_version = None
+    last_sync = 0.0
+
+    while True:
+
+        try:
+            version = get_registry_version()
+        except Exception as e:
+            print(f"⚠️ Registry version poll failed: {e}")
+            version = last_version
+
+        stale = time.monotonic() - last_sync > REGISTRY_RESYNC_SECONDS
+
+        if version != last_version or stale:
+            on_registry_change()
+            last_version = version
+            last_sync = time.monotonic()
+
+        time.sleep(REGISTRY_POLL_SECONDS)
+
+
+def registry_watch_loop():
+
+    try:
+        watch_registry_changes()
+    except Exception as e:
+        print(f"⚠️ Change stream unavailable ({e}), polling registry version")
+
+    poll_registry_version()
+
+
+# ======================================================
+# STARTUP INDEX BOOTSTRAP
+# ======================================================
+# Indexes are created by `python -m app.db.indexes` in the
+# feature pipeline workflow. Workers only do it when asked,
+# and never on the startup path.
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "").lower() in ("1", "true", "yes")
+
+
+def bootstrap_indexes():
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ Index bootstrap failed: {e}")
+
+
+def start_index_bootstrap():
+
+    if not ENSURE_INDEXES_ON_STARTUP:
+        return
+
+    threading.Thread(
+        target=bootstrap_indexes,
+        name="index-bootstrap",
+        daemon=True
+    ).start()
+
+# ======================================================
+# STARTUP PRELOAD
+# ======================================================
+
+def preload_models():
+
+    started = time.monotonic()
+
+    # Hold the sync lock so the registry watcher doesn't
+    # load the same artifacts in parallel
+    with sync_lock:
+        with ThreadPoolExecutor(max_workers=len(HORIZONS)) as pool:
+            list(pool.map(get_cached_model, HORIZONS))
+
+    refresh_forecast_cache()
+
+    print(f"✅ Preloaded {len(HORIZONS)} models in {time.monotonic() - started:.1f}s")
+
+
+def preload_loop():
+
+    while True:
+        try:
+            preload_models()
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            app_state["preload_error"] = detail
+            print(f"⚠️ Model preload failed: {detail}")
+            time.sleep(PRELOAD_RETRY_SECONDS)
+            continue
+
+        app_state["preload_error"] = None
+        app_state["ready"] = True
+        return
+
+
+def start_preload():
+
+    if not PRELOAD_MODELS:
+        return
+
+    threading.Thread(
+        target=preload_loop,
+        name="model-preload",
+        daemon=True
+    ).start()
+
+
+def start_registry_watcher():
+    threading.Thread(
+        target=registry_watch_loop,
+        name="registry-watcher",
+        daemon=True
+    ).start()
+
+# ======================================================
+# GET LATEST FEATURE ROW (ONLINE FEATURE STORE)
+# ======================================================
+
+def get_latest_feature_doc(feature_columns=None):
+
+    latest_doc = get_latest_features(feature_columns)
 
     if not latest_doc:
         raise HTTPException(
@@ -80,6 +429,11 @@ def get_latest_feature_row(feature_columns):
             detail="Feature store empty. Run training first."
         )
 
+    return latest_doc
+
+
+def build_feature_values(latest_doc, feature_columns):
+
     row_dict = {}
 
     for col in feature_columns:
@@ -90,28 +444,89 @@ def get_latest_feature_row(feature_columns):
             )
         row_dict[col] = latest_doc[col]
 
-    return pd.DataFrame([row_dict])
+    return row_dict
+
 
 # ======================================================
-# FORECAST ENDPOINT
+# FORECAST CACHE
 # ======================================================
+# The forecast only changes when a new feature row lands,
+# a model is promoted or the UTC date rolls over. A
+# background thread watches that key and recomputes; the
+# endpoint just returns the last payload.
+
+FORECAST_REFRESH_SECONDS = float(os.getenv("FORECAST_REFRESH_SECONDS", "60"))
+
+# {"key": ..., "payload": ..., "computed_at": ...}, swapped as a whole
+forecast_cache = None
+forecast_lock = threading.Lock()
 
-@app.get("/forecast")
-def forecast():
+
+def get_forecast_cache_key():
+
+    registry = get_model_registry()
+
+    latest = get_latest_features([])
+
+    docs = list(registry.find(
+        {"horizon": {"$in": HORIZONS}, "is_best": True},
+        {"horizon": 1, "conformal_updated_at": 1}
+    ).sort("horizon", 1))
+
+    model_ids = tuple((doc["horizon"], str(doc["_id"])) for doc in docs)
+
+    # Interval forecasts also change when a conformal buffer grows
+    calibrations = tuple(doc.get("conformal_updated_at") for doc in docs)
+
+    return (
+        latest["datetime"] if latest else None,
+        model_ids,
+        datetime.utcnow().date(),
+        calibrations
+    )
+
+
+def serving_entries(model_ids):
+    """Cached model entries per horizon, synced to the key's model ids."""
+
+    # Make sure the models in the key are the ones serving
+    served = {h: str(entry[2]) for h, entry in models_cache.items()}
+    if any(served.get(h) != model_id for h, model_id in model_ids):
+        sync_production_models()
+
+    return {horizon: get_cached_model(horizon) for horizon in HORIZONS}
+
+
+def latest_doc_for(entries):
+
+    columns = sorted({col for _, features, *_ in entries.values() for col in features})
+
+    return get_latest_feature_doc(columns)
+
+
+def compute_forecast(model_ids, entries=None, latest_doc=None):
+
+    if entries is None:
+        entries = serving_entries(model_ids)
+
+    if latest_doc is None:
+        latest_doc = latest_doc_for(entries)
+
+    # One predict per distinct model: a multi-output artifact
+    # yields every horizon it serves from a single call
+    outputs = {}
 
     results = {}
 
-    for horizon in [1, 2, 3]:
+    for horizon in HORIZONS:
 
-        # Lazy load
-        if horizon not in models_cache:
-            model, features, _ = load_production_model(horizon)
-            models_cache[horizon] = (model, features)
+        model, features, _, index, predictor = entries[horizon]
 
-        model, features = models_cache[horizon]
+        key = (id(model), tuple(features))
+        if key not in outputs:
+            outputs[key] = predictor.predict_outputs(build_feature_values(latest_doc, features))
 
-        X = get_latest_feature_row(features)
-        prediction = float(model.predict(X)[0])
+        prediction = float(outputs[key][index or 0])
 
         future_date = (
             datetime.utcnow() + timedelta(days=horizon)
@@ -124,6 +539,170 @@ def forecast():
 
     return results
 
+
+def compute_interval_forecast(key, coverage):
+    """
+    Forecast with lower / upper bounds from the forests' per-tree
+    predictions, calibrated by each model's conformal buffer.
+    Horizons served by other models get null bounds.
+    Point values come from the forecast cache when it holds `key`.
+    """
+
+    entries = serving_entries(key[1])
+    latest_doc = latest_doc_for(entries)
+
+    cache = forecast_cache
+    if cache and cache["key"] == key:
+        point = cache["payload"]
+    else:
+        point = compute_forecast(key[1], entries, latest_doc)
+
+    # Copies: the cached point payload is served as-is
+    results = {day: dict(entry) for day, entry in point.items()}
+
+    scores = {
+        doc["_id"]: doc.get("conformal_scores")
+        for doc in get_model_registry().find(
+            {"_id": {"$in": [entry[2] for entry in entries.values()]}},
+            {"conformal_scores": 1}
+        )
+    }
+
+    for horizon in HORIZONS:
+
+        model, features, model_id, index, predictor = entries[horizon]
+
+        values = build_feature_values(latest_doc, features)
+        X = [[np.nan if values[col] is None else values[col] for col in features]]
+
+        try:
+            per_tree = per_tree_predictions(model, X, flat=predictor.flat, output_index=index)
+        except RuntimeError as e:
+            # Not a forest (Ridge, XGBoost, chain): point value only
+            print(f"⚠️ H{horizon}: no interval: {e}")
+            results[f"{horizon}_day"].update({
+                "lower": None,
+                "upper": None,
+                "coverage": coverage,
+                "calibrated": False
+            })
+            continue
+
+        _, lower, upper, calibrated = prediction_interval(
+            per_tree, coverage, scores.get(model_id)
+        )
+
+        results[f"{horizon}_day"].update({
+            "lower": round(float(lower[0]), 2),
+            "upper": round(float(upper[0]), 2),
+            "coverage": coverage,
+            "calibrated": calibrated
+        })
+
+    return results
+
+
+def refresh_forecast_cache():
+
+    global forecast_cache
+
+    key = get_forecast_cache_key()
+
+    cache = forecast_cache
+    if cache and cache["key"] == key:
+        return cache["payload"]
+
+    with forecast_lock:
+
+        cache = forecast_cache
+        if cache and cache["key"] == key:
+            return cache["payload"]
+
+        payload = compute_forecast(key[1])
+
+        forecast_cache = {
+            "key": key,
+            "payload": payload,
+            "computed_at": datetime.utcnow()
+        }
+
+    return payload
+
+
+def forecast_refresh_loop():
+
+    while True:
+        try:
+            refresh_forecast_cache()
+        except Exception as e:
+            print(f"⚠️ Forecast cache refresh failed: {e}")
+
+        time.sleep(FORECAST_REFRESH_SECONDS)
+
+
+def start_forecast_refresher():
+    threading.Thread(
+        target=forecast_refresh_loop,
+        name="forecast-cache",
+        daemon=True
+    ).start()
+
+# ======================================================
+# FORECAST ENDPOINT
+# ======================================================
+
+# Requested coverages are rounded to this many decimals
+COVERAGE_DECIMALS = 2
+
+# Interval payloads per coverage, for the current cache key
+interval_cache = {"key": None, "payloads": {}}
+interval_lock = threading.Lock()
+
+
+def get_interval_forecast(coverage):
+
+    global interval_cache
+
+    key = get_forecast_cache_key()
+
+    cache = interval_cache
+    if cache["key"] == key and coverage in cache["payloads"]:
+        return cache["payloads"][coverage]
+
+    with interval_lock:
+
+        cache = interval_cache
+        if cache["key"] != key:
+            cache = {"key": key, "payloads": {}}
+
+        if coverage not in cache["payloads"]:
+            payloads = dict(cache["payloads"])
+            payloads[coverage] = compute_interval_forecast(key, coverage)
+            cache = {"key": key, "payloads": payloads}
+
+        interval_cache = cache
+
+    return cache["payloads"][coverage]
+
+
+@app.get("/forecast")
+def forecast(interval: bool = False, coverage: float = DEFAULT_COVERAGE):
+
+    if interval:
+        # Quantized, so the per-coverage interval cache stays bounded
+        coverage = round(coverage, COVERAGE_DECIMALS)
+        if not 0 < coverage < 1:
+            raise HTTPException(status_code=422, detail="coverage must be between 0 and 1")
+        return get_interval_forecast(coverage)
+
+    cache = forecast_cache
+
+    if cache is not None:
+        return cache["payload"]
+
+    # Cold cache: compute once on the request path
+    return refresh_forecast_cache()
+
 # ======================================================
 # BEST PRODUCTION MODEL
 # ======================================================
@@ -133,7 +712,8 @@ def best_model():
 
     registry = get_model_registry()
 
-    doc = registry.find_one({"is_best": True})
+    # The conformal buffer is thousands of floats the UI never shows
+    doc = registry.find_one({"is_best": True}, {"conformal_scores": 0})
 
     if not doc:
         return {
@@ -142,10 +722,9 @@ def best_model():
         }
 
     # Convert ObjectId safely
-    doc["_id"] = str(doc["_id"])
-
-    if "gridfs_id" in doc:
-        doc["gridfs_id"] = str(doc["gridfs_id"])
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            doc[key] = str(value)
 
     return {
         "status": "success",
@@ -159,12 +738,7 @@ def best_model():
 @app.get("/features/importance")
 def feature_importance(horizon: int = 1):
 
-    # Lazy load model
-    if horizon not in models_cache:
-        model, features, _ = load_production_model(horizon)
-        models_cache[horizon] = (model, features)
-
-    model, features = models_cache[horizon]
+    model, features, *_ = get_cached_model(horizon)
 
     if not hasattr(model, "feature_importances_"):
         return {
@@ -183,4 +757,79 @@ def feature_importance(horizon: int = 1):
     return {
         "status": "success",
         "features": data
-    }
\ No newline at end of file
+    }
+
+# ======================================================
+# DASHBOARD (ONE ROUND TRIP, ETAG)
+# ======================================================
+# Forecast, best model and feature importance in one payload.
+# Everything in it changes only with the forecast cache key
+# (feature watermark, model ids, date, calibration), so the
+# key is the ETag: a matching If-None-Match gets a 304 without
+# touching MongoDB or the models.
+
+DASHBOARD_IMPORTANCE_HORIZON = int(os.getenv("DASHBOARD_IMPORTANCE_HORIZON", "1"))
+
+# {"key": ..., "etag": ..., "payload": ...}, swapped as a whole
+dashboard_cache = None
+dashboard_lock = threading.Lock()
+
+
+def dashboard_etag(key):
+    return '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def build_dashboard(cache):
+
+    return {
+        "forecast": cache["payload"],
+        "best_model": jsonable_encoder(best_model()),
+        "feature_importance": feature_importance(DASHBOARD_IMPORTANCE_HORIZON)
+    }
+
+
+@app.get("/dashboard")
+def dashboard(request: Request):
+
+    global dashboard_cache
+
+    cache = forecast_cache
+
+    if cache is None:
+        refresh_forecast_cache()
+        cache = forecast_cache
+
+    etag = dashboard_etag(cache["key"])
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    current = dashboard_cache
+
+    if current is None or current["etag"] != etag:
+
+        with dashboard_lock:
+
+            current = dashboard_cache
+
+            if current is None or current["etag"] != etag:
+                current = {
+                    "key": cache["key"],
+                    "etag": etag,
+                    "payload": build_dashboard(cache)
+                }
+                dashboard_cache = current
+
+    return JSONResponse(current["payload"], headers=headers)
+
@@ -0,0 +1,174 @@
+"""
+Columnar History Loader
+-----------------------
+- Streams raw BSON batches from historical_hourly_data
+- Decodes each batch straight into typed NumPy columns
+- Supports a datetime range and a column projection
+
+Avoids materializing a dict per hour for the whole history
+before pandas copies it again. Uses pymongoarrow when it is
+installed, otherwise decodes batches in-process.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from bson import decode_all
+from bson.codec_options import CodecOptions, DatetimeConversion
+from bson.datetime_ms import DatetimeMS
+
+from app.db.mongo import get_db
+
+try:
+    from pymongoarrow.api import Schema, find_pandas_all
+    import pyarrow as pa
+except ImportError:  # optional fast path
+    find_pandas_all = None
+
+
+HISTORY_COLLECTION = "historical_hourly_data"
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "10000"))
+
+# Open-Meteo hourly variables we ingest
+HISTORY_SCHEMA = {
+    "datetime": "datetime64[ms]",
+    "pm2_5": "float64",
+    "pm10": "float64",
+    "carbon_monoxide": "float64",
+    "nitrogen_dioxide": "float64",
+    "sulphur_dioxide": "float64",
+    "ozone": "float64",
+    "temperature_2m": "float64",
+    "relativehumidity_2m": "float64",
+    "windspeed_10m": "float64",
+}
+
+_CODEC = CodecOptions(datetime_conversion=DatetimeConversion.DATETIME_MS)
+
+
+def _datetime_ms(value):
+    if value is None:
+        return np.iinfo(np.int64).min  # NaT
+    if isinstance(value, DatetimeMS):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+def _range_query(start=None, end=None):
+    query = {}
+    if start is not None:
+        query.setdefault("datetime", {})["$gte"] = start
+    if end is not None:
+        query.setdefault("datetime", {})["$lte"] = end
+    return query
+
+
+def _load_with_arrow(collection, query, schema):
+
+    arrow_types = {
+        col: pa.timestamp("ms") if dtype.startswith("datetime") else pa.float64()
+        for col, dtype in schema.items()
+    }
+
+    df = find_pandas_all(
+        collection,
+        query,
+        schema=Schema(arrow_types),
+        sort=[("datetime", 1)]
+    )
+
+    return df.dropna(axis=1, how="all")
+
+
+def _load_with_raw_batches(collection, query, schema, batch_size):
+
+    projection = {col: 1 for col in schema}
+    projection["_id"] = 0
+
+    # Preallocate from an (indexed) count; grow if rows arrive meanwhile
+    capacity = collection.count_documents(query)
+    columns = {
+        col: np.empty(capacity, dtype="int64" if dtype.startswith("datetime") else dtype)
+        for col, dtype in schema.items()
+    }
+    seen = {col: False for col in schema}
+    n = 0
+
+    cursor = collection.find_raw_batches(
+        query,
+        projection,
+        sort=[("datetime", 1)],
+        batch_size=batch_size
+    )
+
+    for raw_batch in cursor:
+
+        docs = decode_all(raw_batch, _CODEC)
+        size = len(docs)
+
+        if n + size > capacity:
+            capacity = max(n + size, capacity * 2)
+            for col in columns:
+                columns[col] = np.resize(columns[col], capacity)
+
+        for col, dtype in schema.items():
+
+            values = [doc.get(col) for doc in docs]
+
+            if not seen[col]:
+                seen[col] = any(v is not None for v in values)
+
+            if dtype.startswith("datetime"):
+                columns[col][n:n + size] = [_datetime_ms(v) for v in values]
+            else:
+                columns[col][n:n + size] = np.array(values, dtype=dtype)
+
+        n += size
+
+    data = {}
+
+    for col, dtype in schema.items():
+        if not seen[col]:
+            continue  # field absent from this history
+        if dtype.startswith("datetime"):
+            data[col] = columns[col][:n].view(dtype)
+        else:
+            data[col] = columns[col][:n]
+
+    return pd.DataFrame(data, copy=False)
+
+
+def load_history_frame(start=None, end=None, columns=None, batch_size=HISTORY_BATCH_SIZE):
+    """
+    Load historical_hourly_data as a typed DataFrame sorted by datetime.
+
+    start / end : inclusive datetime bounds (either may be None)
+    columns     : subset of HISTORY_SCHEMA to load ("datetime" always included)
+
+    Columns that no document carries are left out.
+    """
+
+    schema = HISTORY_SCHEMA
+    if columns is not None:
+        unknown = set(columns) - set(HISTORY_SCHEMA)
+        if unknown:
+            raise ValueError(f"Unknown history columns: {sorted(unknown)}")
+        schema = {
+            col: dtype
+            for col, dtype in HISTORY_SCHEMA.items()
+            if col == "datetime" or col in columns
+        }
+
+    collection = get_db()[HISTORY_COLLECTION]
+    query = _range_query(start, end)
+
+    if find_pandas_all is not None:
+        df = _load_with_arrow(collection, query, schema)
+    else:
+        df = _load_with_raw_batches(collection, query, schema, batch_size)
+
+    if "datetime" in df.columns:
+        df["datetime"] = df["datetime"].astype("datetime64[ns]")
+
+    return df
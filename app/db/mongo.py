@@ -45,5 +45,48 @@ def get_feature_store():
     return db["feature_store"]
 
 
+def get_online_feature_store():
+    return db["online_features"]
+
+
+def get_feature_state_store():
+    return db["feature_state"]
+
+
 def get_daily_forecast():
     return db["daily_forecast"]
+
+
+def get_registry_meta():
+    return db["registry_meta"]
+
+
+def get_backfill_checkpoints():
+    return db["backfill_checkpoints"]
+
+
+# -----------------------------------------
+# Registry Version Counter
+# -----------------------------------------
+# Bumped whenever production models change so API workers
+# without change streams can poll a single document.
+REGISTRY_VERSION_ID = "model_registry"
+
+
+def bump_registry_version():
+    get_registry_meta().update_one(
+        {"_id": REGISTRY_VERSION_ID},
+        {
+            "$inc": {"version": 1},
+            "$currentDate": {"updated_at": True}
+        },
+        upsert=True
+    )
+
+
+def get_registry_version():
+    doc = get_registry_meta().find_one(
+        {"_id": REGISTRY_VERSION_ID},
+        {"version": 1}
+    )
+    return doc["version"] if doc else 0
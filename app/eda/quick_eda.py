@@ -1,16 +1,12 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from app.db.mongo import get_db
+from app.db.history_loader import load_history_frame
 
 
 def run_eda():
 
-    db = get_db()
-    data = list(db["historical_hourly_data"].find({}, {"_id": 0}))
-    df = pd.DataFrame(data)
-
-    df["datetime"] = pd.to_datetime(df["datetime"])
+    df = load_history_frame()
     df = df.sort_values("datetime")
 
     print("Shape:", df.shape)
@@ -1,41 +1,201 @@
+"""
+EPA AQI Engine
+--------------
+- Breakpoint tables for PM2.5, PM10, O3, NO2, SO2 and CO
+- Open-Meteo concentrations (μg/m³) converted to the EPA units
+  (ppm / ppb at 25 °C) and truncated to the table precision
+- np.searchsorted picks each value's breakpoint row, so whole
+  columns are indexed at once
+- Overall AQI = max sub-index; the dominant pollutant is its argmax
+
+Values outside a table's range give NaN (no sub-index).
+"""
+
+import numpy as np
 import pandas as pd
-from app.pipelines.fetch_karachi_aqi import fetch_karachi_air_quality
 
 
-def calculate_aqi_pm25(pm25: float) -> int:
-    """
-    EPA AQI calculation for PM2.5
-    """
-    breakpoints = [
+# =====================================================
+# BREAKPOINT TABLES
+# =====================================================
+# (c_low, c_high, i_low, i_high) in EPA units
+BREAKPOINTS = {
+    "pm2_5": [  # μg/m³, 24-hour
         (0.0, 12.0, 0, 50),
         (12.1, 35.4, 51, 100),
         (35.5, 55.4, 101, 150),
         (55.5, 150.4, 151, 200),
         (150.5, 250.4, 201, 300),
         (250.5, 500.4, 301, 500),
-    ]
+    ],
+    "pm10": [  # μg/m³, 24-hour
+        (0, 54, 0, 50),
+        (55, 154, 51, 100),
+        (155, 254, 101, 150),
+        (255, 354, 151, 200),
+        (355, 424, 201, 300),
+        (425, 604, 301, 500),
+    ],
+    "ozone": [  # ppm, 8-hour
+        (0.000, 0.054, 0, 50),
+        (0.055, 0.070, 51, 100),
+        (0.071, 0.085, 101, 150),
+        (0.086, 0.105, 151, 200),
+        (0.106, 0.200, 201, 300),
+    ],
+    "nitrogen_dioxide": [  # ppb, 1-hour
+        (0, 53, 0, 50),
+        (54, 100, 51, 100),
+        (101, 360, 101, 150),
+        (361, 649, 151, 200),
+        (650, 1249, 201, 300),
+        (1250, 2049, 301, 500),
+    ],
+    "sulphur_dioxide": [  # ppb, 1-hour
+        (0, 35, 0, 50),
+        (36, 75, 51, 100),
+        (76, 185, 101, 150),
+        (186, 304, 151, 200),
+        (305, 604, 201, 300),
+        (605, 1004, 301, 500),
+    ],
+    "carbon_monoxide": [  # ppm, 8-hour
+        (0.0, 4.4, 0, 50),
+        (4.5, 9.4, 51, 100),
+        (9.5, 12.4, 101, 150),
+        (12.5, 15.4, 151, 200),
+        (15.5, 30.4, 201, 300),
+        (30.5, 50.4, 301, 500),
+    ],
+}
+
+# μg/m³ -> table unit: ppb = μg/m³ * 24.45 / molar mass (25 °C, 1 atm)
+UNIT_FACTORS = {
+    "pm2_5": 1.0,
+    "pm10": 1.0,
+    "ozone": 24.45 / 48.00 / 1000,
+    "nitrogen_dioxide": 24.45 / 46.01,
+    "sulphur_dioxide": 24.45 / 64.07,
+    "carbon_monoxide": 24.45 / 28.01 / 1000,
+}
+
+# EPA truncation precision (decimal places) per table
+DECIMALS = {
+    "pm2_5": 1,
+    "pm10": 0,
+    "ozone": 3,
+    "nitrogen_dioxide": 0,
+    "sulphur_dioxide": 0,
+    "carbon_monoxide": 1,
+}
+
+# source column -> sub-index column
+SUB_INDEX_COLUMNS = {
+    "pm2_5": "aqi_pm25",
+    "pm10": "aqi_pm10",
+    "ozone": "aqi_o3",
+    "nitrogen_dioxide": "aqi_no2",
+    "sulphur_dioxide": "aqi_so2",
+    "carbon_monoxide": "aqi_co",
+}
+
+_TABLES = {
+    pollutant: np.array(rows, dtype=np.float64).T
+    for pollutant, rows in BREAKPOINTS.items()
+}
+
+
+# =====================================================
+# VECTORIZED ENGINE
+# =====================================================
+def truncate_concentration(pollutant, values):
+    """EPA unit conversion + truncation to the table precision."""
+
+    scale = 10.0 ** DECIMALS[pollutant]
+    values = np.asarray(values, dtype=np.float64) * UNIT_FACTORS[pollutant]
+
+    # the epsilon keeps e.g. 12.1 (stored as 12.0999...) at 12.1
+    return np.floor(values * scale + 1e-9) / scale
+
+
+def sub_index(pollutant, values):
+    """
+    AQI sub-index for an array of concentrations (μg/m³).
+    NaN where the value is missing or outside the table.
+    """
+
+    c_low, c_high, i_low, i_high = _TABLES[pollutant]
+    conc = truncate_concentration(pollutant, values)
+
+    row = np.searchsorted(c_low, conc, side="right") - 1
+    valid = (row >= 0) & (conc <= c_high[np.clip(row, 0, None)])
+    row = np.where(valid, row, 0)
+
+    aqi = (
+        (i_high[row] - i_low[row]) / (c_high[row] - c_low[row])
+        * (conc - c_low[row])
+        + i_low[row]
+    )
+
+    return np.where(valid, np.round(aqi), np.nan)
 
-    for c_low, c_high, i_low, i_high in breakpoints:
-        if c_low <= pm25 <= c_high:
-            return round(
-                ((i_high - i_low) / (c_high - c_low))
-                * (pm25 - c_low)
-                + i_low
-            )
 
-    return None
+def compute_aqi(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sub-indices for every pollutant column present, the overall
+    AQI and the dominant pollutant, as a frame aligned with df.
+    """
+
+    pollutants = [p for p in BREAKPOINTS if p in df.columns]
+
+    out = pd.DataFrame(index=df.index)
+
+    if not pollutants:
+        return out
+
+    sub = np.column_stack([sub_index(p, df[p].to_numpy()) for p in pollutants])
+
+    for i, pollutant in enumerate(pollutants):
+        out[SUB_INDEX_COLUMNS[pollutant]] = sub[:, i]
+
+    filled = np.where(np.isnan(sub), -np.inf, sub)
+    dominant = np.argmax(filled, axis=1)
+    has_any = np.isfinite(filled).any(axis=1)
+
+    out["aqi"] = np.where(has_any, filled.max(axis=1), np.nan)
+    out["dominant_pollutant"] = np.where(has_any, np.array(pollutants, dtype=object)[dominant], None)
+
+    return out
+
+
+def calculate_aqi_pm25(pm25: float) -> int:
+    """
+    EPA AQI calculation for PM2.5
+    """
+
+    aqi = sub_index("pm2_5", [np.nan if pm25 is None else pm25])[0]
+
+    return None if np.isnan(aqi) else int(aqi)
 
 
 def add_aqi_column(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
-    df["aqi_pm25"] = df["pm2_5"].apply(calculate_aqi_pm25)
+
+    aqi = compute_aqi(df)
+
+    for col in aqi.columns:
+        df[col] = aqi[col]
+
     return df
 
 
 if __name__ == "__main__":
-    df = fetch_karachi_air_quality()
+    from app.db.history_loader import load_history_frame
+
+    df = load_history_frame()
     df = add_aqi_column(df)
 
-    print(df[["pm2_5", "aqi_pm25", "timestamp"]].head())
+    print(df[["datetime", "pm2_5", "aqi_pm25", "aqi", "dominant_pollutant"]].head())
     print("\nAQI stats:")
-    print(df["aqi_pm25"].describe())
\ No newline at end of file
+    print(df["aqi"].describe())
+    print(df["dominant_pollutant"].value_counts())
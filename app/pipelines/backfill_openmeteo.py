@@ -0,0 +1,311 @@
+"""
+Historical Backfill (Open-Meteo)
+--------------------------------
+- Splits [start_date, end_date] into fixed-size day chunks
+- Fetches chunks concurrently with a bounded worker pool
+- Retries 429 / 5xx / connection errors with exponential backoff
+  and reuses cached archive chunks (app.utils.openmeteo_client)
+- Upserts each chunk by datetime as soon as it arrives
+- Checkpoints completed chunks so an interrupted run resumes
+
+historical_hourly_data is never emptied: rows are only upserted.
+
+CLI:
+    python -m app.pipelines.backfill_openmeteo --days 365
+    python -m app.pipelines.backfill_openmeteo --start 2024-01-01 --end 2025-01-01
+"""
+
+import os
+import re
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, date
+
+from pymongo import UpdateOne
+
+from app.db.mongo import get_db, get_backfill_checkpoints
+from app.utils.openmeteo_client import AIR_QUALITY_URL, ARCHIVE_SETTLE_DAYS, fetch_hourly
+
+
+# =====================================================
+# SETTINGS
+# =====================================================
+LATITUDE = 24.8607
+LONGITUDE = 67.0011
+TIMEZONE = "Asia/Karachi"
+
+HOURLY_VARIABLES = [
+    "pm2_5",
+    "pm10",
+    "carbon_monoxide",
+    "nitrogen_dioxide",
+    "sulphur_dioxide",
+    "ozone",
+]
+
+COLLECTION = "historical_hourly_data"
+
+CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", "10"))
+WORKERS = int(os.getenv("BACKFILL_WORKERS", "8"))
+MAX_RETRIES = int(os.getenv("BACKFILL_MAX_RETRIES", "5"))
+
+BULK_BATCH_SIZE = 1000
+
+# Chunk boundaries are multiples of chunk_days from this date
+CHUNK_EPOCH = date(1970, 1, 1)
+
+
+# =====================================================
+# CHUNK PLANNING
+# =====================================================
+def plan_chunks(start_date, end_date, chunk_days=CHUNK_DAYS):
+    """
+    Inclusive, non-overlapping (start, end) date pairs covering
+    start_date..end_date.
+
+    Chunks are aligned to CHUNK_EPOCH + k * chunk_days, so the same
+    days always fall in the same chunk (and checkpoint) whatever the
+    requested start: a rolling `--days` window resumes on later days.
+    Only the first chunk (cut at start_date) and the last one (cut
+    at end_date) can be shorter than chunk_days.
+    """
+
+    offset = (start_date - CHUNK_EPOCH).days % chunk_days
+
+    chunks = []
+    boundary = start_date - timedelta(days=offset)
+
+    while boundary <= end_date:
+        chunk_end = min(boundary + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((max(boundary, start_date), chunk_end))
+        boundary = boundary + timedelta(days=chunk_days)
+
+    return chunks
+
+
+def _checkpoint_prefix(base_url):
+    return f"{base_url}|{LATITUDE},{LONGITUDE}|{','.join(HOURLY_VARIABLES)}|"
+
+
+def _checkpoint_id(base_url, chunk):
+    start, end = chunk
+    return f"{_checkpoint_prefix(base_url)}{start}|{end}"
+
+
+def _completed_chunks(base_url, chunks):
+
+    checkpoints = get_backfill_checkpoints()
+    ids = [_checkpoint_id(base_url, chunk) for chunk in chunks]
+
+    done = {
+        doc["_id"]
+        for doc in checkpoints.find({"_id": {"$in": ids}}, {"_id": 1})
+    }
+
+    completed = {chunk for chunk, _id in zip(chunks, ids) if _id in done}
+
+    # A cut first chunk is also done if an earlier run's (longer)
+    # first chunk covered it
+    if chunks and chunks[0] not in completed:
+        start, end = chunks[0]
+        covering = checkpoints.find_one({
+            "_id": {"$regex": f"^{re.escape(_checkpoint_prefix(base_url))}"},
+            "start_date": {"$lte": str(start)},
+            "end_date": {"$gte": str(end)},
+        })
+        if covering:
+            completed.add(chunks[0])
+
+    return completed
+
+
+def _mark_completed(base_url, chunk, rows):
+
+    start, end = chunk
+
+    get_backfill_checkpoints().update_one(
+        {"_id": _checkpoint_id(base_url, chunk)},
+        {"$set": {
+            "collection": COLLECTION,
+            "start_date": str(start),
+            "end_date": str(end),
+            "rows": rows,
+            "completed_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+# =====================================================
+# FETCH
+# =====================================================
+def fetch_chunk(chunk, base_url=AIR_QUALITY_URL, max_retries=MAX_RETRIES):
+    """
+    Hourly rows for one chunk as a DataFrame. Raises if the API
+    returned no hourly block or after max_retries failures.
+    """
+
+    start, end = chunk
+
+    params = {
+        "latitude": LATITUDE,
+        "longitude": LONGITUDE,
+        "start_date": str(start),
+        "end_date": str(end),
+        "hourly": ",".join(HOURLY_VARIABLES),
+        "timezone": TIMEZONE,
+    }
+
+    df = fetch_hourly(base_url, params, max_retries=max_retries)
+
+    if df.empty:
+        print(f"⚠️ No hourly data returned for {start} → {end}")
+
+    return df
+
+
+# =====================================================
+# WRITE
+# =====================================================
+def upsert_chunk(df, collection_name=COLLECTION):
+    """Upsert rows keyed by datetime. Returns rows written."""
+
+    if df.empty:
+        return 0
+
+    collection = get_db()[collection_name]
+    records = df.to_dict("records")
+
+    for start in range(0, len(records), BULK_BATCH_SIZE):
+        ops = [
+            UpdateOne(
+                {"datetime": record["datetime"]},
+                {"$set": record},
+                upsert=True
+            )
+            for record in records[start:start + BULK_BATCH_SIZE]
+        ]
+        collection.bulk_write(ops, ordered=False)
+
+    return len(records)
+
+
+# =====================================================
+# BACKFILL
+# =====================================================
+def backfill(
+    start_date,
+    end_date,
+    base_url=AIR_QUALITY_URL,
+    workers=WORKERS,
+    chunk_days=CHUNK_DAYS,
+    max_retries=MAX_RETRIES,
+    resume=True
+):
+    """
+    Backfill start_date..end_date (inclusive) into historical_hourly_data.
+    Completed chunks are skipped when resume=True. Chunks that still
+    fail after retries are reported together at the end; everything
+    else is already written and checkpointed, so a rerun only fetches
+    what is missing.
+    """
+
+    chunks = plan_chunks(start_date, end_date, chunk_days)
+    pending = chunks
+
+    if resume:
+        done = _completed_chunks(base_url, chunks)
+        pending = [chunk for chunk in chunks if chunk not in done]
+        if done:
+            print(f"⏭️ {len(done)} of {len(chunks)} chunks already backfilled")
+
+    # Chunks the archive may still revise are re-fetched on every
+    # run instead of checkpointed (same window as the client cache)
+    recent_cutoff = datetime.utcnow().date() - timedelta(days=ARCHIVE_SETTLE_DAYS)
+
+    print(
+        f"📥 Backfilling {start_date} → {end_date}: "
+        f"{len(pending)} chunks, {workers} workers"
+    )
+
+    started = time.perf_counter()
+    total_rows = 0
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+
+        futures = {
+            pool.submit(fetch_chunk, chunk, base_url, max_retries): chunk
+            for chunk in pending
+        }
+
+        for future in as_completed(futures):
+
+            chunk = futures[future]
+
+            try:
+                rows = upsert_chunk(future.result())
+            except Exception as e:
+                failed[chunk] = str(e)
+                print(f"❌ {e}")
+                continue
+
+            total_rows += rows
+
+            if chunk[1] < recent_cutoff:
+                _mark_completed(base_url, chunk, rows)
+
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"✅ Backfill wrote {total_rows} rows from "
+        f"{len(pending) - len(failed)} chunks in {elapsed:.1f}s"
+    )
+
+    if failed:
+        summary = ", ".join(f"{s} → {e}" for s, e in sorted(failed))
+        raise RuntimeError(
+            f"{len(failed)} chunks failed ({summary}); "
+            "rerun to resume from the checkpoint"
+        )
+
+    return total_rows
+
+
+def backfill_days(days, **kwargs):
+
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days)
+
+    return backfill(start_date, end_date, **kwargs)
+
+
+# =====================================================
+# CLI
+# =====================================================
+def _parse_date(value):
+    return date.fromisoformat(value)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Backfill historical air-quality data")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", type=_parse_date)
+    parser.add_argument("--end", type=_parse_date)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+
+    options = {
+        "workers": args.workers,
+        "chunk_days": args.chunk_days,
+        "resume": not args.no_resume,
+    }
+
+    if args.start:
+        backfill(args.start, args.end or datetime.utcnow().date(), **options)
+    else:
+        backfill_days(args.days, **options)
@@ -0,0 +1,289 @@
+"""
+Walk-Forward Backtesting
+------------------------
+- Rolling-origin folds (expanding or sliding training window)
+- Fold indices + feature matrix built once and cached on disk,
+  keyed by the history watermark, feature spec and fold settings
+- Refits any registry model / candidate on every fold in parallel
+- Persists per-fold RMSE / MAE on the registry document
+
+select_best_model ranks on backtest.rmse_mean when every candidate
+was backtested on the same data and folds.
+"""
+
+import os
+import hashlib
+from datetime import datetime
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from threadpoolctl import threadpool_limits
+
+from app.db.mongo import get_db, get_model_registry
+from app.db.history_loader import HISTORY_COLLECTION
+from app.pipelines.feature_spec import FEATURE_SPEC, spec_id
+from app.pipelines.training_dataset import build_training_dataset
+from app.utils.artifact_store import load_model
+
+
+TARGET_COLUMNS = ["target_h1", "target_h2", "target_h3"]
+
+BACKTEST_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", ".cache/backtest")
+N_FOLDS = 5
+
+# Targets look up to 72h ahead; leave that gap between train and
+# test so training labels never overlap the test period
+FOLD_GAP = 72
+
+# In-process cache of loaded fold data, keyed like the disk cache
+_fold_cache = {}
+
+
+# ==========================================================
+# Folds
+# ==========================================================
+def make_folds(n_rows, n_folds=N_FOLDS, test_size=None, mode="expanding", train_size=None, gap=FOLD_GAP):
+    """
+    Rolling-origin folds over time-ordered rows.
+
+    mode="expanding": train on everything before the test block
+    mode="sliding":   train on the last `train_size` rows before it
+    Returns a list of (train_idx, test_idx) int arrays.
+    """
+
+    if mode not in ("expanding", "sliding"):
+        raise ValueError("mode must be 'expanding' or 'sliding'")
+
+    test_size = test_size or n_rows // (n_folds + 1)
+
+    folds = []
+
+    for i in range(n_folds):
+
+        test_end = n_rows - (n_folds - 1 - i) * test_size
+        test_start = test_end - test_size
+        train_end = test_start - gap
+
+        if mode == "sliding":
+            train_start = max(0, train_end - (train_size or test_size * 2))
+        else:
+            train_start = 0
+
+        if train_end - train_start < 1 or test_start < 0:
+            raise ValueError(
+                f"Not enough rows ({n_rows}) for {n_folds} folds of {test_size}"
+            )
+
+        folds.append((
+            np.arange(train_start, train_end),
+            np.arange(test_start, test_end)
+        ))
+
+    return folds
+
+
+# ==========================================================
+# Cached fold data
+# ==========================================================
+def _history_watermark():
+    """Row count and newest datetime of the training history (no scan)."""
+
+    collection = get_db()[HISTORY_COLLECTION]
+    latest = collection.find_one({}, {"datetime": 1}, sort=[("datetime", -1)])
+
+    return f"{collection.estimated_document_count()}:{latest['datetime'] if latest else None}"
+
+
+def load_fold_data(n_folds=N_FOLDS, mode="expanding", test_size=None, train_size=None, gap=FOLD_GAP, df=None):
+    """
+    Feature matrix, targets and folds for the current training data.
+    Built once per (data watermark, feature spec, fold settings); later
+    calls (and later processes) reuse the memory-mapped disk cache.
+    Without `df` the key comes from history metadata, so a cache hit
+    never builds the training dataset.
+    """
+
+    settings = f"{n_folds}:{mode}:{test_size}:{train_size}:{gap}"
+
+    if df is None:
+        watermark = f"{_history_watermark()}|{spec_id(FEATURE_SPEC)}"
+    else:
+        # a new feature spec changes the columns
+        watermark = f"{len(df)}:{df['datetime'].max()}|{','.join(df.columns)}"
+
+    key = hashlib.sha256(f"{watermark}|{settings}".encode()).hexdigest()[:24]
+
+    if key in _fold_cache:
+        return _fold_cache[key]
+
+    path = os.path.join(BACKTEST_CACHE_DIR, f"folds-{key}.joblib")
+
+    if os.path.exists(path):
+        data = joblib.load(path, mmap_mode="r")
+    else:
+        if df is None:
+            df = build_training_dataset()
+
+        features = [
+            col for col in df.columns
+            if col != "datetime" and col not in TARGET_COLUMNS
+        ]
+
+        data = {
+            "features": features,
+            "X": df[features].to_numpy(dtype=np.float64),
+            "targets": {col: df[col].to_numpy(dtype=np.float64) for col in TARGET_COLUMNS},
+            "folds": make_folds(len(df), n_folds, test_size, mode, train_size, gap),
+            "data_until": df["datetime"].max().to_pydatetime(),
+            "settings": {"n_folds": n_folds, "mode": mode, "gap": gap},
+        }
+
+        os.makedirs(BACKTEST_CACHE_DIR, exist_ok=True)
+        joblib.dump(data, path)
+
+    _fold_cache[key] = data
+
+    return data
+
+
+# ==========================================================
+# Evaluation
+# ==========================================================
+def _cpu_split(n_folds, n_jobs):
+    """(parallel folds, threads per fold) within an n_jobs CPU budget."""
+
+    budget = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(1, n_jobs)
+    workers = max(1, min(n_folds, budget))
+
+    return workers, max(1, budget // workers)
+
+
+def _fit_fold(estimator, X, y, train_idx, test_idx, fold, output_index=None, threads=1):
+
+    model = clone(estimator)
+
+    # Each fold gets its share of the budget, not every CPU
+    model.set_params(**{
+        name: threads for name in model.get_params(deep=True)
+        if name == "n_jobs" or name.endswith("__n_jobs")
+    })
+
+    with threadpool_limits(limits=threads):
+        model.fit(X[train_idx], y[train_idx])
+        preds = model.predict(X[test_idx])
+
+    # Multi-output: fit on all targets, score the requested one
+    if output_index is not None:
+        preds = preds[:, output_index]
+        y = y[:, output_index]
+
+    return {
+        "fold": fold,
+        "n_train": int(len(train_idx)),
+        "n_test": int(len(test_idx)),
+        "rmse": float(np.sqrt(mean_squared_error(y[test_idx], preds))),
+        "mae": float(mean_absolute_error(y[test_idx], preds)),
+    }
+
+
+def backtest_estimator(estimator, features, horizon, data, n_jobs=-1, targets=None):
+    """
+    Refit `estimator` (unfitted params are what matter) on every
+    fold and score it on the following test block.
+    `targets` lists the columns a multi-output estimator is fit on.
+    """
+
+    columns = [data["features"].index(col) for col in features]
+
+    X = np.ascontiguousarray(data["X"][:, columns])
+
+    if targets:
+        y = np.column_stack([data["targets"][col] for col in targets])
+        output_index = targets.index(f"target_h{horizon}")
+    else:
+        y = np.asarray(data["targets"][f"target_h{horizon}"])
+        output_index = None
+
+    workers, threads = _cpu_split(len(data["folds"]), n_jobs)
+
+    folds = Parallel(n_jobs=workers)(
+        delayed(_fit_fold)(estimator, X, y, train_idx, test_idx, i, output_index, threads)
+        for i, (train_idx, test_idx) in enumerate(data["folds"])
+    )
+
+    rmses = np.array([f["rmse"] for f in folds])
+    maes = np.array([f["mae"] for f in folds])
+
+    return {
+        "folds": folds,
+        "rmse_mean": float(rmses.mean()),
+        "rmse_std": float(rmses.std()),
+        "mae_mean": float(maes.mean()),
+        "mae_std": float(maes.std()),
+        "data_until": data["data_until"],
+        **data["settings"],
+        "evaluated_at": datetime.utcnow(),
+    }
+
+
+def backtest_registry_model(doc, data=None, n_jobs=-1):
+    """
+    Backtest a registry document and store the result on it.
+    """
+
+    data = data if data is not None else load_fold_data()
+
+    model = load_model(doc)
+
+    summary = backtest_estimator(
+        model, doc["features"], doc["horizon"], data, n_jobs,
+        targets=doc.get("targets") if doc.get("multi_output") else None
+    )
+
+    get_model_registry().update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"backtest": summary}}
+    )
+
+    print(
+        f"📊 H{doc['horizon']} {doc['model_name']}: "
+        f"backtest RMSE={summary['rmse_mean']:.4f} ± {summary['rmse_std']:.4f}"
+    )
+
+    return summary
+
+
+def backtest_candidates(horizon, run_id=None, data=None, n_jobs=-1, force=False):
+    """
+    Backtest candidates for a horizon. Candidates already scored
+    on the same data and fold settings are skipped unless `force`.
+    Returns {registry _id: summary}.
+    """
+
+    data = data if data is not None else load_fold_data()
+
+    query = {"horizon": horizon, "status": "candidate"}
+    if run_id is not None:
+        query["run_id"] = run_id
+
+    results = {}
+
+    for doc in get_model_registry().find(query):
+
+        existing = doc.get("backtest")
+        if (
+            not force
+            and existing
+            and existing.get("data_until") == data["data_until"]
+            and existing.get("n_folds") == data["settings"]["n_folds"]
+            and existing.get("mode") == data["settings"]["mode"]
+        ):
+            results[doc["_id"]] = existing
+            continue
+
+        results[doc["_id"]] = backtest_registry_model(doc, data, n_jobs)
+
+    return results
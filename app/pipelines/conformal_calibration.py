@@ -0,0 +1,111 @@
+"""
+Conformal Calibration
+---------------------
+Scores each production forest on recent rows whose target has
+since been observed and appends the normalized residuals to the
+model's conformal buffer (registry: conformal_scores). Only rows
+after the model was registered and not scored before are used, so
+the buffer stays out-of-sample. /forecast?interval=true calibrates
+its intervals from this buffer.
+
+Run after the feature pipeline:
+    python -m app.pipelines.conformal_calibration
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.db.mongo import get_model_registry
+from app.db.history_loader import load_history_frame
+from app.pipelines.feature_spec import compile_spec, spec_from_doc
+from app.pipelines.load_production_model import find_production_doc
+from app.utils.artifact_store import load_flat_model, load_model
+from app.utils.multi_output import output_index
+from app.utils.tree_intervals import (
+    CONFORMAL_BUFFER_SIZE,
+    conformal_scores,
+    per_tree_predictions
+)
+
+
+HORIZONS = [1, 2, 3]
+
+# Hours of feature rows considered on each run
+CONFORMAL_HOURS = int(os.getenv("CONFORMAL_HOURS", "720"))
+
+
+def calibrate_horizon(horizon: int, history=None):
+    """Append new scores for one horizon's production model. Returns how many."""
+
+    doc = find_production_doc(horizon)
+    plan = compile_spec(spec_from_doc(doc))
+
+    target = f"target_h{horizon}"
+    if target not in plan.targets:
+        raise RuntimeError(f"Feature spec has no {target} horizon")
+
+    if history is None:
+        hours = CONFORMAL_HOURS + plan.lookback + plan.targets[target]
+        history = load_history_frame(start=datetime.utcnow() - timedelta(hours=hours))
+
+    features = doc["features"]
+    df = plan.transform(history, targets=True)
+
+    # Out-of-sample rows not scored yet
+    since = doc.get("conformal_until") or doc.get("registered_at")
+    keep = df[features + [target]].notna().all(axis=1)
+    if since is not None:
+        keep &= df["datetime"] > since
+
+    rows = df[keep]
+
+    if rows.empty:
+        print(f"⏭️ H{horizon}: no new observed rows")
+        return 0
+
+    per_tree = per_tree_predictions(
+        load_model(doc),
+        rows[features].to_numpy(dtype=np.float64),
+        flat=load_flat_model(doc),
+        output_index=output_index(doc)
+    )
+
+    scores = conformal_scores(per_tree, rows[target].to_numpy())
+
+    get_model_registry().update_one(
+        {"_id": doc["_id"]},
+        {
+            "$push": {"conformal_scores": {
+                "$each": [float(s) for s in scores],
+                "$slice": -CONFORMAL_BUFFER_SIZE
+            }},
+            "$set": {
+                "conformal_until": rows["datetime"].iloc[-1].to_pydatetime(),
+                "conformal_updated_at": datetime.utcnow()
+            }
+        }
+    )
+
+    print(f"✅ H{horizon}: {len(scores)} conformal scores added")
+
+    return len(scores)
+
+
+def calibrate_all():
+
+    plan = compile_spec()
+    hours = CONFORMAL_HOURS + plan.lookback + max(plan.targets.values(), default=0)
+
+    history = load_history_frame(start=datetime.utcnow() - timedelta(hours=hours))
+
+    for horizon in HORIZONS:
+        try:
+            calibrate_horizon(horizon, history)
+        except RuntimeError as e:
+            print(f"⚠️ H{horizon}: {e}")
+
+
+if __name__ == "__main__":
+    calibrate_all()
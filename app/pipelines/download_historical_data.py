@@ -1,7 +1,5 @@
-import requests
-import pandas as pd
-from datetime import datetime
-from app.db.mongo import get_db
+from app.pipelines.backfill_openmeteo import upsert_chunk
+from app.utils.openmeteo_client import ARCHIVE_URL, fetch_hourly
 
 
 def download_historical_data(start_date: str, end_date: str):
@@ -13,43 +11,24 @@ def download_historical_data(start_date: str, end_date: str):
     latitude = 24.8608
     longitude = 67.0104
 
-    url = (
-        "https://archive-api.open-meteo.com/v1/archive"
-        f"?latitude={latitude}"
-        f"&longitude={longitude}"
-        f"&start_date={start_date}"
-        f"&end_date={end_date}"
-        "&hourly="
-        "pm2_5,"
-        "pm10,"
-        "carbon_monoxide,"
-        "nitrogen_dioxide,"
-        "sulphur_dioxide,"
-        "ozone"
-        "&timezone=Asia/Karachi"
-    )
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": start_date,
+        "end_date": end_date,
+        "hourly": "pm2_5,pm10,carbon_monoxide,nitrogen_dioxide,sulphur_dioxide,ozone",
+        "timezone": "Asia/Karachi",
+    }
 
     print("Fetching historical data...")
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
-
-    data = response.json()
-    df = pd.DataFrame(data["hourly"])
 
-    df["datetime"] = pd.to_datetime(df["time"])
-    df = df.drop(columns=["time"])
+    # settled archive ranges are served from the local cache
+    df = fetch_hourly(ARCHIVE_URL, params)
 
     print("Rows downloaded:", len(df))
 
-    # Store in Mongo
-    db = get_db()
-    collection = db["historical_hourly_data"]
-
-    # Clear old historical data
-    collection.delete_many({})
-
-    records = df.to_dict("records")
-    collection.insert_many(records)
+    # Upsert by datetime: existing rows are updated, never wiped
+    upsert_chunk(df, "historical_hourly_data")
 
     print("✅ Historical data saved to Mongo")
 
@@ -2,74 +2,55 @@
 Feature Engineering
 -------------------
 - Reads historical_hourly_data
-- Creates lag features
-- Creates rolling features
+- Builds lag / rolling / time features from the feature spec
 - Creates multi-horizon targets
 - Saves to feature_store
 """
 
-import pandas as pd
-from app.db.mongo import get_feature_store, get_db
+from app.db.history_loader import load_history_frame
+from app.pipelines.feature_spec import compile_spec
+from app.pipelines.feature_store_writer import (
+    get_feature_watermark,
+    incremental_window,
+    upsert_feature_rows
+)
 
 
-def generate_features():
+# Longest lag / rolling window of the feature spec
+LOOKBACK_HOURS = compile_spec().lookback
+
+
+def generate_features(incremental: bool = True):
     print("🔄 Generating features...")
 
-    db = get_db()
+    # Rows after the watermark (less the revision window) are
+    # the only ones that can change
+    watermark = get_feature_watermark() if incremental else None
+    start, since = incremental_window(watermark, LOOKBACK_HOURS)
 
     # -------------------------------------------------
     # 1️⃣ Load historical data
     # -------------------------------------------------
-    data = list(db["historical_hourly_data"].find({}, {"_id": 0}))
+    df = load_history_frame(start=start)
 
-    if not data:
+    if df.empty:
         raise RuntimeError("❌ No historical data found")
 
-    df = pd.DataFrame(data)
-    df["datetime"] = pd.to_datetime(df["datetime"])
     df = df.sort_values("datetime")
 
     # -------------------------------------------------
-    # 2️⃣ Create Lag Features
+    # 2️⃣ Features + Multi-Horizon Targets (feature spec)
     # -------------------------------------------------
-    df["pm2_5_lag_1"] = df["pm2_5"].shift(1)
-    df["pm2_5_lag_3"] = df["pm2_5"].shift(3)
-    df["pm2_5_lag_6"] = df["pm2_5"].shift(6)
-    df["pm2_5_lag_12"] = df["pm2_5"].shift(12)
-    df["pm2_5_lag_24"] = df["pm2_5"].shift(24)
+    df = compile_spec().transform(df, targets=True)
 
     # -------------------------------------------------
-    # 3️⃣ Rolling Statistics
-    # -------------------------------------------------
-    df["pm2_5_roll_mean_6"] = df["pm2_5"].rolling(6).mean()
-    df["pm2_5_roll_mean_12"] = df["pm2_5"].rolling(12).mean()
-    df["pm2_5_roll_mean_24"] = df["pm2_5"].rolling(24).mean()
-
-    # -------------------------------------------------
-    # 4️⃣ Time Features
-    # -------------------------------------------------
-    df["hour"] = df["datetime"].dt.hour
-    df["day_of_week"] = df["datetime"].dt.dayofweek
-
-    # -------------------------------------------------
-    # 5️⃣ Multi-Horizon Targets
-    # -------------------------------------------------
-    df["target_h1"] = df["pm2_5"].shift(-24)
-    df["target_h2"] = df["pm2_5"].shift(-48)
-    df["target_h3"] = df["pm2_5"].shift(-72)
-
-    # -------------------------------------------------
-    # 6️⃣ Drop NaNs
+    # 3️⃣ Drop NaNs
     # -------------------------------------------------
     df = df.dropna()
 
     # -------------------------------------------------
-    # 7️⃣ Store in feature_store
+    # 4️⃣ Upsert into feature_store
     # -------------------------------------------------
-    feature_store = get_feature_store()
-
-    feature_store.delete_many({})  # overwrite safely
-
-    feature_store.insert_many(df.to_dict("records"))
+    written = upsert_feature_rows(df, since=since)
 
-    print(f"✅ Stored {len(df)} feature rows")
+    print(f"✅ Stored {written} feature rows")
@@ -1,13 +1,15 @@
+from app.utils.rolling_kernel import rolling_columns, rolling_stats
+
+
 def add_rolling_features(df):
 
     windows = [6, 12, 24, 48]
+    stats = ["mean", "std"]
+
+    # every window and stat from one kernel call
+    values = rolling_stats(df["pm2_5"].to_numpy(), windows, stats)
 
-    for window in windows:
-        df[f"pm2_5_roll_mean_{window}"] = (
-            df["pm2_5"].rolling(window=window).mean()
-        )
-        df[f"pm2_5_roll_std_{window}"] = (
-            df["pm2_5"].rolling(window=window).std()
-        )
+    for i, (window, stat) in enumerate(rolling_columns(windows, stats)):
+        df[f"pm2_5_roll_{stat}_{window}"] = values[:, i]
 
     return df
@@ -0,0 +1,344 @@
+"""
+Feature Specification
+---------------------
+One declarative description of every model input, compiled into
+a plan that builds all features in a single vectorized pass:
+
+- aliases   : copies of raw columns (aqi_pm25 <- pm2_5)
+- calendar  : datetime fields, extracted once per column
+- cyclical  : sin / cos encodings of calendar fields
+- series    : lags and rolling mean / std / min / max / ewm per
+              source column, all windows in one rolling_stats() call
+- targets   : future values for the training horizons
+
+The spec is stored with every registered model (`feature_spec`),
+so batch training, the incremental feature refresh, the streaming
+state and continued training all build exactly the features the
+model was fitted on. Documents registered before that carry no
+spec and are built with LEGACY_FEATURE_SPEC.
+"""
+
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from app.utils.rolling_kernel import STATS, rolling_columns, rolling_stats, rolling_tail
+
+
+FEATURE_SPEC = {
+    "version": 2,
+    "aliases": {"aqi_pm25": "pm2_5"},
+    "calendar": ["hour", "day", "month", "day_of_week", "week_of_year"],
+    "cyclical": [
+        {"name": "hour", "field": "hour", "period": 24},
+        {"name": "dow", "field": "day_of_week", "period": 7},
+    ],
+    "series": [
+        {
+            "column": "pm2_5",
+            "lags": [1, 3, 6],
+            "windows": [6, 12],
+            "stats": ["mean"],
+            "lag_name": "lag_{n}",
+            "roll_name": "roll_{stat}_{n}",
+        },
+        # Columns of the former feature_pipeline / feature_engineering_lag /
+        # feature_engineering_rolling builders (and app/scripts/register_models.py)
+        {
+            "column": "pm2_5",
+            "lags": [1, 3, 6, 12, 24, 48, 72, 168],
+            "windows": [6, 12, 24, 48],
+            "stats": ["mean", "std"],
+            "lag_name": "pm2_5_lag_{n}",
+            "roll_name": "pm2_5_roll_{stat}_{n}",
+        },
+    ],
+    "targets": {
+        "column": "pm2_5",
+        "horizons": {"target_h1": 24, "target_h2": 48, "target_h3": 72},
+    },
+}
+
+# Features of models registered before specs were stored on the
+# registry document (the original final_feature_table builder)
+LEGACY_FEATURE_SPEC = {
+    "version": 1,
+    "aliases": {"aqi_pm25": "pm2_5"},
+    "calendar": ["hour", "day", "month"],
+    "series": [
+        {
+            "column": "pm2_5",
+            "lags": [1, 3, 6],
+            "windows": [6, 12],
+            "stats": ["mean"],
+            "lag_name": "lag_{n}",
+            "roll_name": "roll_{stat}_{n}",
+        },
+    ],
+    "targets": {
+        "column": "pm2_5",
+        "horizons": {"target_h1": 24, "target_h2": 48, "target_h3": 72},
+    },
+}
+
+# Calendar fields straight from datetime64 arithmetic
+# (naive timestamps, as stored in historical_hourly_data)
+CALENDAR_FIELDS = {
+    "hour": lambda t: (t.astype("datetime64[h]") - t.astype("datetime64[D]")).astype(np.int64),
+    "day": lambda t: (t.astype("datetime64[D]") - t.astype("datetime64[M]")).astype(np.int64) + 1,
+    "month": lambda t: t.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+    "day_of_week": lambda t: (t.astype("datetime64[D]").astype(np.int64) + 3) % 7,  # Monday = 0
+    "day_of_year": lambda t: (t.astype("datetime64[D]") - t.astype("datetime64[Y]")).astype(np.int64) + 1,
+    "week_of_year": lambda t: _iso_week(t),
+}
+
+
+def _iso_week(t):
+    """ISO 8601 week number (the week holding the year's first Thursday is 1)."""
+
+    days = t.astype("datetime64[D]").astype(np.int64)
+    thursday = days - (days + 3) % 7 + 3
+    year_start = thursday.astype("datetime64[D]").astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+
+    return (thursday - year_start) // 7 + 1
+
+
+def spec_id(spec):
+    """Short content hash identifying a spec."""
+
+    canonical = json.dumps(spec, sort_keys=True)
+
+    return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+
+def spec_from_doc(doc):
+    """Spec a registry doc was trained with (older docs: the legacy spec)."""
+
+    return (doc or {}).get("feature_spec") or LEGACY_FEATURE_SPEC
+
+
+# ==========================================================
+# Compiled plan
+# ==========================================================
+class FeaturePlan:
+
+    def __init__(self, spec):
+
+        self.spec = spec
+        self.id = spec_id(spec)
+
+        self.aliases = dict(spec.get("aliases", {}))
+        self.cyclical = list(spec.get("cyclical", []))
+        self.series = [dict(s) for s in spec.get("series", [])]
+        self.targets = dict(spec.get("targets", {}).get("horizons", {}))
+        self.target_column = spec.get("targets", {}).get("column")
+
+        # Each calendar field is extracted once, even if only a
+        # cyclical encoding uses it
+        self.calendar = list(spec.get("calendar", []))
+        self._fields = list(dict.fromkeys(
+            self.calendar + [c["field"] for c in self.cyclical]
+        ))
+
+        for field in self._fields:
+            if field not in CALENDAR_FIELDS:
+                raise ValueError(f"Unknown calendar field: {field}")
+
+        for s in self.series:
+            for stat in s.get("stats", []):
+                if stat not in STATS:
+                    raise ValueError(f"Unknown rolling stat: {stat}")
+
+        self.feature_names = (
+            list(self.aliases)
+            + self.calendar
+            + [f"{c['name']}_{fn}" for c in self.cyclical for fn in ("sin", "cos")]
+            + [name for s in self.series for name, *_ in self._series_columns(s)]
+        )
+
+        # Rows of history a feature row depends on
+        self.lookback = max(
+            [max(s.get("lags", [0]) + [w - 1 for w in s.get("windows", [1])]) for s in self.series],
+            default=0
+        )
+
+    @staticmethod
+    def _series_columns(s):
+        """(name, kind, n, stat) for every column the series produces."""
+
+        columns = [(s["lag_name"].format(n=k), "lag", k, None) for k in s.get("lags", [])]
+
+        for w, stat in rolling_columns(s.get("windows", []), s.get("stats", [])):
+            columns.append((s["roll_name"].format(stat=stat, n=w), "roll", w, stat))
+
+        return columns
+
+    # ------------------------------------------------------
+    # Apply
+    # ------------------------------------------------------
+    def transform(self, df, targets=False):
+        """
+        Append every feature (and optionally the targets) to a
+        datetime-sorted frame in one pass over a NumPy buffer.
+        """
+
+        n = len(df)
+        names = list(self.feature_names)
+        if targets:
+            names += list(self.targets)
+
+        # Column-major, so every feature is written contiguously and
+        # the frame below wraps the buffer without copying it
+        buffer = np.full((n, len(names)), np.nan, order="F")
+        col = 0
+
+        for source in self.aliases.values():
+            buffer[:, col] = df[source].to_numpy(dtype=np.float64)
+            col += 1
+
+        fields = {}
+
+        if self._fields:
+            t = np.asarray(df["datetime"], dtype="datetime64[ns]")
+            fields = {f: CALENDAR_FIELDS[f](t).astype(np.float64) for f in self._fields}
+
+        for field in self.calendar:
+            buffer[:, col] = fields[field]
+            col += 1
+
+        for c in self.cyclical:
+            angle = 2 * np.pi * fields[c["field"]] / c["period"]
+            buffer[:, col] = np.sin(angle)
+            buffer[:, col + 1] = np.cos(angle)
+            col += 2
+
+        for s in self.series:
+
+            x = df[s["column"]].to_numpy(dtype=np.float64)
+
+            for k in s.get("lags", []):
+                if k < n:
+                    buffer[k:, col] = x[:n - k]
+                col += 1
+
+            # Rolling columns are laid out window-major, as the kernel
+            # returns them, so it fills this slice of the buffer directly
+            width = len(s.get("windows", [])) * len(s.get("stats", []))
+            rolling_stats(x, s.get("windows", []), s.get("stats", []), out=buffer[:, col:col + width])
+            col += width
+
+        if targets:
+            y = df[self.target_column].to_numpy(dtype=np.float64)
+            for h in self.targets.values():
+                if h < n:
+                    buffer[:n - h, col] = y[h:]
+                col += 1
+
+        features = pd.DataFrame(buffer, columns=names, index=df.index, copy=False)
+        kept = df.drop(columns=[c for c in names if c in df.columns])
+
+        return pd.concat([kept, features], axis=1, copy=False)
+
+    # ------------------------------------------------------
+    # Scenario paths
+    # ------------------------------------------------------
+    def path_features(self, paths, times):
+        """
+        Features for the last len(times) hours of many simulated
+        paths at once. `paths` maps each source column to an
+        (n_paths, length) array ending at times[-1]. Returns
+        name -> (n_paths, len(times)) arrays.
+        """
+
+        m = len(times)
+        n_paths = len(next(iter(paths.values())))
+
+        t = np.asarray(times, dtype="datetime64[ns]")
+        fields = {f: CALENDAR_FIELDS[f](t).astype(np.float64) for f in self._fields}
+
+        out = {
+            alias: paths[source][:, -m:]
+            for alias, source in self.aliases.items()
+        }
+
+        for field in self.calendar:
+            out[field] = np.broadcast_to(fields[field], (n_paths, m))
+
+        for c in self.cyclical:
+            angle = 2 * np.pi * fields[c["field"]] / c["period"]
+            out[f"{c['name']}_sin"] = np.broadcast_to(np.sin(angle), (n_paths, m))
+            out[f"{c['name']}_cos"] = np.broadcast_to(np.cos(angle), (n_paths, m))
+
+        for s in self.series:
+
+            x = paths[s["column"]]
+            length = x.shape[1]
+
+            for k in s.get("lags", []):
+                out[s["lag_name"].format(n=k)] = x[:, length - m - k:length - k]
+
+            rolled = rolling_tail(x, s.get("windows", []), s.get("stats", []), m)
+
+            for (w, stat), values in rolled.items():
+                out[s["roll_name"].format(stat=stat, n=w)] = values
+
+        return out
+
+    # ------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------
+    def streaming_configs(self):
+        """StreamingFeatureState configs equivalent to the series."""
+
+        for s in self.series:
+            unsupported = set(s.get("stats", [])) - {"mean", "std"}
+            if unsupported:
+                raise RuntimeError(
+                    f"Streaming features support rolling mean/std only, not {sorted(unsupported)}"
+                )
+
+        return [
+            {
+                "column": s["column"],
+                "lags": list(s.get("lags", [])),
+                "windows": list(s.get("windows", [])),
+                "lag_name": s["lag_name"],
+                "mean_name": s["roll_name"].replace("{stat}", "mean") if "mean" in s.get("stats", []) else None,
+                "std_name": s["roll_name"].replace("{stat}", "std") if "std" in s.get("stats", []) else None,
+            }
+            for s in self.series
+        ]
+
+    def row_features(self, doc):
+        """Alias / calendar / cyclical values for one raw history row."""
+
+        t = np.array([pd.Timestamp(doc["datetime"]).to_datetime64()], dtype="datetime64[ns]")
+
+        fields = {f: float(CALENDAR_FIELDS[f](t)[0]) for f in self._fields}
+
+        row = {alias: doc.get(source) for alias, source in self.aliases.items()}
+        row.update({field: fields[field] for field in self.calendar})
+
+        for c in self.cyclical:
+            angle = 2 * np.pi * fields[c["field"]] / c["period"]
+            row[f"{c['name']}_sin"] = float(np.sin(angle))
+            row[f"{c['name']}_cos"] = float(np.cos(angle))
+
+        return row
+
+
+_plans = {}
+
+
+def compile_spec(spec=None):
+    """Compiled (and cached) plan for a spec; default FEATURE_SPEC."""
+
+    spec = spec or FEATURE_SPEC
+    key = spec_id(spec)
+
+    if key not in _plans:
+        _plans[key] = FeaturePlan(spec)
+
+    return _plans[key]
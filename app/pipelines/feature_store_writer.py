@@ -0,0 +1,87 @@
+"""
+Feature Store Writer
+--------------------
+- Finds the last materialized datetime (watermark)
+- Incremental refreshes rewrite the last REVISION_HOURS too,
+  so late or revised source hours reach every row reading them
+- Upserts feature rows by datetime with unordered bulk writes
+- Keeps the online latest-row document in sync
+
+Readers never see an empty feature_store while it refreshes.
+"""
+
+import os
+from datetime import timedelta
+
+from pymongo import UpdateOne
+
+from app.db.mongo import get_feature_store
+from app.pipelines.online_features import update_latest_from_df
+
+
+BULK_BATCH_SIZE = 1000
+
+# Source hours this far behind the watermark may still change
+# (late rows, archive revisions re-fetched by the backfill)
+REVISION_HOURS = int(os.getenv("FEATURE_REVISION_HOURS", "168"))
+
+
+def get_feature_watermark():
+    """
+    Datetime of the newest materialized feature row, or None.
+    """
+
+    latest = get_feature_store().find_one(
+        {},
+        {"datetime": 1},
+        sort=[("datetime", -1)]
+    )
+
+    return latest["datetime"] if latest else None
+
+
+def incremental_window(watermark, lookback=0):
+    """
+    (history start, since) for a refresh after `watermark`:
+    rows newer than `since` are recomputed from `lookback` extra
+    hours of history and upserted. (None, None) = full refresh.
+    """
+
+    if watermark is None:
+        return None, None
+
+    since = watermark - timedelta(hours=REVISION_HOURS)
+
+    return since - timedelta(hours=lookback), since
+
+
+def upsert_feature_rows(df, since=None):
+    """
+    Upsert rows keyed by datetime.
+    If `since` is given, only rows strictly newer are written.
+    Returns the number of rows written.
+    """
+
+    if since is not None:
+        df = df[df["datetime"] > since]
+
+    if df.empty:
+        return 0
+
+    collection = get_feature_store()
+    records = df.to_dict("records")
+
+    for start in range(0, len(records), BULK_BATCH_SIZE):
+        ops = [
+            UpdateOne(
+                {"datetime": record["datetime"]},
+                {"$set": record},
+                upsert=True
+            )
+            for record in records[start:start + BULK_BATCH_SIZE]
+        ]
+        collection.bulk_write(ops, ordered=False)
+
+    update_latest_from_df(df)
+
+    return len(records)
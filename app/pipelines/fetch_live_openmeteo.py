@@ -1,5 +1,4 @@
-import requests
-import pandas as pd
+from app.utils.openmeteo_client import FORECAST_URL, fetch_hourly
 
 
 def fetch_live_weather():
@@ -7,30 +6,18 @@ def fetch_live_weather():
     latitude = 24.8607
     longitude = 67.0011
 
-    url = (
-        "https://api.open-meteo.com/v1/forecast"
-        f"?latitude={latitude}"
-        f"&longitude={longitude}"
-        "&hourly="
-        "pm2_5,"
-        "pm10,"
-        "temperature_2m,"
-        "relativehumidity_2m,"
-        "windspeed_10m"
-        "&forecast_days=3"
-        "&timezone=Asia/Karachi"
-    )
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "hourly": "pm2_5,pm10,temperature_2m,relativehumidity_2m,windspeed_10m",
+        "forecast_days": 3,
+        "timezone": "Asia/Karachi",
+    }
 
     print("Fetching live 3-day weather forecast...")
 
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-
-    data = response.json()
-
-    df = pd.DataFrame(data["hourly"])
-    df["datetime"] = pd.to_datetime(df["time"])
-    df = df.drop(columns=["time"])
+    # cached for OPENMETEO_FORECAST_TTL seconds
+    df = fetch_hourly(FORECAST_URL, params, timeout=30)
 
     print("Live rows fetched:", len(df))
 
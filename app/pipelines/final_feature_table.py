@@ -1,23 +1,21 @@
-import pandas as pd
-from app.db.mongo import get_db
+from app.db.history_loader import load_history_frame
+from app.pipelines.feature_spec import compile_spec
+
+
+# Rows of history a feature row depends on (longest lag / window)
+LOOKBACK_HOURS = compile_spec().lookback
 
 
 # ==========================================================
 # 1️⃣ Load Historical Data
 # ==========================================================
-def load_historical_df():
-
-    db = get_db()
-    collection = db["historical_hourly_data"]
+def load_historical_df(start=None):
 
-    data = list(collection.find({}, {"_id": 0}))
+    df = load_history_frame(start=start)
 
-    if not data:
+    if df.empty:
         raise RuntimeError("No historical data found in MongoDB")
 
-    df = pd.DataFrame(data)
-
-    df["datetime"] = pd.to_datetime(df["datetime"])
     df = df.sort_values("datetime").reset_index(drop=True)
 
     return df
@@ -26,33 +24,18 @@ def load_historical_df():
 # ==========================================================
 # 2️⃣ Feature Engineering (COMMON for training + inference)
 # ==========================================================
-def build_final_dataframe():
+def build_final_dataframe(start=None, spec=None):
     """
     Build full feature dataframe.
     DO NOT drop NaN here.
     Used by feature pipeline + inference.
+    `start` limits the history read (incremental refresh);
+    features come from the compiled feature spec.
     """
 
-    df = load_historical_df()
-
-    # Target base
-    df["aqi_pm25"] = df["pm2_5"]
+    df = load_historical_df(start)
 
-    # Time Features
-    df["hour"] = df["datetime"].dt.hour
-    df["day"] = df["datetime"].dt.day
-    df["month"] = df["datetime"].dt.month
-
-    # Lag Features
-    df["lag_1"] = df["aqi_pm25"].shift(1)
-    df["lag_3"] = df["aqi_pm25"].shift(3)
-    df["lag_6"] = df["aqi_pm25"].shift(6)
-
-    # Rolling Features
-    df["roll_mean_6"] = df["aqi_pm25"].rolling(6).mean()
-    df["roll_mean_12"] = df["aqi_pm25"].rolling(12).mean()
-
-    return df
+    return compile_spec(spec).transform(df)
 
 
 # ==========================================================
@@ -64,12 +47,8 @@ def build_training_dataset(horizon: int):
     Creates horizon-specific target.
     """
 
-    df = build_final_dataframe()
-
-    # Multi-horizon targets
-    df["target_h1"] = df["aqi_pm25"].shift(-24)
-    df["target_h2"] = df["aqi_pm25"].shift(-48)
-    df["target_h3"] = df["aqi_pm25"].shift(-72)
+    plan = compile_spec()
+    df = plan.transform(load_historical_df(), targets=True)
 
     print("Before dropna:", df.shape)
 
@@ -85,12 +64,7 @@ def build_training_dataset(horizon: int):
     y = df[target_column]
 
     X = df.drop(
-        columns=[
-            "datetime",
-            "target_h1",
-            "target_h2",
-            "target_h3",
-        ],
+        columns=["datetime", *plan.targets],
         errors="ignore"
     )
 
@@ -0,0 +1,231 @@
+"""
+Budgeted Hyperparameter Search
+------------------------------
+Successive halving across all model families at once:
+
+- Sample random configs per family
+- Rung k trains every survivor with resource eta^k * min_resource
+  (trees / boosting rounds for ensembles, most-recent training rows
+  for Ridge) and keeps the best 1/eta on the time-ordered validation set
+- Trials run in parallel; no new rung starts once the wall-clock
+  budget is spent, the best survivor so far wins
+- Every trial is recorded in the model registry (status="trial")
+"""
+
+import os
+import time
+import math
+from datetime import datetime
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from app.db.mongo import get_model_registry
+from app.pipelines.train_models import build_model, evaluate_model, fit_model
+
+
+SEARCH_N_JOBS = int(os.getenv("SEARCH_N_JOBS", str(os.cpu_count() or 1)))
+
+MAX_ESTIMATORS = 400
+ETA = 3
+MIN_RESOURCE = 1 / 9   # fraction of the full resource at rung 0
+
+
+def _pick(rng, options):
+    # rng.choice would coerce mixed lists (None / "sqrt" / 1.0) to strings
+    return options[int(rng.integers(len(options)))]
+
+
+def _log_uniform(rng, low, high):
+    return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+
+
+def sample_params(family, rng):
+    """
+    One random configuration for a model family.
+    """
+
+    if family == "random_forest":
+        return {
+            "max_depth": _pick(rng, [None, 8, 12, 16, 24]),
+            "min_samples_leaf": _pick(rng, [1, 2, 4, 8]),
+            "max_features": _pick(rng, [1.0, 0.5, "sqrt"]),
+        }
+
+    if family == "gradient_boosting":
+        return {
+            "learning_rate": _log_uniform(rng, 0.02, 0.3),
+            "max_depth": int(rng.integers(2, 6)),
+            "subsample": _pick(rng, [0.6, 0.8, 1.0]),
+        }
+
+    if family == "xgboost":
+        return {
+            "learning_rate": _log_uniform(rng, 0.02, 0.3),
+            "max_depth": int(rng.integers(3, 11)),
+            "subsample": _pick(rng, [0.6, 0.8, 1.0]),
+            "colsample_bytree": _pick(rng, [0.6, 0.8, 1.0]),
+            "min_child_weight": _pick(rng, [1.0, 3.0, 5.0]),
+        }
+
+    if family == "ridge":
+        return {"alpha": _log_uniform(rng, 1e-3, 1e3)}
+
+    raise ValueError(f"Unknown model family: {family}")
+
+
+# ==========================================================
+# One trial
+# ==========================================================
+def _fit_trial(family, params, fraction, X_train, y_train, n_jobs=1):
+    """Fit one config at a resource fraction. Returns (model, params, resource)."""
+
+    model = build_model(family, n_jobs=n_jobs)
+
+    if family == "ridge":
+        # Resource = most recent training rows
+        n_rows = max(10, int(len(X_train) * fraction))
+        X_fit, y_fit = X_train.iloc[-n_rows:], y_train.iloc[-n_rows:]
+        resource = n_rows
+    else:
+        resource = max(10, int(MAX_ESTIMATORS * fraction))
+        params = {**params, "n_estimators": resource}
+        X_fit, y_fit = X_train, y_train
+
+    model.set_params(**params)
+    fit_model(model, X_fit, y_fit)
+
+    return model, params, resource
+
+
+def _run_trial(family, params, fraction, X_train, y_train, X_val, y_val):
+    """Scores only: fitted models never travel back from the workers."""
+
+    started = time.perf_counter()
+
+    model, params, resource = _fit_trial(family, params, fraction, X_train, y_train)
+
+    rmse, mae, r2 = evaluate_model(model, X_val, y_val)
+
+    return {
+        "model_name": family,
+        "params": params,
+        "fraction": fraction,
+        "resource": resource,
+        "rmse": float(rmse),
+        "mae": float(mae),
+        "r2": float(r2),
+        "fit_seconds": time.perf_counter() - started,
+    }
+
+
+# ==========================================================
+# Successive halving
+# ==========================================================
+def successive_halving(
+    X_train, y_train, X_val, y_val,
+    horizon,
+    run_id,
+    families,
+    budget_seconds,
+    n_candidates=27,
+    eta=ETA,
+    min_resource=MIN_RESOURCE,
+    n_jobs=SEARCH_N_JOBS,
+    seed=42
+):
+    """
+    Returns the winning trial, refit once in this process
+    (its "model" and metrics come from that refit).
+    """
+
+    rng = np.random.default_rng(seed)
+    search_id = f"{run_id}_h{horizon}_search"
+    started = time.perf_counter()
+
+    per_family = max(1, n_candidates // len(families))
+    survivors = [
+        (family, sample_params(family, rng))
+        for family in families
+        for _ in range(per_family)
+    ]
+
+    n_rungs = int(round(math.log(1 / min_resource, eta))) + 1
+
+    registry = get_model_registry()
+    best_trials = []
+    last_rung_seconds = 0.0
+
+    for rung in range(n_rungs):
+
+        fraction = min(1.0, min_resource * eta ** rung)
+        elapsed = time.perf_counter() - started
+
+        # A rung costs roughly what the last one did (fewer configs, more resource)
+        if rung > 0 and elapsed + last_rung_seconds > budget_seconds:
+            print(f"⏹️ Budget reached after rung {rung - 1} ({elapsed:.0f}s)")
+            break
+
+        rung_started = time.perf_counter()
+
+        trials = Parallel(n_jobs=n_jobs)(
+            delayed(_run_trial)(family, params, fraction, X_train, y_train, X_val, y_val)
+            for family, params in survivors
+        )
+
+        last_rung_seconds = time.perf_counter() - rung_started
+
+        registry.insert_many([
+            {
+                "model_name": trial["model_name"],
+                "horizon": horizon,
+                "params": trial["params"],
+                "resource": trial["resource"],
+                "rung": rung,
+                "rmse": trial["rmse"],
+                "mae": trial["mae"],
+                "r2": trial["r2"],
+                "fit_seconds": trial["fit_seconds"],
+                "run_id": run_id,
+                "search_id": search_id,
+                "status": "trial",
+                "is_best": False,
+                "registered_at": datetime.utcnow()
+            }
+            for trial in trials
+        ], ordered=False)
+
+        trials.sort(key=lambda t: t["rmse"])
+        best_trials = trials
+
+        print(
+            f"🪜 Rung {rung}: {len(trials)} trials @ {fraction:.0%} resource, "
+            f"best {trials[0]['model_name']} RMSE={trials[0]['rmse']:.4f} "
+            f"({last_rung_seconds:.1f}s)"
+        )
+
+        keep = max(1, len(trials) // eta)
+        survivors = [(t["model_name"], t["params"]) for t in trials[:keep]]
+
+        if len(trials) == 1:
+            break
+
+    # Only the winner is refit; trials returned scores alone
+    winner = best_trials[0]
+    started = time.perf_counter()
+
+    model, _, _ = _fit_trial(
+        winner["model_name"], winner["params"], winner["fraction"],
+        X_train, y_train, n_jobs=n_jobs
+    )
+    rmse, mae, r2 = evaluate_model(model, X_val, y_val)
+
+    return {
+        **winner,
+        "model": model,
+        "rmse": float(rmse),
+        "mae": float(mae),
+        "r2": float(r2),
+        "fit_seconds": time.perf_counter() - started,
+        "search_id": search_id,
+    }
@@ -0,0 +1,405 @@
+"""
+Incremental Training
+--------------------
+Continues today's production models on the hours that arrived
+since they were trained, instead of refitting on full history:
+
+- RandomForest / ExtraTrees : warm_start, add trees fitted on a
+                              recent window (oldest trees retired
+                              past MAX_TREES)
+- GradientBoosting          : warm_start, add boosting stages
+- XGBoost                   : continue boosting from the booster
+- Ridge                     : update sufficient statistics
+                              (X'X, X'y, sums) and re-solve
+
+The child is registered as a new version with lineage to its
+parent and promoted if it holds up on the newest hours. A full
+refit (training_orchestrator) runs instead when the lineage gets
+too deep, the parent has drifted, or continuation is unsupported.
+
+CLI:
+    python -m app.pipelines.incremental_training [--full]
+"""
+
+import os
+import io
+import copy
+import time
+import argparse
+from datetime import datetime
+
+import joblib
+import numpy as np
+from gridfs import GridFS
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from app.db.mongo import get_database, get_model_registry
+from app.pipelines.training_dataset import build_training_dataset
+from app.pipelines.train_models import ridge_statistics
+from app.pipelines.feature_spec import FEATURE_SPEC, spec_from_doc, spec_id
+from app.pipelines.training_orchestrator import (
+    HORIZONS,
+    TRAIN_CPU_BUDGET,
+    promote_best,
+    run_training_grid
+)
+from app.utils.artifact_store import artifact_key, load_model, store_flat_artifact
+from app.utils.tree_artifact import export_flat
+
+
+RECENT_HOURS = int(os.getenv("INCREMENTAL_RECENT_HOURS", str(24 * 30)))
+HOLDOUT_HOURS = int(os.getenv("INCREMENTAL_HOLDOUT_HOURS", "48"))
+
+ADD_TREES = 50
+MAX_TREES = 600
+ADD_STAGES = 25
+ADD_ROUNDS = 25
+
+# Full refit triggers
+MAX_LINEAGE_DEPTH = int(os.getenv("MAX_LINEAGE_DEPTH", "7"))   # ~weekly
+DRIFT_FACTOR = float(os.getenv("DRIFT_FACTOR", "1.5"))        # recent RMSE vs registered
+CHILD_TOLERANCE = 0.02                                          # child may be 2% worse than parent
+
+FOREST_FAMILIES = {"random_forest", "random_forest_multi", "extra_trees_multi"}
+INCREMENTAL_FAMILIES = FOREST_FAMILIES | {"gradient_boosting", "xgboost", "ridge"}
+
+
+# ==========================================================
+# Continuation per family
+# ==========================================================
+def _continue_forest(model, X, y, n_jobs):
+
+    model.set_params(
+        warm_start=True,
+        n_estimators=len(model.estimators_) + ADD_TREES,
+        n_jobs=n_jobs
+    )
+    model.fit(X, y)
+
+    # Retire the oldest trees so the forest tracks recent regimes
+    if len(model.estimators_) > MAX_TREES:
+        model.estimators_ = model.estimators_[-MAX_TREES:]
+        model.set_params(n_estimators=MAX_TREES)
+
+    return model
+
+
+def _continue_gradient_boosting(model, X, y):
+
+    model.set_params(warm_start=True, n_estimators=model.n_estimators_ + ADD_STAGES)
+    model.fit(X, y)
+
+    return model
+
+
+def _continue_xgboost(model, X, y, n_jobs):
+
+    from xgboost import XGBRegressor
+
+    params = {**model.get_params(), "n_estimators": ADD_ROUNDS, "n_jobs": n_jobs}
+
+    child = XGBRegressor(**params)
+    child.fit(X, y, xgb_model=model.get_booster())
+
+    return child
+
+
+def _continue_ridge(model, X_new, y_new, X_history, y_history):
+
+    stats = getattr(model, "sufficient_stats_", None)
+
+    if stats is None:
+        # Parent fitted before fits kept their statistics: one
+        # pass over exactly its training rows
+        stats = ridge_statistics(X_history, y_history)
+
+    new = ridge_statistics(X_new, y_new)
+    stats = {key: stats[key] + new[key] for key in stats}
+
+    n = stats["n"]
+    x_mean = stats["sum_x"] / n
+    y_mean = stats["sum_y"] / n
+
+    # Centered normal equations == Ridge(fit_intercept=True)
+    sxx = stats["xtx"] - n * np.outer(x_mean, x_mean)
+    sxy = stats["xty"] - n * x_mean * y_mean
+
+    coef = np.linalg.solve(sxx + model.alpha * np.eye(len(x_mean)), sxy)
+
+    model.coef_ = coef
+    model.intercept_ = float(y_mean - x_mean @ coef)
+    model.sufficient_stats_ = stats
+
+    return model
+
+
+def continue_model(family, model, X_new, y_new, X_recent, y_recent, X_history, y_history, n_jobs=None):
+    """
+    Return a continued copy of `model` (the parent is left untouched).
+    """
+
+    model = copy.deepcopy(model)
+
+    if family in FOREST_FAMILIES:
+        return _continue_forest(model, X_recent, y_recent, n_jobs)
+
+    if family == "gradient_boosting":
+        return _continue_gradient_boosting(model, X_new, y_new)
+
+    if family == "xgboost":
+        return _continue_xgboost(model, X_new, y_new, n_jobs)
+
+    if family == "ridge":
+        return _continue_ridge(model, X_new, y_new, X_history, y_history)
+
+    raise ValueError(f"Incremental training not supported for {family}")
+
+
+# ==========================================================
+# Evaluation
+# ==========================================================
+def _score(preds, y):
+    return {
+        "rmse": float(mean_squared_error(y, preds, squared=False)),
+        "mae": float(mean_absolute_error(y, preds)),
+        "r2": float(r2_score(y, preds)),
+    }
+
+
+def _score_docs(model, X, Y, parent_docs):
+    """Holdout scores for each horizon doc the artifact serves."""
+
+    preds = np.asarray(model.predict(X))
+
+    if preds.ndim == 1:
+        return [_score(preds, Y.iloc[:, 0])]
+
+    return [
+        _score(preds[:, doc["output_index"]], Y.iloc[:, doc["output_index"]])
+        for doc in parent_docs
+    ]
+
+
+# ==========================================================
+# One production artifact
+# ==========================================================
+def _full_refit_reason(parent_docs):
+
+    parent = parent_docs[0]
+
+    if not parent.get("gridfs_id") and not parent.get("model_path"):
+        return "parent has no artifact"
+
+    if parent.get("model_name") not in INCREMENTAL_FAMILIES:
+        return f"{parent.get('model_name')} cannot be continued"
+
+    if not parent.get("trained_until"):
+        return "parent has no trained_until watermark"
+
+    if parent.get("lineage_depth", 0) >= MAX_LINEAGE_DEPTH:
+        return f"lineage depth {parent.get('lineage_depth')} reached"
+
+    return None
+
+
+def continue_production_artifact(parent_docs, df, run_id, n_jobs=None):
+    """
+    Continue one production artifact (one doc, or several horizon
+    docs sharing a multi-output artifact).
+
+    Returns (child docs to promote, reason for a full refit or None).
+    """
+
+    parent = parent_docs[0]
+
+    reason = _full_refit_reason(parent_docs)
+    if reason:
+        return [], reason
+
+    multi_output = bool(parent.get("multi_output"))
+    targets = parent["targets"] if multi_output else [f"target_h{parent['horizon']}"]
+    features = parent["features"]
+
+    trained_until = parent["trained_until"]
+    new_rows = df[df["datetime"] > trained_until]
+
+    if len(new_rows) <= HOLDOUT_HOURS:
+        print(f"⏭️ {parent['model_name']} H{parent['horizon']}: no new hours since {trained_until}")
+        return [], None
+
+    # Newest hours judge parent vs child; the rest is trained on
+    holdout = new_rows.iloc[-HOLDOUT_HOURS:]
+    fit_rows = new_rows.iloc[:-HOLDOUT_HOURS]
+    recent = df[df["datetime"] <= fit_rows["datetime"].max()].iloc[-RECENT_HOURS:]
+    # Exactly the rows the parent was fitted on (Ridge statistics)
+    history = df[df["datetime"] <= trained_until]
+
+    def y_of(rows):
+        return rows[targets] if multi_output else rows[targets[0]]
+
+    parent_model = load_model(parent)
+
+    parent_scores = _score_docs(parent_model, holdout[features], holdout[targets], parent_docs)
+    registered_rmse = np.mean([doc["rmse"] for doc in parent_docs])
+    recent_rmse = np.mean([s["rmse"] for s in parent_scores])
+
+    if recent_rmse > DRIFT_FACTOR * registered_rmse:
+        return [], f"drift: recent RMSE {recent_rmse:.3f} vs registered {registered_rmse:.3f}"
+
+    started = time.perf_counter()
+
+    child = continue_model(
+        parent["model_name"], parent_model,
+        fit_rows[features], y_of(fit_rows),
+        recent[features], y_of(recent),
+        history[features], y_of(history),
+        n_jobs=n_jobs
+    )
+
+    fit_seconds = time.perf_counter() - started
+
+    child_scores = _score_docs(child, holdout[features], holdout[targets], parent_docs)
+    child_rmse = np.mean([s["rmse"] for s in child_scores])
+
+    print(
+        f"🔄 {parent['model_name']} H{parent['horizon']}: +{len(fit_rows)}h in {fit_seconds:.1f}s, "
+        f"holdout RMSE {recent_rmse:.4f} -> {child_rmse:.4f}"
+    )
+
+    if child_rmse > recent_rmse * (1 + CHILD_TOLERANCE):
+        return [], f"child worse than parent ({child_rmse:.3f} > {recent_rmse:.3f})"
+
+    buffer = io.BytesIO()
+    joblib.dump(child, buffer)
+
+    fs = GridFS(get_database())
+    filename = f"{parent['model_name']}_h{''.join(str(d['horizon']) for d in parent_docs)}"
+
+    gridfs_id = fs.put(buffer.getvalue(), filename=filename, uploadDate=datetime.utcnow())
+    flat_gridfs_id = store_flat_artifact(fs, export_flat(child, holdout[features]), filename)
+
+    child_trained_until = fit_rows["datetime"].max().to_pydatetime()
+
+    docs = []
+
+    for doc, scores in zip(parent_docs, child_scores):
+
+        child_doc = {
+            key: value for key, value in doc.items()
+            # The child is its own GridFS artifact: drop the parent's
+            # other artifact references
+            if key not in (
+                "_id", "backtest", "flat_gridfs_id", "model_path", "checksum",
+                "status", "is_best", "registered_at"
+            )
+        }
+
+        child_doc.setdefault("feature_spec", spec_from_doc(doc))
+
+        if flat_gridfs_id is not None:
+            child_doc["flat_gridfs_id"] = flat_gridfs_id
+
+        child_doc.update(
+            scores,
+            gridfs_id=gridfs_id,
+            run_id=run_id,
+            fit_seconds=fit_seconds,
+            trained_until=child_trained_until,
+            training_mode="incremental",
+            parent_id=doc["_id"],
+            root_id=doc.get("root_id", doc["_id"]),
+            lineage_depth=doc.get("lineage_depth", 0) + 1,
+            status="candidate",
+            is_best=False,
+            registered_at=datetime.utcnow()
+        )
+
+        docs.append(child_doc)
+
+    get_model_registry().insert_many(docs, ordered=False)
+
+    return docs, None
+
+
+# ==========================================================
+# Daily entry point
+# ==========================================================
+def _production_artifacts(horizons):
+    """Served docs grouped by artifact (multi-output docs share one)."""
+
+    groups = {}
+
+    # is_best is what the API serves (a rollback only moves is_best)
+    for doc in get_model_registry().find({
+        "horizon": {"$in": list(horizons)},
+        "is_best": True
+    }):
+        # Same key the artifact store caches by (gridfs_id, or
+        # model_path for docs registered from a local file)
+        key = artifact_key(doc) if doc.get("gridfs_id") or doc.get("model_path") else str(doc["_id"])
+        groups.setdefault(key, []).append(doc)
+
+    # Keep output order aligned with the artifact's targets
+    return [sorted(docs, key=lambda d: d.get("output_index") or 0) for docs in groups.values()]
+
+
+def run_incremental_training(horizons=HORIZONS, cpu_budget=TRAIN_CPU_BUDGET, full=False):
+
+    if full:
+        print("🧱 Scheduled full refit")
+        return run_training_grid(horizons=horizons, cpu_budget=cpu_budget)
+
+    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+
+    # Children are fitted on the features their parent was trained
+    # with; refits use the current spec
+    datasets = {}
+
+    def dataset(spec):
+        key = spec_id(spec)
+        if key not in datasets:
+            datasets[key] = build_training_dataset(spec)
+        return datasets[key]
+
+    children = []
+    refit = set()
+    served = set()
+
+    for parent_docs in _production_artifacts(horizons):
+
+        served.update(doc["horizon"] for doc in parent_docs)
+
+        df = dataset(spec_from_doc(parent_docs[0]))
+
+        docs, reason = continue_production_artifact(parent_docs, df, run_id, n_jobs=cpu_budget)
+
+        if reason:
+            print(f"🧱 Full refit for H{[d['horizon'] for d in parent_docs]}: {reason}")
+            refit.update(doc["horizon"] for doc in parent_docs)
+
+        children.extend(docs)
+
+    refit.update(set(horizons) - served)
+
+    if children:
+        for horizon, doc in promote_best(children).items():
+            print(f"🏆 H{horizon}: {doc['model_name']} v{doc['lineage_depth']} promoted")
+
+    if refit:
+        run_training_grid(horizons=sorted(refit), cpu_budget=cpu_budget, df=dataset(FEATURE_SPEC))
+
+    return children
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS)
+    parser.add_argument("--cpu-budget", type=int, default=TRAIN_CPU_BUDGET)
+    parser.add_argument("--full", action="store_true", help="scheduled full refit from scratch")
+    args = parser.parse_args()
+
+    run_incremental_training(
+        horizons=args.horizons,
+        cpu_budget=args.cpu_budget,
+        full=args.full
+    )
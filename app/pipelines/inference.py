@@ -8,11 +8,19 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from gridfs import GridFS
 
 from app.pipelines.training_dataset import build_training_dataset
+from app.pipelines.feature_spec import FEATURE_SPEC
+from app.pipelines.feature_store_writer import (
+    get_feature_watermark,
+    incremental_window,
+    upsert_feature_rows
+)
 from app.db.mongo import (
     get_model_registry,
     get_database,
-    get_feature_store
+    bump_registry_version
 )
+from app.utils.artifact_store import store_flat_artifact
+from app.utils.tree_artifact import export_flat
 
 
 # -------------------------------------------
@@ -77,6 +85,10 @@ def train_horizon(df, horizon: int):
         filename=f"rf_h{horizon}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
     )
 
+    flat_file_id = store_flat_artifact(
+        fs, export_flat(model, X_test), f"rf_h{horizon}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    )
+
     print("📁 Model stored in GridFS")
 
     # -------------------------------------------
@@ -96,12 +108,16 @@ def train_horizon(df, horizon: int):
         "mae": mae,
         "r2": r2,
         "gridfs_id": file_id,
+        "flat_gridfs_id": flat_file_id,
         "features": feature_cols,
+        "feature_spec": FEATURE_SPEC,
         "status": "production",
         "is_best": True,
         "registered_at": datetime.utcnow()
     })
 
+    bump_registry_version()
+
     print("📦 Model registered in MongoDB")
 
 
@@ -117,23 +133,19 @@ def run_training(horizon: int):
     print("✅ Training dataset built:", df.shape)
 
     # -------------------------------------------
-    # Populate Feature Store
+    # Populate Feature Store (new + recent rows)
     # -------------------------------------------
-    feature_store = get_feature_store()
-
     feature_columns = [
         col for col in df.columns
         if not col.startswith("target_")
     ]
 
-    feature_docs = df[feature_columns].to_dict(orient="records")
-
-    feature_store.delete_many({})
-
-    if feature_docs:
-        feature_store.insert_many(feature_docs)
+    written = upsert_feature_rows(
+        df[feature_columns],
+        since=incremental_window(get_feature_watermark())[1]
+    )
 
-    print(f"📦 Feature store populated: {len(feature_docs)} documents")
+    print(f"📦 Feature store populated: {written} documents")
 
     # -------------------------------------------
     # Train model
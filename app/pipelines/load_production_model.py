@@ -1,38 +1,13 @@
-import joblib
-from pathlib import Path
-from functools import lru_cache
-
 from app.db.mongo import get_model_registry
+from app.utils.artifact_store import load_model
+from app.utils.multi_output import select_output
 
 
 # ==================================================
-# Resolve model file safely on Railway / Local
-# ==================================================
-def _resolve_model_path(path_str: str) -> Path:
-    path = Path(path_str)
-
-    # Absolute path
-    if path.is_absolute() and path.exists():
-        return path
-
-    # Try cwd
-    cwd_path = Path.cwd() / path
-    if cwd_path.exists():
-        return cwd_path
-
-    # Try app directory
-    app_path = Path(__file__).resolve().parents[2] / path
-    if app_path.exists():
-        return app_path
-
-    raise RuntimeError(f"Model file not found: {path_str}")
-
-
-# ==================================================
-# Cached loader
+# Loader (memory / disk / remote caching lives in
+# app.utils.artifact_store)
 # ==================================================
-@lru_cache(maxsize=10)
-def load_production_model(horizon: int):
+def find_production_doc(horizon: int):
 
     registry = get_model_registry()
 
@@ -47,23 +22,26 @@ def load_production_model(horizon: int):
             f"No production model found for horizon={horizon}"
         )
 
-    model_path_str = model_doc.get("model_path")
+    if not model_doc.get("model_path") and not model_doc.get("gridfs_id"):
+        raise RuntimeError("Model registry missing model_path / gridfs_id")
 
-    if not model_path_str:
-        raise RuntimeError("Model registry missing model_path")
+    if not model_doc.get("features"):
+        raise RuntimeError("Model registry missing features")
 
-    model_path = _resolve_model_path(model_path_str)
+    return model_doc
 
-    model = joblib.load(model_path)
 
-    features = model_doc.get("features")
-    if not features:
-        raise RuntimeError("Model registry missing features")
-
-    model_version = model_doc.get(
+def _model_version(model_doc, horizon):
+    return model_doc.get(
         "model_version",
         f"{model_doc.get('model_name','model')}_h{horizon}"
     )
 
-    return model, features, model_version
-    print("Loading model from:", model_doc["model_path"])
+
+def load_production_model(horizon: int):
+
+    model_doc = find_production_doc(horizon)
+
+    model = select_output(load_model(model_doc), model_doc)
+
+    return model, model_doc["features"], _model_version(model_doc, horizon)
@@ -1,13 +1,19 @@
-from app.db.mongo import get_model_registry
+from app.db.mongo import get_model_registry, bump_registry_version
 
 
 def rollback_model(horizon: int, run_id: str):
 
     registry = get_model_registry()
 
+    # Search trials share the run_id but carry no artifact
     target_model = registry.find_one({
         "horizon": horizon,
-        "run_id": run_id
+        "run_id": run_id,
+        "status": {"$ne": "trial"},
+        "$or": [
+            {"gridfs_id": {"$exists": True}},
+            {"model_path": {"$exists": True}}
+        ]
     })
 
     if not target_model:
@@ -23,4 +29,6 @@ def rollback_model(horizon: int, run_id: str):
         {"$set": {"is_best": True}}
     )
 
+    bump_registry_version()
+
     print("✅ Rollback successful")
@@ -0,0 +1,129 @@
+"""
+Online Feature Store
+--------------------
+- Keeps one "latest feature row" document per location
+- Written by the feature pipelines whenever feature_store changes
+- Read by key at inference, projected to the model's features
+
+Reads cost the same no matter how much history feature_store holds.
+"""
+
+import os
+import math
+from datetime import datetime
+
+import pandas as pd
+
+from app.db.mongo import get_feature_store, get_online_feature_store
+
+
+DEFAULT_LOCATION = os.getenv("AQI_LOCATION", "karachi")
+
+
+def _location_id(location: str) -> str:
+    return location.strip().lower()
+
+
+def _clean_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is pd.NaT:
+        return None
+    return value
+
+
+# -------------------------------------------------
+# Writes
+# -------------------------------------------------
+def update_latest_row(row: dict, location: str = DEFAULT_LOCATION):
+    """
+    Replace the online row for a location, unless the stored
+    row is already newer (e.g. a backfill of old data).
+    """
+
+    location_id = _location_id(location)
+    collection = get_online_feature_store()
+
+    row_datetime = pd.to_datetime(row.get("datetime"))
+
+    current = collection.find_one({"_id": location_id}, {"datetime": 1})
+
+    if (
+        current is not None
+        and current.get("datetime") is not None
+        and row_datetime is not None
+        and pd.to_datetime(current["datetime"]) > row_datetime
+    ):
+        return False
+
+    doc = {
+        key: _clean_value(value)
+        for key, value in row.items()
+        if key != "_id"
+    }
+
+    doc.update({
+        "_id": location_id,
+        "location": location_id,
+        "updated_at": datetime.utcnow()
+    })
+
+    collection.replace_one({"_id": location_id}, doc, upsert=True)
+
+    return True
+
+
+def update_latest_from_df(df: pd.DataFrame, location: str = DEFAULT_LOCATION):
+    """
+    Publish the newest row of a feature dataframe.
+    """
+
+    if df is None or df.empty:
+        return False
+
+    latest = df.loc[pd.to_datetime(df["datetime"]).idxmax()]
+
+    return update_latest_row(latest.to_dict(), location)
+
+
+# -------------------------------------------------
+# Reads
+# -------------------------------------------------
+def get_latest_features(columns=None, location: str = DEFAULT_LOCATION):
+    """
+    Latest feature row for a location, by key.
+    Falls back to (and repopulates from) feature_store if the
+    online row has not been written yet.
+    """
+
+    location_id = _location_id(location)
+
+    projection = None
+    if columns is not None:
+        projection = {col: 1 for col in columns}
+        projection["datetime"] = 1
+
+    doc = get_online_feature_store().find_one({"_id": location_id}, projection)
+
+    if doc is not None:
+        return doc
+
+    latest = get_feature_store().find_one(
+        {},
+        {"_id": 0},
+        sort=[("datetime", -1)]
+    )
+
+    if latest is None:
+        return None
+
+    update_latest_row(latest, location)
+
+    if columns is None:
+        return latest
+
+    return {
+        key: value
+        for key, value in latest.items()
+        if key in projection
+    }
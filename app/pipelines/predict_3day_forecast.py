@@ -1,33 +1,26 @@
+from datetime import datetime
+
 import pandas as pd
 
 from app.utils.model_loader import load_production_model
 from app.db.mongo import get_db
+from app.db.history_loader import load_history_frame
 from app.pipelines.fetch_live_openmeteo import fetch_live_weather
 from app.pipelines.aqi_calculation import add_aqi_column
-from app.pipelines.feature_engineering_time import add_time_features
-from app.pipelines.feature_engineering_lag import add_lag_features
-from app.pipelines.feature_engineering_rolling import add_rolling_features
+from app.pipelines.feature_spec import compile_spec
 
 
-def load_last_historical_rows(n=24):
-   db = get_db()
-    collection = db["forecast_results"]
+def load_last_historical_rows(n=None):
+    """Last n history rows (default: the feature spec's lookback + 1)."""
 
-    collection.insert_many(
-    df_forecast[["datetime", "predicted_aqi"]]
-    .assign(
-        horizon=horizon,
-        generated_at=datetime.utcnow()
-    )
-    .to_dict("records")
-)
+    n = n or compile_spec().lookback + 1
 
+    df = load_history_frame()
 
-    df = pd.DataFrame(data)
-    df["datetime"] = pd.to_datetime(df["datetime"])
-    df = df.sort_values("datetime").reset_index(drop=True)
+    if df.empty:
+        raise RuntimeError("No historical data found")
 
-    return df
+    return df.tail(n).reset_index(drop=True)
 
 
 def predict_next_3_days(horizon: int = 3):
@@ -38,7 +31,7 @@ def predict_next_3_days(horizon: int = 3):
     model, feature_list = load_production_model(horizon)
 
     # 2️⃣ Load last historical rows (for lag warm start)
-    historical_df = load_last_historical_rows(24)
+    historical_df = load_last_historical_rows()
 
     # 3️⃣ Fetch live 3-day forecast weather
     forecast_df = fetch_live_weather()
@@ -51,9 +44,9 @@ def predict_next_3_days(horizon: int = 3):
     df = add_aqi_column(df)
     df["aqi"] = df["aqi_pm25"]
 
-    df = add_time_features(df)
-    df = add_lag_features(df)
-    df = add_rolling_features(df)
+    # Same feature spec as training (its aqi_pm25 alias replaces
+    # the EPA sub-index column, as in the feature store)
+    df = compile_spec().transform(df)
 
     # Only drop rows missing lag features
     required_cols = [col for col in feature_list if col in df.columns]
@@ -61,7 +54,7 @@ def predict_next_3_days(horizon: int = 3):
 
 
     # 6️⃣ Keep only forecast horizon rows
-    df_forecast = df.tail(horizon * 24)
+    df_forecast = df.tail(horizon * 24).copy()
 
     # Ensure correct feature order
     X = df_forecast[feature_list]
@@ -74,6 +67,15 @@ def predict_next_3_days(horizon: int = 3):
     print("\n📊 3-Day AQI Forecast:")
     print(df_forecast[["datetime", "predicted_aqi"]])
 
+    get_db()["forecast_results"].insert_many(
+        df_forecast[["datetime", "predicted_aqi"]]
+        .assign(
+            horizon=horizon,
+            generated_at=datetime.utcnow()
+        )
+        .to_dict("records")
+    )
+
     return df_forecast[["datetime", "predicted_aqi"]]
 
 
@@ -1,87 +1,315 @@
 """
-Multi-Day Rolling Forecast
-Generates recursive N-day forecast using production model
+Multi-Day Scenario Forecast
+---------------------------
+Recursive N-day forecast from the production step model
+(target_h1: pm2_5 S = 24 hours ahead), run for many scenarios
+in lock-step:
+
+- every simulated series is one row of an (n_scenarios, hours)
+  matrix; lags and rolling stats for all rows come from
+  FeaturePlan.path_features() in one vectorized call
+- a block of S hours only needs features up to S hours back, so
+  each block is ONE batched predict of (n_scenarios * S) rows;
+  72 hours = 3 predicts, however many scenarios run
+- scenario 0 is the deterministic path (predicted_aqi); the rest
+  spread according to the mode:
+    * "trees"     : each scenario follows one random tree of the
+                    forest per block (flat artifact, mean ensembles)
+    * "residual"  : block-bootstrapped recent residuals are added
+                    to the predictions
+    * "perturbed" : lognormal noise on the observed history
+- exogenous columns (pm10, ozone, weather, ...) repeat their last
+  observed day
+
+Each hour gets percentile bands across the scenarios.
 """
 
-import pandas as pd
-import numpy as np
+import os
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
+
 from app.db.mongo import get_db
-from app.pipelines.load_production_model import load_production_model
+from app.db.history_loader import load_history_frame
+from app.pipelines.feature_spec import compile_spec, spec_from_doc
+from app.pipelines.load_production_model import find_production_doc, _model_version
+from app.utils.artifact_store import load_flat_model, load_model
+from app.utils.multi_output import output_index, select_output
 
 
-def generate_multi_day_forecast(horizon: int = 3):
+# ==========================================================
+# Settings
+# ==========================================================
+N_SCENARIOS = int(os.getenv("FORECAST_SCENARIOS", "200"))
+SCENARIO_MODE = os.getenv("FORECAST_SCENARIO_MODE", "trees")
+PERCENTILES = [
+    int(p) for p in os.getenv("FORECAST_PERCENTILES", "10,50,90").split(",")
+]
 
-    db = get_db()
+# Hours of observed history each path starts from (rolling
+# windows + EWM warm-up) and that the residual pool is taken from
+CONTEXT_HOURS = int(os.getenv("FORECAST_CONTEXT_HOURS", "336"))
+RESIDUAL_HOURS = int(os.getenv("FORECAST_RESIDUAL_HOURS", "336"))
 
-    # 1️⃣ Load correct horizon model
-    model, features, model_version = load_production_model(horizon=horizon)
+PERTURB_SIGMA = float(os.getenv("FORECAST_PERTURB_SIGMA", "0.1"))
 
-    # 2️⃣ Get latest feature row
-    latest_doc = list(
-        db["feature_store"]
-        .find()
-        .sort("datetime", -1)
-        .limit(1)
-    )
+SCENARIO_MODES = ("trees", "residual", "perturbed")
 
-    if not latest_doc:
-        raise RuntimeError("No feature data found")
 
-    latest_doc = latest_doc[0]
+# ==========================================================
+# Step model
+# ==========================================================
+def load_step_model():
+    """
+    Production H1 model, its feature plan and step S (hours
+    between a feature row and the value it predicts).
+    """
 
-    current_features = {
-        col: latest_doc.get(col, 0)
-        for col in features
+    doc = find_production_doc(1)
+
+    plan = compile_spec(spec_from_doc(doc))
+    target = f"target_h{doc['horizon']}"
+
+    if target not in plan.targets:
+        raise RuntimeError(f"Feature spec has no {target} horizon")
+
+    model = load_model(doc)
+    flat = load_flat_model(doc)
+
+    if flat is not None and flat.feature_names not in (None, doc["features"]):
+        flat = None  # exported with another column order
+
+    return {
+        "doc": doc,
+        "model": select_output(model, doc),
+        "flat": flat,
+        "output": output_index(doc) or 0,
+        "features": doc["features"],
+        "plan": plan,
+        "step": plan.targets[target],
     }
 
-    predictions = []
 
-    base_time = datetime.utcnow()
+def _predict(step_model, X, per_tree=False):
+    """
+    Batched predictions for a feature matrix; with per_tree,
+    every tree's output (n_rows, n_trees) from the flat artifact.
+    """
+
+    if per_tree:
+        return step_model["flat"].predict_per_tree(X)[:, :, step_model["output"]]
+
+    frame = pd.DataFrame(X, columns=step_model["features"])
+
+    return np.asarray(step_model["model"].predict(frame), dtype=np.float64)
+
+
+def _feature_matrix(step_model, paths, times):
+    """(n_paths * len(times), n_features) rows, scenario-major."""
+
+    values = step_model["plan"].path_features(paths, times)
+    m = len(times)
+
+    columns = []
+
+    for col in step_model["features"]:
+        if col in values:
+            columns.append(values[col])
+        elif col in paths:
+            columns.append(paths[col][:, -m:])
+        else:
+            raise RuntimeError(f"Cannot simulate feature: {col}")
+
+    return np.stack(columns, axis=-1).reshape(-1, len(columns))
+
+
+# ==========================================================
+# Scenario noise
+# ==========================================================
+def residual_pool(step_model, history):
+    """
+    Realized minus predicted values over the last RESIDUAL_HOURS
+    rows whose target is already observed, in time order.
+    """
+
+    plan = step_model["plan"]
+    step = step_model["step"]
+
+    df = plan.transform(history.tail(RESIDUAL_HOURS + step + plan.lookback).reset_index(drop=True))
+    y = df[plan.target_column].to_numpy(dtype=np.float64)
+
+    X = df[step_model["features"]].iloc[:len(df) - step]
+    realized = y[step:]
+
+    keep = X.notna().all(axis=1).to_numpy() & ~np.isnan(realized)
+
+    if keep.sum() < step:
+        raise RuntimeError("Not enough history for the residual pool")
+
+    predicted = _predict(step_model, X[keep].to_numpy(dtype=np.float64))
+
+    return realized[keep] - predicted
+
+
+def _bootstrap_blocks(pool, n, step, rng):
+    """n contiguous step-hour residual blocks: (n, step)."""
 
-    # 3️⃣ Rolling forecast
-    for step in range(1, horizon + 1):
+    starts = rng.integers(0, len(pool) - step + 1, size=n)
 
-        X = pd.DataFrame([current_features])
+    return pool[starts[:, None] + np.arange(step)]
 
-        # Model predicts log(AQI)
-        log_pred = float(model.predict(X)[0])
 
-        # Inverse transform
-        pred = float(np.expm1(log_pred))
+# ==========================================================
+# Scenario forecast
+# ==========================================================
+def scenario_mode(step_model, mode):
+    """Mode actually used: per-tree scenarios need a flat forest."""
 
-        future_datetime = base_time + timedelta(days=step)
+    if mode not in SCENARIO_MODES:
+        raise ValueError(f"Unknown scenario mode: {mode}")
 
-        predictions.append({
-            "datetime": future_datetime,
-            "predicted_aqi": pred
-        })
+    flat = step_model["flat"]
 
-        # 4️⃣ Shift lag features safely
-        lag_cols = [col for col in features if "_lag_" in col]
+    if mode == "trees" and (flat is None or flat.aggregation != "mean"):
+        print("⚠️ Per-tree scenarios need a flat forest artifact; using residuals")
+        return "residual"
 
-        if lag_cols:
-            lag_cols_sorted = sorted(
-                lag_cols,
-                key=lambda x: int(x.split("_")[-1]),
-                reverse=True
-            )
+    return mode
+
+
+def simulate_paths(
+    step_model,
+    history,
+    hours,
+    n_scenarios=N_SCENARIOS,
+    mode=SCENARIO_MODE,
+    seed=None
+):
+    """
+    Advance n_scenarios paths `hours` past the last history row.
+    Returns (future datetimes, (n_scenarios, hours) values);
+    row 0 is the deterministic path.
+    """
+
+    mode = scenario_mode(step_model, mode)
+
+    plan = step_model["plan"]
+    step = step_model["step"]
+    column = plan.target_column
+
+    rng = np.random.default_rng(seed)
+    n_scenarios = max(1, n_scenarios)
+
+    context = max(CONTEXT_HOURS, plan.lookback + step)
+    history = history.sort_values("datetime").reset_index(drop=True)
+    recent = history.tail(context)
+
+    if len(recent) < plan.lookback + step:
+        raise RuntimeError("Not enough history to start the forecast")
+
+    last_time = pd.Timestamp(recent["datetime"].iloc[-1])
+    times = recent["datetime"].to_numpy(dtype="datetime64[ns]")[-step:]
+
+    # Every raw column a feature needs, one row per scenario
+    sources = {plan.target_column, *plan.aliases.values(), *(s["column"] for s in plan.series)}
+    sources |= {col for col in step_model["features"] if col in recent.columns}
+
+    paths = {
+        col: np.tile(recent[col].to_numpy(dtype=np.float64), (n_scenarios, 1))
+        for col in sources
+    }
+
+    if mode == "perturbed":
+        for values in paths.values():
+            values[1:] *= rng.lognormal(0.0, PERTURB_SIGMA, size=values[1:].shape)
+
+    pool = residual_pool(step_model, history) if mode == "residual" else None
+
+    n_blocks = -(-hours // step)
+    future = []
+
+    for _ in range(n_blocks):
+
+        X = _feature_matrix(step_model, paths, times)
+
+        if mode == "trees":
+            per_tree = _predict(step_model, X, per_tree=True).reshape(n_scenarios, step, -1)
+            pick = rng.integers(0, per_tree.shape[2], size=n_scenarios)
+            block = per_tree[np.arange(n_scenarios), :, pick]
+            block[0] = per_tree[0].mean(axis=1)
+        else:
+            block = _predict(step_model, X).reshape(n_scenarios, step)
+            if mode == "residual":
+                block[1:] += _bootstrap_blocks(pool, n_scenarios - 1, step, rng)
+
+        block = np.maximum(block, 0.0)
+
+        # The block's target hours become the next block's feature rows
+        for col, values in paths.items():
+            nxt = block if col == column else values[:, -step:]
+            paths[col] = np.concatenate([values, nxt], axis=1)
+
+        times = times + np.timedelta64(step, "h")
+        future.append(block)
+
+    values = np.concatenate(future, axis=1)[:, :hours]
+    datetimes = [last_time + timedelta(hours=h) for h in range(1, hours + 1)]
+
+    return datetimes, values
+
+
+def generate_multi_day_forecast(
+    horizon: int = 3,
+    n_scenarios: int = N_SCENARIOS,
+    mode: str = SCENARIO_MODE,
+    percentiles=PERCENTILES,
+    seed=None
+):
+
+    db = get_db()
+
+    step_model = load_step_model()
+    plan = step_model["plan"]
+    mode = scenario_mode(step_model, mode)
+
+    # 1️⃣ Observed history the paths start from
+    hours = horizon * 24
+    start = datetime.utcnow() - timedelta(
+        hours=max(CONTEXT_HOURS, plan.lookback + step_model["step"]) + RESIDUAL_HOURS + 48
+    )
+    history = load_history_frame(start=start)
+
+    if history.empty:
+        raise RuntimeError("No historical data found")
+
+    # 2️⃣ All scenarios, all hours
+    datetimes, values = simulate_paths(
+        step_model, history, hours,
+        n_scenarios=n_scenarios, mode=mode, seed=seed
+    )
+
+    bands = np.percentile(values, percentiles, axis=0)
+
+    predictions = []
 
-            for i in range(len(lag_cols_sorted) - 1):
-                current_features[lag_cols_sorted[i]] = current_features[lag_cols_sorted[i + 1]]
+    for i, dt in enumerate(datetimes):
 
-            smallest_lag = sorted(
-                lag_cols,
-                key=lambda x: int(x.split("_")[-1])
-            )[0]
+        entry = {
+            "datetime": dt.to_pydatetime(),
+            "predicted_aqi": float(values[0, i]),
+        }
+        entry.update({f"p{p}": float(bands[j, i]) for j, p in enumerate(percentiles)})
 
-            current_features[smallest_lag] = pred
+        predictions.append(entry)
 
     forecast_doc = {
         "horizon": horizon,
-        "generated_at": base_time,
-        "model_version": model_version,
+        "generated_at": datetime.utcnow(),
+        "model_version": _model_version(step_model["doc"], 1),
+        "scenario_mode": mode,
+        "n_scenarios": len(values),
+        "percentiles": list(percentiles),
         "predictions": predictions
     }
 
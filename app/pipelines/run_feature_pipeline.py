@@ -3,45 +3,72 @@ Feature Pipeline Runner
 -----------------------
 - Builds latest feature dataframe
 - Writes features to MongoDB feature store
-- Optimized bulk insert for CI/CD
+- Incremental by default: only rows after the last
+  materialized datetime (less the revision window) are
+  recomputed and upserted
+- --streaming: advance the persisted lag/rolling state
+  one hour at a time instead of re-reading the lookback
 """
 
 import sys
 import os
+import argparse
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 )
 
-from app.pipelines.final_feature_table import build_final_dataframe
-from app.db.mongo import get_feature_store
+from app.pipelines.final_feature_table import (
+    build_final_dataframe,
+    LOOKBACK_HOURS
+)
+from app.pipelines.feature_store_writer import (
+    get_feature_watermark,
+    incremental_window,
+    upsert_feature_rows
+)
+from app.pipelines.streaming_features import advance_feature_store
 
 
-def run():
+def run(full_refresh: bool = False, streaming: bool = False):
     print("🚀 Starting feature pipeline")
 
-    df = build_final_dataframe()
+    if streaming and not full_refresh:
+        written = advance_feature_store()
+        print(f"✅ Streamed {written} new feature rows")
+        print("🎯 Feature pipeline completed successfully")
+        return
 
-    if df is None or df.empty:
-        raise RuntimeError("❌ Feature pipeline produced empty dataframe")
+    watermark = None if full_refresh else get_feature_watermark()
+
+    # Recent rows are rewritten too: their source hours may be revised
+    start, since = incremental_window(watermark, LOOKBACK_HOURS)
 
-    collection = get_feature_store()
+    if watermark is None:
+        print("🧮 Full refresh: recomputing all feature rows")
+    else:
+        print(f"🧮 Incremental refresh after {since}")
 
-    # 🔥 CLEAR OLD DATA (prevent duplication)
-    print("🧹 Clearing old feature store data...")
-    collection.delete_many({})
+    df = build_final_dataframe(start=start)
 
-    # 🔥 BULK INSERT (FAST)
-    records = df.to_dict("records")
+    if df is None or df.empty:
+        raise RuntimeError("❌ Feature pipeline produced empty dataframe")
 
-    if records:
-        collection.insert_many(records)
-        print(f"✅ Inserted {len(records)} records successfully")
+    # 🔥 UNORDERED BULK UPSERT (no delete, store never empty)
+    written = upsert_feature_rows(df, since=since)
+
+    if written:
+        print(f"✅ Upserted {written} records successfully")
     else:
-        print("⚠ No records to insert")
+        print("⚠ No new records to write")
 
     print("🎯 Feature pipeline completed successfully")
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="recompute the whole feature store")
+    parser.add_argument("--streaming", action="store_true", help="use the persisted streaming feature state")
+    args = parser.parse_args()
+
+    run(full_refresh=args.full, streaming=args.streaming)
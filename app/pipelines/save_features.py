@@ -1,5 +1,6 @@
 from datetime import datetime
 from app.db.mongo import get_feature_store   # 🔥 THIS IMPORT WAS MISSING
+from app.pipelines.online_features import update_latest_row
 
 
 def save_features(city: str, row: dict):
@@ -15,3 +16,5 @@ def save_features(city: str, row: dict):
 
     result = collection.insert_one(doc)
     print("Inserted ID:", result.inserted_id)
+
+    update_latest_row(doc, location=city)
@@ -1,4 +1,39 @@
-from app.db.mongo import get_model_registry
+from app.db.mongo import get_model_registry, bump_registry_version
+
+
+def _backtest_signature(doc):
+    """Data and fold settings a backtest was scored on (None if none)."""
+
+    backtest = doc.get("backtest")
+    if not backtest:
+        return None
+
+    return (backtest.get("data_until"), backtest.get("n_folds"), backtest.get("mode"))
+
+
+def rank_key(doc, use_backtest=True):
+    """
+    Walk-forward backtest RMSE, or holdout RMSE.
+    """
+
+    if use_backtest and doc.get("backtest"):
+        backtest = doc["backtest"]
+        return (backtest["rmse_mean"], backtest.get("rmse_std", 0.0))
+
+    return (doc["rmse"], 0.0)
+
+
+def best_candidate(docs):
+    """
+    Best of one horizon's candidates. Backtest scores decide only
+    when every candidate was backtested on the same data and folds;
+    otherwise all are compared on holdout RMSE.
+    """
+
+    signatures = {_backtest_signature(doc) for doc in docs}
+    use_backtest = len(signatures) == 1 and None not in signatures
+
+    return min(docs, key=lambda doc: rank_key(doc, use_backtest))
 
 
 def select_best_model(horizon):
@@ -15,11 +50,12 @@ def select_best_model(horizon):
     if not candidates:
         raise RuntimeError("No candidate models found")
 
-    best_model = candidates[0]
+    best_model = best_candidate(candidates)
 
-    # Reset previous production models
+    # Reset previous production models (search trials keep their
+    # status, so they can never be mistaken for servable models)
     registry.update_many(
-        {"horizon": horizon},
+        {"horizon": horizon, "status": {"$ne": "trial"}},
         {"$set": {"is_best": False, "status": "archived"}}
     )
 
@@ -29,4 +65,6 @@ def select_best_model(horizon):
         {"$set": {"is_best": True, "status": "production"}}
     )
 
+    bump_registry_version()
+
     return best_model
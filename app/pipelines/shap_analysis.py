@@ -5,8 +5,10 @@ from datetime import datetime
 
 from app.db.mongo import get_db, get_model_registry   # 🔥 ADD THIS
 from app.pipelines.load_production_model import load_production_model
-from pathlib import Path
-import joblib   # ✅ ADD THIS
+from app.utils.artifact_store import load_flat_model, load_model
+from app.utils.fast_predictor import FastPredictor, sample_rows
+from app.utils.multi_output import output_index, select_output
+from app.pipelines.online_features import get_latest_features
 
 
 
@@ -31,42 +33,33 @@ def generate_shap_analysis():
     if not model_doc:
         raise RuntimeError("No production model found for SHAP")
 
-    model_path = Path(model_doc["model_path"])
-
-    if not model_path.exists():
-        raise RuntimeError(f"Model file not found: {model_path}")
-
-    model = joblib.load(model_path)
+    model = load_model(model_doc)
 
     features = model_doc["features"]
 
     # ------------------------------------------------------
     # 2️⃣ Get Latest Feature Row
     # ------------------------------------------------------
-    latest_doc = list(
-        db["feature_store"]
-        .find()
-        .sort("datetime", -1)
-        .limit(1)
-    )
+    latest_doc = get_latest_features(features)
 
     if not latest_doc:
         raise RuntimeError("No feature data available")
 
-    latest_doc = latest_doc[0]
-
-    X = pd.DataFrame([{
-        col: latest_doc.get(col)
+    # Missing features count as 0
+    values = {
+        col: 0.0 if pd.isna(latest_doc.get(col)) else latest_doc[col]
         for col in features
-    }])
+    }
 
-    X = X.fillna(0)
+    X = np.array([[values[col] for col in features]], dtype=np.float64)
 
     # ------------------------------------------------------
-    # 3️⃣ Prediction
+    # 3️⃣ Prediction (single-row fast path, no DataFrame)
     # ------------------------------------------------------
-    prediction = float(model.predict(X)[0])
-    pred_log = model.predict(X)[0]
+    predictor = FastPredictor(model, features, load_flat_model(model_doc))
+    predictor.verify(sample_rows(values, features, n=8))
+
+    pred_log = predictor.predict(values, output_index(model_doc))
     prediction = float(np.expm1(pred_log))
 
 
@@ -74,7 +67,7 @@ def generate_shap_analysis():
     # 4️⃣ SHAP (Tree models only)
     # ------------------------------------------------------
     try:
-        explainer = shap.TreeExplainer(model)
+        explainer = shap.TreeExplainer(select_output(model, model_doc))
         shap_values = explainer.shap_values(X)
 
     except Exception:
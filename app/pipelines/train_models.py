@@ -1,10 +1,101 @@
 import joblib
 import io
+import numpy as np
 from datetime import datetime
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from gridfs import GridFS
 
-from app.db.mongo import get_db, get_model_registry
+from app.db.mongo import get_db, get_model_registry, bump_registry_version
+from app.pipelines.feature_spec import FEATURE_SPEC
+from app.utils.artifact_store import store_flat_artifact
+from app.utils.tree_artifact import export_flat
+
+
+MODEL_FAMILIES = ["random_forest", "gradient_boosting", "ridge", "xgboost"]
+
+
+def build_model(name, n_jobs=None):
+    """
+    Default estimator for a model family.
+    n_jobs caps the model's own threads (forests / XGBoost).
+    """
+
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.linear_model import Ridge
+
+    if name == "random_forest":
+        return RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=n_jobs)
+
+    if name == "gradient_boosting":
+        return GradientBoostingRegressor()
+
+    if name == "ridge":
+        return Ridge()
+
+    if name == "xgboost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(objective="reg:squarederror", n_jobs=n_jobs)
+
+    raise ValueError(f"Unknown model family: {name}")
+
+
+# One estimator for all horizon targets at once
+MULTI_OUTPUT_FAMILIES = ["random_forest_multi", "extra_trees_multi", "gradient_boosting_chain"]
+
+
+def build_multi_output_model(name, n_jobs=None):
+    """
+    Estimator that predicts every horizon target in one call.
+    Forests are natively multi-output; the chain feeds each
+    horizon's prediction into the next horizon's model.
+    """
+
+    from sklearn.ensemble import (
+        RandomForestRegressor,
+        ExtraTreesRegressor,
+        GradientBoostingRegressor
+    )
+    from sklearn.multioutput import RegressorChain
+
+    if name == "random_forest_multi":
+        return RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=n_jobs)
+
+    if name == "extra_trees_multi":
+        return ExtraTreesRegressor(n_estimators=200, random_state=42, n_jobs=n_jobs)
+
+    if name == "gradient_boosting_chain":
+        return RegressorChain(GradientBoostingRegressor())
+
+    raise ValueError(f"Unknown multi-output family: {name}")
+
+
+def ridge_statistics(X, y):
+    """Sufficient statistics for an intercept Ridge fit."""
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    return {
+        "n": len(X),
+        "sum_x": X.sum(axis=0),
+        "sum_y": float(y.sum()),
+        "xtx": X.T @ X,
+        "xty": X.T @ y,
+    }
+
+
+def fit_model(model, X, y):
+    """
+    Fit in place. A Ridge also keeps its sufficient statistics
+    (sufficient_stats_) so incremental training continues it exactly.
+    """
+
+    model.fit(X, y)
+
+    if type(model).__name__ == "Ridge":
+        model.sufficient_stats_ = ridge_statistics(X, y)
+
+    return model
 
 
 def evaluate_model(model, X_val, y_val):
@@ -17,6 +108,23 @@ def evaluate_model(model, X_val, y_val):
     return rmse, mae, r2
 
 
+def evaluate_outputs(model, X_val, Y_val):
+    """
+    (rmse, mae, r2) per target column from a single predict.
+    """
+
+    preds = model.predict(X_val)
+
+    return [
+        (
+            mean_squared_error(Y_val.iloc[:, i], preds[:, i], squared=False),
+            mean_absolute_error(Y_val.iloc[:, i], preds[:, i]),
+            r2_score(Y_val.iloc[:, i], preds[:, i])
+        )
+        for i in range(Y_val.shape[1])
+    ]
+
+
 def save_model_to_gridfs(model, model_name, horizon):
     db = get_db()
     fs = GridFS(db)
@@ -45,6 +153,7 @@ def register_model(model_name, horizon, rmse, mae, r2, gridfs_id, features, run_
         "r2": r2,
         "gridfs_id": gridfs_id,
         "features": features,
+        "feature_spec": FEATURE_SPEC,
         "run_id": run_id,
         "status": "candidate",
         "is_best": False,
@@ -54,27 +163,40 @@ def register_model(model_name, horizon, rmse, mae, r2, gridfs_id, features, run_
     registry.insert_one(model_doc)
 
 
-def train_all_models(X_train, y_train, X_val, y_val, horizon, run_id):
-
-    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-    from sklearn.linear_model import Ridge
-    from xgboost import XGBRegressor
+def train_all_models(X_train, y_train, X_val, y_val, horizon, run_id, search_budget_seconds=None):
+    """
+    Train every family with defaults and promote the best.
+    With search_budget_seconds, run a successive-halving search
+    across the families instead and register only its winner.
+    """
 
     registry = get_model_registry()
 
-    models = {
-        "random_forest": RandomForestRegressor(n_estimators=200, random_state=42),
-        "gradient_boosting": GradientBoostingRegressor(),
-        "ridge": Ridge(),
-        "xgboost": XGBRegressor(objective="reg:squarederror")
-    }
+    if search_budget_seconds:
+        from app.pipelines.hyperparameter_search import successive_halving
+
+        winner = successive_halving(
+            X_train, y_train, X_val, y_val,
+            horizon=horizon,
+            run_id=run_id,
+            families=MODEL_FAMILIES,
+            budget_seconds=search_budget_seconds
+        )
+        fitted = [(
+            winner["model_name"],
+            winner["model"],
+            {"params": winner["params"], "search_id": winner["search_id"]}
+        )]
+    else:
+        fitted = []
+        for name in MODEL_FAMILIES:
+            print(f"\n🔹 Training {name} (H{horizon})")
+            model = fit_model(build_model(name), X_train, y_train)
+            fitted.append((name, model, None))
 
     results = []
 
-    for name, model in models.items():
-        print(f"\n🔹 Training {name} (H{horizon})")
-
-        model.fit(X_train, y_train)
+    for name, model, search_info in fitted:
 
         rmse, mae, r2 = evaluate_model(model, X_val, y_val)
 
@@ -90,12 +212,22 @@ def train_all_models(X_train, y_train, X_val, y_val, horizon, run_id):
             "r2": r2,
             "gridfs_id": gridfs_id,
             "features": list(X_train.columns),
+            "feature_spec": FEATURE_SPEC,
             "run_id": run_id,
             "status": "candidate",
             "is_best": False,
             "registered_at": datetime.utcnow()
         }
 
+        if search_info is not None:
+            model_doc.update(search_info)
+
+        flat_gridfs_id = store_flat_artifact(
+            GridFS(get_db()), export_flat(model, X_val), f"{name}_h{horizon}"
+        )
+        if flat_gridfs_id is not None:
+            model_doc["flat_gridfs_id"] = flat_gridfs_id
+
         registry.insert_one(model_doc)
 
         results.append(model_doc)
@@ -129,4 +261,6 @@ def train_all_models(X_train, y_train, X_val, y_val, horizon, run_id):
         }
     )
 
+    bump_registry_version()
+
     print("✅ Production model updated")
\ No newline at end of file
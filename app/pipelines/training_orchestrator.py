@@ -0,0 +1,482 @@
+"""
+Training Orchestrator
+---------------------
+- Builds the training feature matrix once
+- Fans the (horizon x model family) grid out over a process pool
+- Splits a CPU budget between workers and per-model threads
+  (forest n_jobs, XGBoost n_jobs, BLAS/OpenMP pools)
+- Registers every candidate in one bulk write, then promotes
+  the best model per horizon
+- Optional budgeted search (--search-budget) replaces the default
+  grid with a successive-halving search per horizon
+- Optional multi-output models (--multi-output): one estimator for
+  all horizons, stored once and registered per horizon
+
+CLI:
+    python -m app.pipelines.training_orchestrator --horizons 1 2 3
+"""
+
+import os
+import io
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+from gridfs import GridFS
+from pymongo import UpdateMany, UpdateOne
+from threadpoolctl import threadpool_limits
+
+from app.db.mongo import get_database, get_model_registry, bump_registry_version
+from app.pipelines.training_dataset import build_training_dataset
+from app.pipelines.feature_spec import FEATURE_SPEC
+from app.pipelines.train_models import (
+    MODEL_FAMILIES,
+    MULTI_OUTPUT_FAMILIES,
+    build_model,
+    build_multi_output_model,
+    evaluate_model,
+    evaluate_outputs,
+    fit_model
+)
+from app.pipelines.backtesting import backtest_candidates, load_fold_data
+from app.pipelines.hyperparameter_search import successive_halving
+from app.pipelines.select_best_model import best_candidate
+from app.utils.artifact_store import store_flat_artifact
+from app.utils.tree_artifact import export_flat
+
+
+HORIZONS = [1, 2, 3]
+TARGET_COLUMNS = ["target_h1", "target_h2", "target_h3"]
+VALIDATION_FRACTION = 0.2
+
+TRAIN_CPU_BUDGET = int(os.getenv("TRAIN_CPU_BUDGET", str(os.cpu_count() or 1)))
+
+# Wall-clock seconds for the budgeted search (unset = default grid)
+TRAIN_SEARCH_BUDGET = os.getenv("TRAIN_SEARCH_BUDGET") or None
+
+# Rough relative cost, heaviest first, so long fits start early
+FAMILY_COST = {
+    "gradient_boosting_chain": 8,
+    "random_forest_multi": 4,
+    "extra_trees_multi": 3,
+    "gradient_boosting": 4,
+    "random_forest": 3,
+    "xgboost": 2,
+    "ridge": 1,
+}
+
+
+# ==========================================================
+# Dataset
+# ==========================================================
+def split_dataset(df, validation_fraction=VALIDATION_FRACTION):
+    """
+    Time-ordered train / validation split (no shuffling).
+    Returns X_train, X_val, targets_train, targets_val.
+    """
+
+    X = df.drop(columns=["datetime", *TARGET_COLUMNS])
+    targets = df[TARGET_COLUMNS]
+
+    split_index = int(len(df) * (1 - validation_fraction))
+
+    return (
+        X.iloc[:split_index],
+        X.iloc[split_index:],
+        targets.iloc[:split_index],
+        targets.iloc[split_index:],
+    )
+
+
+# ==========================================================
+# Worker
+# ==========================================================
+# Filled once per worker process by the pool initializer,
+# so the feature matrix is not re-sent with every task.
+_worker_data = {}
+
+
+def _init_worker(X_train, X_val, targets_train, targets_val):
+    _worker_data.update(
+        X_train=X_train,
+        X_val=X_val,
+        targets_train=targets_train,
+        targets_val=targets_val,
+    )
+
+
+def _fit_candidate(task):
+
+    horizon, family, threads = task
+
+    X_train = _worker_data["X_train"]
+    X_val = _worker_data["X_val"]
+    y_train = _worker_data["targets_train"][f"target_h{horizon}"]
+    y_val = _worker_data["targets_val"][f"target_h{horizon}"]
+
+    started = time.perf_counter()
+
+    # Keep BLAS / OpenMP pools inside this task's share of the budget
+    with threadpool_limits(limits=threads):
+        model = fit_model(build_model(family, n_jobs=threads), X_train, y_train)
+        rmse, mae, r2 = evaluate_model(model, X_val, y_val)
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    return {
+        "horizon": horizon,
+        "model_name": family,
+        "rmse": float(rmse),
+        "mae": float(mae),
+        "r2": float(r2),
+        "fit_seconds": time.perf_counter() - started,
+        "model_bytes": buffer.getvalue(),
+        "flat_bytes": export_flat(model, X_val),
+    }
+
+
+def _fit_multi_output_candidate(task):
+
+    horizons, family, threads = task
+
+    targets = [f"target_h{h}" for h in horizons]
+
+    X_train = _worker_data["X_train"]
+    X_val = _worker_data["X_val"]
+    Y_train = _worker_data["targets_train"][targets]
+    Y_val = _worker_data["targets_val"][targets]
+
+    started = time.perf_counter()
+
+    with threadpool_limits(limits=threads):
+        model = build_multi_output_model(family, n_jobs=threads)
+        model.fit(X_train, Y_train)
+        metrics = evaluate_outputs(model, X_val, Y_val)
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    return {
+        "horizons": list(horizons),
+        "model_name": family,
+        "metrics": [
+            {"rmse": float(rmse), "mae": float(mae), "r2": float(r2)}
+            for rmse, mae, r2 in metrics
+        ],
+        "fit_seconds": time.perf_counter() - started,
+        "model_bytes": buffer.getvalue(),
+        "flat_bytes": export_flat(model, X_val),
+    }
+
+
+def plan_workers(n_tasks, cpu_budget):
+    """
+    (process workers, threads per task) for a CPU budget.
+    """
+
+    cpu_budget = max(1, cpu_budget)
+    workers = max(1, min(n_tasks, cpu_budget))
+    threads = max(1, cpu_budget // workers)
+
+    return workers, threads
+
+
+# ==========================================================
+# Registry
+# ==========================================================
+def _multi_output_docs(result, gridfs_id, features, run_id, trained_until):
+    """One registry doc per horizon, all pointing at the shared artifact."""
+
+    targets = [f"target_h{h}" for h in result["horizons"]]
+
+    return [
+        {
+            "model_name": result["model_name"],
+            "horizon": horizon,
+            **metrics,
+            "gridfs_id": gridfs_id,
+            "features": features,
+            "feature_spec": FEATURE_SPEC,
+            "run_id": run_id,
+            "fit_seconds": result["fit_seconds"],
+            "trained_until": trained_until,
+            "multi_output": True,
+            "targets": targets,
+            "output_index": i,
+            "status": "candidate",
+            "is_best": False,
+            "registered_at": datetime.utcnow()
+        }
+        for i, (horizon, metrics) in enumerate(zip(result["horizons"], result["metrics"]))
+    ]
+
+
+def register_candidates(results, features, run_id, trained_until):
+    """
+    Store artifacts in GridFS and insert all candidate
+    documents in one bulk write. Returns the inserted docs.
+    """
+
+    fs = GridFS(get_database())
+    registry = get_model_registry()
+
+    docs = []
+
+    for result in results:
+
+        horizons = result["horizons"] if "horizons" in result else [result["horizon"]]
+        filename = f"{result['model_name']}_h{''.join(map(str, horizons))}"
+
+        gridfs_id = fs.put(
+            result["model_bytes"],
+            filename=filename,
+            uploadDate=datetime.utcnow()
+        )
+        flat_gridfs_id = store_flat_artifact(fs, result.get("flat_bytes"), filename)
+
+        if "horizons" in result:
+            docs.extend(_multi_output_docs(result, gridfs_id, features, run_id, trained_until))
+        else:
+            docs.append({
+                "model_name": result["model_name"],
+                "horizon": result["horizon"],
+                "rmse": result["rmse"],
+                "mae": result["mae"],
+                "r2": result["r2"],
+                "gridfs_id": gridfs_id,
+                "features": features,
+                "feature_spec": FEATURE_SPEC,
+                "run_id": run_id,
+                "fit_seconds": result["fit_seconds"],
+                "trained_until": trained_until,
+                "status": "candidate",
+                "is_best": False,
+                "registered_at": datetime.utcnow()
+            })
+
+            # Search winners keep their configuration
+            for key in ("params", "search_id"):
+                if key in result:
+                    docs[-1][key] = result[key]
+
+        if flat_gridfs_id is not None:
+            for doc in docs[-len(horizons):]:
+                doc["flat_gridfs_id"] = flat_gridfs_id
+
+    if docs:
+        registry.insert_many(docs, ordered=False)
+
+    return docs
+
+
+def promote_best(docs):
+    """
+    Promote the best candidate per horizon (backtest RMSE when all
+    of them share one backtest, else holdout RMSE).
+    """
+
+    registry = get_model_registry()
+
+    by_horizon = {}
+    for doc in docs:
+        by_horizon.setdefault(doc["horizon"], []).append(doc)
+
+    best = {horizon: best_candidate(group) for horizon, group in by_horizon.items()}
+
+    ops = []
+    for horizon, doc in sorted(best.items()):
+        # A rolled-back doc is served (is_best) without being "production"
+        ops.append(UpdateMany(
+            {"horizon": horizon, "$or": [{"status": "production"}, {"is_best": True}]},
+            {"$set": {"status": "archived", "is_best": False}}
+        ))
+        ops.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"status": "production", "is_best": True}}
+        ))
+
+    if ops:
+        registry.bulk_write(ops, ordered=True)
+        bump_registry_version()
+
+    return best
+
+
+# ==========================================================
+# Fitting
+# ==========================================================
+def _fit_grid(horizons, families, cpu_budget, X_train, X_val, targets_train, targets_val,
+              multi_output_families=()):
+    """
+    Default-parameter fit of every (horizon, family) pair, plus one
+    fit per multi-output family covering all horizons, on a process pool.
+    """
+
+    tasks = [(_fit_candidate, h, family) for h in horizons for family in families]
+    tasks += [(_fit_multi_output_candidate, tuple(horizons), family) for family in multi_output_families]
+
+    tasks.sort(key=lambda t: -FAMILY_COST.get(t[2], 1))
+
+    if not tasks:
+        return []
+
+    workers, threads = plan_workers(len(tasks), cpu_budget)
+
+    print(f"🧵 {len(tasks)} fits on {workers} workers x {threads} threads (budget={cpu_budget})")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(X_train, X_val, targets_train, targets_val)
+    ) as pool:
+        futures = [pool.submit(fit, (h, family, threads)) for fit, h, family in tasks]
+        return [future.result() for future in futures]
+
+
+def _search_horizons(horizons, families, cpu_budget, budget_seconds, run_id,
+                     X_train, X_val, targets_train, targets_val):
+    """
+    One successive-halving search per horizon, sharing the
+    wall-clock budget (time a horizon leaves unused carries
+    over). Returns winners shaped like grid results.
+    """
+
+    results = []
+    deadline = time.perf_counter() + budget_seconds
+
+    for i, horizon in enumerate(horizons):
+
+        target = f"target_h{horizon}"
+
+        winner = successive_halving(
+            X_train, targets_train[target], X_val, targets_val[target],
+            horizon=horizon,
+            run_id=run_id,
+            families=families,
+            budget_seconds=(deadline - time.perf_counter()) / (len(horizons) - i),
+            n_jobs=cpu_budget
+        )
+
+        buffer = io.BytesIO()
+        joblib.dump(winner["model"], buffer)
+
+        results.append({
+            "horizon": horizon,
+            "model_name": winner["model_name"],
+            "rmse": winner["rmse"],
+            "mae": winner["mae"],
+            "r2": winner["r2"],
+            "fit_seconds": winner["fit_seconds"],
+            "model_bytes": buffer.getvalue(),
+            "flat_bytes": export_flat(winner["model"], X_val),
+            "params": winner["params"],
+            "search_id": winner["search_id"],
+        })
+
+    return results
+
+
+# ==========================================================
+# Orchestration
+# ==========================================================
+def run_training_grid(
+    horizons=HORIZONS,
+    families=MODEL_FAMILIES,
+    cpu_budget=TRAIN_CPU_BUDGET,
+    promote=True,
+    backtest=False,
+    search_budget_seconds=None,
+    multi_output=False,
+    df=None
+):
+
+    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+
+    print(f"🚀 Training run {run_id}: horizons={list(horizons)} families={list(families)}")
+
+    if df is None:
+        df = build_training_dataset()
+
+    X_train, X_val, targets_train, targets_val = split_dataset(df)
+
+    started = time.perf_counter()
+
+    multi_output_families = MULTI_OUTPUT_FAMILIES if multi_output else ()
+
+    if search_budget_seconds:
+        print(f"🔎 Budgeted search: {search_budget_seconds}s over {cpu_budget} CPUs")
+        results = _search_horizons(
+            horizons, families, cpu_budget, search_budget_seconds, run_id,
+            X_train, X_val, targets_train, targets_val
+        )
+        results += _fit_grid(
+            horizons, (), cpu_budget,
+            X_train, X_val, targets_train, targets_val,
+            multi_output_families
+        )
+    else:
+        results = _fit_grid(
+            horizons, families, cpu_budget,
+            X_train, X_val, targets_train, targets_val,
+            multi_output_families
+        )
+
+    print(f"⏱️ Fitted in {time.perf_counter() - started:.1f}s")
+
+    docs = register_candidates(
+        results,
+        features=list(X_train.columns),
+        run_id=run_id,
+        # Last row the models were fitted on (validation rows are not)
+        trained_until=df["datetime"].iloc[len(X_train) - 1].to_pydatetime()
+    )
+
+    for doc in sorted(docs, key=lambda d: (d["horizon"], d["rmse"])):
+        print(
+            f"H{doc['horizon']} {doc['model_name']:<24} "
+            f"RMSE={doc['rmse']:.4f} | MAE={doc['mae']:.4f} | "
+            f"R2={doc['r2']:.4f} | {doc['fit_seconds']:.1f}s"
+        )
+
+    print(f"📦 Registered {len(docs)} candidates")
+
+    if backtest:
+        data = load_fold_data(df=df)
+        for horizon in horizons:
+            summaries = backtest_candidates(
+                horizon, run_id=run_id, data=data, n_jobs=cpu_budget
+            )
+            for doc in docs:
+                if doc["_id"] in summaries:
+                    doc["backtest"] = summaries[doc["_id"]]
+
+    if promote:
+        for horizon, doc in promote_best(docs).items():
+            print(f"🏆 H{horizon}: {doc['model_name']} promoted")
+
+    return docs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS)
+    parser.add_argument("--families", nargs="+", default=MODEL_FAMILIES)
+    parser.add_argument("--cpu-budget", type=int, default=TRAIN_CPU_BUDGET)
+    parser.add_argument("--no-promote", action="store_true")
+    parser.add_argument("--backtest", action="store_true", help="rank candidates on walk-forward backtests")
+    parser.add_argument("--multi-output", action="store_true", help="also train one multi-output model per family for all horizons")
+    parser.add_argument("--search-budget", type=float, default=TRAIN_SEARCH_BUDGET, help="seconds for a successive-halving search instead of defaults")
+    args = parser.parse_args()
+
+    run_training_grid(
+        horizons=args.horizons,
+        families=args.families,
+        cpu_budget=args.cpu_budget,
+        promote=not args.no_promote,
+        backtest=args.backtest,
+        search_budget_seconds=args.search_budget,
+        multi_output=args.multi_output
+    )
@@ -8,7 +8,8 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from gridfs import GridFS
 
 from app.pipelines.training_dataset import build_training_dataset
-from app.db.mongo import get_model_registry, get_database
+from app.pipelines.feature_spec import FEATURE_SPEC
+from app.db.mongo import get_model_registry, get_database, bump_registry_version
 
 
 # ---------------------------------------------------
@@ -83,6 +84,7 @@ def train_horizon(df: pd.DataFrame, horizon: int):
         "horizon": horizon,
         "gridfs_id": file_id,
         "features": list(X.columns),
+        "feature_spec": FEATURE_SPEC,
         "rmse": float(rmse),
         "mae": float(mae),
         "r2": float(r2),
@@ -91,6 +93,8 @@ def train_horizon(df: pd.DataFrame, horizon: int):
         "status": "production"
     })
 
+    bump_registry_version()
+
     print("📦 Model metadata stored in Mongo")
 
     return {
@@ -2,6 +2,8 @@ import os
 from datetime import datetime
 from pymongo import MongoClient
 
+from app.db.mongo import bump_registry_version
+
 # -----------------------------
 # Load Environment Variables
 # -----------------------------
@@ -88,6 +90,9 @@ for model in models:
 
     print(f"✅ Registered model for horizon {model['horizon']}")
 
+# Let running API workers pick up the new models
+bump_registry_version()
+
 print("\n🚀 Production models successfully registered.")
 model_doc = {
     "horizon": horizon,
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def classify_aqi(aqi_value: float):
 
     if aqi_value <= 50:
@@ -12,3 +15,35 @@ def classify_aqi(aqi_value: float):
         return "Very Unhealthy", "🟣"
     else:
         return "Hazardous", "⚫"
+
+
+# Upper bound of each category except the last (Hazardous)
+AQI_CATEGORY_BOUNDS = [50, 100, 150, 200, 300]
+
+AQI_CATEGORIES = [
+    ("Good", "🟢"),
+    ("Moderate", "🟡"),
+    ("Unhealthy for Sensitive Groups", "🟠"),
+    ("Unhealthy", "🔴"),
+    ("Very Unhealthy", "🟣"),
+    ("Hazardous", "⚫"),
+]
+
+
+def classify_aqi_array(aqi_values):
+    """
+    Vectorized classify_aqi: (labels, emojis) object arrays for a
+    whole column at once. NaN gives None.
+    """
+
+    values = np.asarray(aqi_values, dtype=np.float64)
+    index = np.searchsorted(AQI_CATEGORY_BOUNDS, values, side="left")
+
+    labels = np.array([c[0] for c in AQI_CATEGORIES], dtype=object)[index]
+    emojis = np.array([c[1] for c in AQI_CATEGORIES], dtype=object)[index]
+
+    missing = np.isnan(values)
+    labels[missing] = None
+    emojis[missing] = None
+
+    return labels, emojis
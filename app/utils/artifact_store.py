@@ -0,0 +1,314 @@
+"""
+Model Artifact Store
+--------------------
+Single loader for registry models, tried in order:
+1. In-process LRU, bounded by artifact bytes
+2. Content-addressed disk cache (keyed by checksum / gridfs_id)
+3. Remote fetch: GridFS, MODEL_BASE_URL or a local model_path
+
+Artifacts are loaded from disk with joblib mmap_mode, so a
+restarted container reads the forest from its local cache
+instead of re-downloading it from Atlas.
+
+Tree ensembles may also carry a flat companion artifact
+(flat_gridfs_id, see app.utils.tree_artifact); load_flat_model()
+memory-maps it without unpickling anything.
+"""
+
+import os
+import hashlib
+from datetime import datetime
+import threading
+import tempfile
+from pathlib import Path
+from collections import OrderedDict
+
+import joblib
+import requests
+from gridfs import GridFS
+
+from app.db.mongo import get_database
+from app.utils.tree_artifact import dumps_flat, load_flat
+
+
+MODEL_BASE_URL = os.getenv("MODEL_BASE_URL", "")
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", "models/.cache"))
+MEMORY_CACHE_BYTES = int(os.getenv("MODEL_MEMORY_CACHE_BYTES", str(1024 ** 3)))
+DISK_CACHE_BYTES = int(os.getenv("MODEL_DISK_CACHE_BYTES", str(5 * 1024 ** 3)))
+MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+CHUNK_SIZE = 1024 * 1024
+
+# key -> (model, nbytes), most recently used last
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+_memory_lock = threading.Lock()
+
+
+# ==================================================
+# Keys & paths
+# ==================================================
+def artifact_key(doc: dict) -> str:
+    """
+    Stable cache key for a registry document.
+    GridFS files are immutable, so their id is as good as a hash.
+    """
+
+    if doc.get("checksum"):
+        return f"sha256-{doc['checksum']}"
+
+    if doc.get("gridfs_id"):
+        return f"gridfs-{doc['gridfs_id']}"
+
+    if doc.get("model_path"):
+        version = doc.get("model_version", "")
+        digest = hashlib.sha256(
+            f"{doc['model_path']}:{version}".encode()
+        ).hexdigest()[:24]
+        return f"path-{digest}"
+
+    raise RuntimeError("Model registry entry has no gridfs_id or model_path")
+
+
+def resolve_local_path(path_str: str):
+    """
+    Find a model file shipped with the app (Railway / local).
+    Returns None if it is not on disk.
+    """
+
+    path = Path(path_str)
+
+    if path.is_absolute():
+        return path if path.exists() else None
+
+    for root in (Path.cwd(), Path(__file__).resolve().parents[2]):
+        candidate = root / path
+        if candidate.exists():
+            return candidate
+
+    return None
+
+
+CACHE_SUFFIXES = (".joblib", ".flat")
+
+
+def _cache_path(key: str) -> Path:
+    suffix = ".flat" if key.startswith("flat-") else ".joblib"
+    return MODEL_CACHE_DIR / f"{key}{suffix}"
+
+
+# ==================================================
+# Memory tier
+# ==================================================
+def _memory_get(key: str):
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        _memory_cache.move_to_end(key)
+        return entry[0]
+
+
+def _memory_put(key: str, model, nbytes: int):
+    global _memory_bytes
+
+    with _memory_lock:
+        if key in _memory_cache:
+            _memory_bytes -= _memory_cache.pop(key)[1]
+
+        _memory_cache[key] = (model, nbytes)
+        _memory_bytes += nbytes
+
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while _memory_bytes > MEMORY_CACHE_BYTES and len(_memory_cache) > 1:
+            _, (_, evicted) = _memory_cache.popitem(last=False)
+            _memory_bytes -= evicted
+
+
+def clear_memory_cache():
+    global _memory_bytes
+
+    with _memory_lock:
+        _memory_cache.clear()
+        _memory_bytes = 0
+
+
+def cache_stats() -> dict:
+    with _memory_lock:
+        return {
+            "memory_entries": len(_memory_cache),
+            "memory_bytes": _memory_bytes,
+            "memory_budget_bytes": MEMORY_CACHE_BYTES,
+        }
+
+
+# ==================================================
+# Disk tier
+# ==================================================
+def _write_atomic(key: str, chunks, expected_sha256=None) -> Path:
+    """
+    Stream chunks into the cache dir and rename into place,
+    so readers never see a partially written artifact.
+    """
+
+    MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_CACHE_DIR, suffix=".part")
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+
+        if expected_sha256 and digest.hexdigest() != expected_sha256:
+            raise RuntimeError(f"Checksum mismatch for artifact {key}")
+
+        final_path = _cache_path(key)
+        os.replace(tmp_path, final_path)
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _prune_disk_cache(keep=final_path)
+
+    return final_path
+
+
+def _prune_disk_cache(keep: Path):
+    files = sorted(
+        (p for suffix in CACHE_SUFFIXES for p in MODEL_CACHE_DIR.glob(f"*{suffix}")),
+        key=lambda p: p.stat().st_mtime
+    )
+
+    total = sum(p.stat().st_size for p in files)
+
+    for path in files:
+        if total <= DISK_CACHE_BYTES:
+            break
+        if path == keep:
+            continue
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+
+
+# ==================================================
+# Remote tier
+# ==================================================
+def _fetch_gridfs(key: str, doc: dict, field="gridfs_id", checksum=None) -> Path:
+    fs = GridFS(get_database())
+    grid_out = fs.get(doc[field])
+
+    print(f"⬇️ Downloading model {doc[field]} from GridFS")
+
+    chunks = iter(lambda: grid_out.read(CHUNK_SIZE), b"")
+    return _write_atomic(key, chunks, checksum)
+
+
+def _fetch_http(key: str, doc: dict) -> Path:
+    url = f"{MODEL_BASE_URL}/{doc['model_path']}"
+
+    print(f"⬇️ Downloading model from {url}")
+
+    with requests.get(url, timeout=60, stream=True) as r:
+        if r.status_code != 200:
+            raise RuntimeError(f"Failed to download model: {url}")
+
+        return _write_atomic(
+            key, r.iter_content(CHUNK_SIZE), doc.get("checksum")
+        )
+
+
+def get_artifact_path(doc: dict) -> Path:
+    """
+    Local file for a registry model, fetching it at most once.
+    """
+
+    key = artifact_key(doc)
+    cached = _cache_path(key)
+
+    if cached.exists():
+        return cached
+
+    if doc.get("gridfs_id"):
+        return _fetch_gridfs(key, doc, checksum=doc.get("checksum"))
+
+    model_path = doc.get("model_path")
+
+    local = resolve_local_path(model_path)
+    if local is not None:
+        return local
+
+    if not MODEL_BASE_URL:
+        raise RuntimeError(
+            f"Model missing locally and MODEL_BASE_URL not set: {model_path}"
+        )
+
+    return _fetch_http(key, doc)
+
+
+# ==================================================
+# Public loader
+# ==================================================
+def load_model(doc: dict):
+    """
+    Load the model behind a registry document:
+    memory -> local disk (memory-mapped) -> GridFS / HTTP.
+    """
+
+    key = artifact_key(doc)
+
+    model = _memory_get(key)
+    if model is not None:
+        return model
+
+    path = get_artifact_path(doc)
+    model = joblib.load(path, mmap_mode=MMAP_MODE)
+
+    _memory_put(key, model, path.stat().st_size)
+
+    return model
+
+
+def load_flat_model(doc: dict):
+    """
+    Flat tree ensemble for a registry document, or None if the
+    model has no flat companion. Compressed downloads are stored
+    uncompressed on disk so later loads are a plain mmap.
+    """
+
+    if not doc.get("flat_gridfs_id"):
+        return None
+
+    key = f"flat-{doc['flat_gridfs_id']}"
+
+    flat = _memory_get(key)
+    if flat is not None:
+        return flat
+
+    path = _cache_path(key)
+
+    if not path.exists():
+        path = _fetch_gridfs(key, doc, field="flat_gridfs_id")
+
+    flat = load_flat(path)
+
+    if flat.compressed:
+        path = _write_atomic(key, [dumps_flat(flat, compress=False)])
+        flat = load_flat(path)
+
+    _memory_put(key, flat, path.stat().st_size)
+
+    return flat
+
+
+def store_flat_artifact(fs, flat_bytes, filename):
+    """GridFS id for serialized flat bytes (None passes through)."""
+
+    if flat_bytes is None:
+        return None
+
+    return fs.put(flat_bytes, filename=f"{filename}.flat", uploadDate=datetime.utcnow())
@@ -0,0 +1,162 @@
+"""
+Single-Row Fast Predictor
+-------------------------
+Online forecasts predict one row at a time. Building a one-row
+DataFrame and going through sklearn validation / joblib dispatch
+costs milliseconds; the trees themselves take microseconds.
+
+FastPredictor keeps a preallocated row in the registry's feature
+order and evaluates it directly:
+
+- tree ensembles with a flat artifact -> FlatEnsemble traversal
+- XGBoost                             -> booster.inplace_predict
+- linear models                       -> row @ coef_ + intercept_
+- anything else                       -> model.predict (DataFrame)
+
+verify() compares the fast path with model.predict bit for bit
+and moves down that list (ending at model.predict) on any mismatch.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class FastPredictor:
+
+    def __init__(self, model, features, flat=None):
+
+        self.model = model
+        self.features = list(features)
+        self.flat = flat
+
+        if flat is not None and flat.feature_names not in (None, self.features):
+            self.flat = None  # artifact was exported with another column order
+
+        self._booster = None
+        if type(model).__name__ == "XGBRegressor":
+            self._booster = model.get_booster()
+
+        self._lock = threading.Lock()
+        self.verified = False
+
+        self._use(self._candidate_kinds()[0])
+
+    def _candidate_kinds(self):
+        """Fast paths this model supports, fastest first."""
+
+        kinds = []
+
+        if self.flat is not None:
+            kinds.append("flat")
+
+        if self._booster is not None:
+            kinds.append("xgboost")
+
+        if hasattr(self.model, "coef_") and hasattr(self.model, "intercept_"):
+            kinds.append("linear")
+
+        return kinds + ["model"]
+
+    def _use(self, kind):
+
+        self.kind = kind
+
+        dtype = np.float32 if kind in ("flat", "xgboost") else np.float64
+        self.row = np.zeros((1, len(self.features)), dtype=dtype)
+
+    # --------------------------------------------------
+    # Prediction
+    # --------------------------------------------------
+    def _fill(self, values):
+
+        row = self.row[0]
+
+        for i, col in enumerate(self.features):
+            value = values[col]
+            row[i] = np.nan if value is None else value
+
+    def _predict_row(self):
+
+        if self.kind == "flat":
+            return self.flat.predict(self.row)
+
+        if self.kind == "xgboost":
+            return self._booster.inplace_predict(
+                self.row,
+                missing=self.model.missing
+            )
+
+        if self.kind == "linear":
+            return self.row @ self.model.coef_.T + self.model.intercept_
+
+        return self.model.predict(pd.DataFrame(self.row, columns=self.features))
+
+    def predict_outputs(self, values):
+        """
+        All model outputs for one row, as a 1-D array.
+        `values` maps feature name -> value (None = missing).
+        """
+
+        with self._lock:
+            self._fill(values)
+            return np.ravel(self._predict_row()).copy()
+
+    def predict(self, values, output_index=None):
+        return float(self.predict_outputs(values)[output_index or 0])
+
+    # --------------------------------------------------
+    # Verification
+    # --------------------------------------------------
+    def verify(self, rows):
+        """
+        Pick the fastest path whose outputs equal model.predict
+        exactly on every row (one-row DataFrames, as the API used
+        to call it). Returns the kind now serving.
+        """
+
+        expected = []
+
+        for values in rows:
+            try:
+                expected.append((values, np.ravel(
+                    self.model.predict(pd.DataFrame([values], columns=self.features))
+                )))
+            except ValueError:
+                continue  # e.g. NaN the model itself rejects
+
+        for kind in self._candidate_kinds():
+
+            self._use(kind)
+
+            if kind == "model" or all(
+                np.array_equal(reference, self.predict_outputs(values))
+                for values, reference in expected
+            ):
+                break
+
+            print(f"⚠️ Fast {kind} path differs from model.predict; trying the next one")
+
+        self.verified = True
+
+        return self.kind
+
+
+def sample_rows(values, features, n=32, seed=0):
+    """
+    Verification rows: the given row, all-zeros, and jittered
+    copies that exercise other branches.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    base = np.array(
+        [np.nan if values.get(col) is None else values[col] for col in features],
+        dtype=np.float64
+    )
+
+    rows = [base, np.zeros(len(features))]
+    rows += list(base * rng.normal(1.0, 0.25, size=(n, len(features))))
+
+    return [dict(zip(features, row)) for row in rows]
@@ -0,0 +1,50 @@
+"""
+Multi-Output Models
+-------------------
+One estimator trained on several horizon targets is stored once
+and registered as one document per horizon, all sharing the same
+artifact:
+
+    {"multi_output": True, "targets": [...], "output_index": i, ...}
+
+Code that predicts a single horizon wraps the shared model with
+select_output(); the API predicts once per artifact instead.
+"""
+
+import numpy as np
+
+
+class HorizonOutput:
+    """
+    Single-horizon view of a multi-output estimator.
+    Everything except predict() is forwarded to the wrapped model.
+    """
+
+    def __init__(self, model, output_index):
+        self.model = model
+        self.output_index = output_index
+
+    def predict(self, X):
+        return np.asarray(self.model.predict(X))[:, self.output_index]
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def output_index(doc):
+    """Column of the model's output this registry doc serves (None = single-output)."""
+
+    if doc.get("multi_output"):
+        return doc["output_index"]
+
+    return None
+
+
+def select_output(model, doc):
+
+    index = output_index(doc)
+
+    if index is None:
+        return model
+
+    return HorizonOutput(model, index)
@@ -0,0 +1,225 @@
+"""
+Open-Meteo Fetch Layer
+----------------------
+Every Open-Meteo call goes through get_json() / fetch_hourly():
+
+- Pooled requests sessions (one per thread) reuse connections
+- Retries 429 / 5xx / connection errors with exponential backoff
+- Disk cache keyed by (endpoint, params), i.e. coords, date range
+  and variables:
+    * date ranges that ended more than ARCHIVE_SETTLE_DAYS ago are
+      immutable and cached permanently
+    * everything else (forecasts, recent ranges) expires after
+      OPENMETEO_FORECAST_TTL seconds, one feature-pipeline cycle
+
+Repeated pipeline runs read identical requests from disk instead
+of hitting the upstream rate limits.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta, date
+
+import requests
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+
+# =====================================================
+# SETTINGS
+# =====================================================
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+AIR_QUALITY_URL = os.getenv(
+    "OPENMETEO_AIR_QUALITY_URL",
+    "https://air-quality-api.open-meteo.com/v1/air-quality"
+)
+
+CACHE_DIR = Path(os.getenv("OPENMETEO_CACHE_DIR", ".cache/openmeteo"))
+CACHE_ENABLED = os.getenv("OPENMETEO_CACHE", "1") != "0"
+
+# The feature pipeline runs hourly; a forecast fetched within the
+# same cycle is reused.
+FORECAST_TTL = int(os.getenv("OPENMETEO_FORECAST_TTL", "3600"))
+
+# Archive / reanalysis values for the last few days are still revised.
+ARCHIVE_SETTLE_DAYS = int(os.getenv("OPENMETEO_ARCHIVE_SETTLE_DAYS", "7"))
+
+POOL_SIZE = int(os.getenv("OPENMETEO_POOL_SIZE", "16"))
+MAX_RETRIES = int(os.getenv("OPENMETEO_MAX_RETRIES", "3"))
+BACKOFF_SECONDS = float(os.getenv("OPENMETEO_BACKOFF_SECONDS", "1.0"))
+MAX_BACKOFF_SECONDS = 60.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_local = threading.local()
+
+
+# =====================================================
+# SESSION
+# =====================================================
+def get_session():
+    """Pooled session for the calling thread."""
+
+    session = getattr(_local, "session", None)
+
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _local.session = session
+
+    return session
+
+
+# =====================================================
+# CACHE
+# =====================================================
+def cache_key(url, params):
+
+    canonical = json.dumps(
+        [url, sorted((k, str(v)) for k, v in params.items())]
+    )
+
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cache_path(key):
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def is_immutable(params):
+    """A request is immutable once its whole date range has settled."""
+
+    end_date = params.get("end_date")
+
+    if not end_date:
+        return False
+
+    settled = datetime.utcnow().date() - timedelta(days=ARCHIVE_SETTLE_DAYS)
+
+    return date.fromisoformat(str(end_date)) < settled
+
+
+def _read_cache(key, ttl):
+
+    path = _cache_path(key)
+
+    try:
+        if ttl is not None and time.time() - path.stat().st_mtime > ttl:
+            return None
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(key, data):
+
+    path = _cache_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+
+
+# =====================================================
+# FETCH
+# =====================================================
+def _retry_delay(attempt, response=None):
+
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+
+    return min(BACKOFF_SECONDS * 2 ** attempt, MAX_BACKOFF_SECONDS)
+
+
+def _request(url, params, timeout, max_retries):
+
+    session = get_session()
+
+    for attempt in range(max_retries + 1):
+
+        response = None
+
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return response.json()
+
+            error = requests.HTTPError(f"{response.status_code} from {url}")
+
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        if attempt == max_retries:
+            raise RuntimeError(
+                f"Open-Meteo request failed after {attempt + 1} attempts: {error}"
+            )
+
+        delay = _retry_delay(attempt, response)
+        print(f"🔁 Open-Meteo {params.get('start_date', '')}: {error}; retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def get_json(url, params, ttl=FORECAST_TTL, timeout=60, max_retries=MAX_RETRIES, use_cache=CACHE_ENABLED):
+    """
+    JSON body for url?params. Settled date ranges are cached
+    forever; anything else is reused for `ttl` seconds.
+    """
+
+    if not use_cache:
+        return _request(url, params, timeout, max_retries)
+
+    key = cache_key(url, params)
+    max_age = None if is_immutable(params) else ttl
+
+    data = _read_cache(key, max_age)
+
+    if data is not None:
+        return data
+
+    data = _request(url, params, timeout, max_retries)
+
+    if "hourly" in data:
+        _write_cache(key, data)
+
+    return data
+
+
+def fetch_hourly(url, params, **kwargs):
+    """
+    Hourly block as a DataFrame with a `datetime` column.
+    Raises if the response has no hourly data, so callers never
+    mistake an API error for an empty range.
+    """
+
+    data = get_json(url, params, **kwargs)
+
+    if "hourly" not in data:
+        raise RuntimeError(
+            f"Open-Meteo returned no hourly data for "
+            f"{params.get('start_date', '')} → {params.get('end_date', '')}: "
+            f"{data.get('reason', data)}"
+        )
+
+    df = pd.DataFrame(data["hourly"])
+    df["datetime"] = pd.to_datetime(df["time"])
+
+    return df.drop(columns=["time"])
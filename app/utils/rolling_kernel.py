@@ -0,0 +1,228 @@
+"""
+Rolling Statistics Kernel
+-------------------------
+All trailing-window statistics of one series in a few linear passes:
+
+- mean / std : one blocked prefix sum + sum of squares, shared by
+               every window
+- min / max  : scipy.ndimage min/max filters (ascending-minima deque,
+               O(n) per window regardless of its length)
+- ewm        : exponentially weighted mean with span = window, as
+               two first-order IIR filters (scipy.signal.lfilter)
+
+Semantics follow pandas with min_periods = window: a window holding
+NaN (or fewer than `window` values) gives NaN. EWM follows
+pandas ewm(span=w, adjust=True).mean().
+
+The prefix sums restart every BLOCK rows and the values are centered
+first, so rounding error depends on the block length, not on how
+many years of history the series holds.
+"""
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import lfilter
+
+
+STATS = ("mean", "std", "min", "max", "ewm")
+
+# Prefix-sum block length (raised to the longest window if needed)
+BLOCK = 1024
+
+
+def rolling_columns(windows, stats):
+    """(window, stat) key of every output column, in order."""
+    return [(w, stat) for w in windows for stat in stats]
+
+
+# ==========================================================
+# Blocked prefix sums
+# ==========================================================
+def _blocked_prefix(z, block):
+    """
+    Inclusive prefix sums restarting at every block, plus the
+    total of each block.
+    """
+
+    n = len(z)
+    n_blocks = -(-n // block)
+
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = z
+
+    q = np.cumsum(padded.reshape(n_blocks, block), axis=1)
+
+    return q.ravel()[:n], q[:, -1]
+
+
+def _window_sums(q, totals, w, block):
+    """Sum of z[t-w+1 .. t] for every t >= w-1 (block >= w)."""
+
+    n = len(q)
+
+    sums = np.empty(n - w + 1)
+    sums[0] = q[w - 1]
+    np.subtract(q[w:], q[:-w], out=sums[1:])
+
+    # Windows ending in block b but starting in block b-1 also
+    # need the rest of block b-1 (its total minus the prefix
+    # subtracted above)
+    for b in range(1, len(totals)):
+        lo = max(b * block, w)
+        hi = min(b * block + w, n)
+        sums[lo - w + 1:hi - w + 1] += totals[b - 1]
+
+    return sums
+
+
+# ==========================================================
+# Kernel
+# ==========================================================
+def rolling_stats(x, windows, stats=("mean", "std"), out=None, dtype=np.float64):
+    """
+    Rolling `stats` of `x` for every window.
+    Returns an (n, len(windows) * len(stats)) matrix whose columns
+    follow rolling_columns(windows, stats). `out` may be a
+    preallocated matrix (any float dtype) to fill instead.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    windows = list(windows)
+    stats = list(stats)
+
+    for stat in stats:
+        if stat not in STATS:
+            raise ValueError(f"Unknown rolling stat: {stat}")
+
+    if out is None:
+        out = np.empty((n, len(windows) * len(stats)), dtype=dtype, order="F")
+
+    out[:] = np.nan
+
+    if n == 0 or not windows:
+        return out
+
+    valid = ~np.isnan(x)
+    complete = bool(valid.all())
+
+    # Missing-value counts are exact integers
+    missing = np.concatenate(([0], np.cumsum(~valid)))
+
+    offset = float(x[valid].mean()) if valid.any() else 0.0
+    z = np.where(valid, x - offset, 0.0)
+
+    block = max(BLOCK, max(windows))
+
+    if "mean" in stats or "std" in stats:
+        q1, t1 = _blocked_prefix(z, block)
+    if "std" in stats:
+        q2, t2 = _blocked_prefix(z * z, block)
+    if "min" in stats:
+        low = np.where(valid, x, np.inf)
+    if "max" in stats:
+        high = np.where(valid, x, -np.inf)
+
+    col = 0
+
+    for w in windows:
+
+        full = w <= n  # at least one complete window
+
+        if full:
+            gaps = None if complete else (missing[w:] - missing[:-w]) > 0
+            tail = slice(w - 1, None)
+
+        if full and ("mean" in stats or "std" in stats):
+            s1 = _window_sums(q1, t1, w, block)
+
+        for stat in stats:
+
+            if not full and stat != "ewm":
+                col += 1
+                continue
+
+            if stat == "mean":
+                value = s1 / w + offset
+
+            elif stat == "std":
+                if w < 2:
+                    col += 1
+                    continue
+                s2 = _window_sums(q2, t2, w, block)
+                value = np.sqrt(np.maximum((s2 - s1 * s1 / w) / (w - 1), 0.0))
+
+            elif stat in ("min", "max"):
+                # The filter is centered; shift it so each output
+                # covers the trailing window [t-w+1, t]
+                filt = minimum_filter1d if stat == "min" else maximum_filter1d
+                shift = (w - 1) // 2
+                centered = filt(low if stat == "min" else high, size=w, mode="nearest")
+                value = centered[w - 1 - shift:n - shift]
+
+            else:  # ewm, span = w
+                decay = 1.0 - 2.0 / (w + 1)
+                num = lfilter([1.0], [1.0, -decay], np.where(valid, x, 0.0))
+                den = lfilter([1.0], [1.0, -decay], valid.astype(np.float64))
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    ewm = np.where(den > 0, num / den, np.nan)
+                # A missing value repeats the previous mean (pandas)
+                last = np.maximum.accumulate(np.where(valid, np.arange(n), 0))
+                out[:, col] = np.where(valid.cumsum() > 0, ewm[last], np.nan)
+                col += 1
+                continue
+
+            out[tail, col] = value if gaps is None else np.where(gaps, np.nan, value)
+            col += 1
+
+    return out
+
+
+# ==========================================================
+# Path tails (scenario forecasting)
+# ==========================================================
+def rolling_tail(paths, windows, stats, m):
+    """
+    Rolling stats at the last `m` positions of every row of a
+    2-D (n_paths, length) array, all rows at once. Returns
+    {(window, stat): (n_paths, m)}; same semantics as rolling_stats.
+    EWM runs over the whole row, so give it enough history.
+    """
+
+    paths = np.asarray(paths, dtype=np.float64)
+    length = paths.shape[1]
+
+    out = {}
+
+    for w, stat in rolling_columns(windows, stats):
+
+        if stat == "ewm":
+            valid = ~np.isnan(paths)
+            decay = 1.0 - 2.0 / (w + 1)
+            num = lfilter([1.0], [1.0, -decay], np.where(valid, paths, 0.0), axis=1)
+            den = lfilter([1.0], [1.0, -decay], valid.astype(np.float64), axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ewm = np.where(den > 0, num / den, np.nan)
+            last = np.maximum.accumulate(np.where(valid, np.arange(length), 0), axis=1)
+            ewm = np.take_along_axis(ewm, last, axis=1)
+            out[(w, stat)] = np.where(valid.cumsum(axis=1) > 0, ewm, np.nan)[:, -m:]
+            continue
+
+        if length < m + w - 1:
+            raise ValueError(f"Need {m + w - 1} values per path for window {w}, got {length}")
+
+        # (n_paths, m, w): the trailing window of each of the last m positions
+        windows_view = np.lib.stride_tricks.sliding_window_view(
+            paths[:, length - m - w + 1:], w, axis=1
+        )
+
+        if stat == "mean":
+            out[(w, stat)] = windows_view.mean(axis=2)
+        elif stat == "std":
+            out[(w, stat)] = windows_view.std(axis=2, ddof=1) if w > 1 else np.full((len(paths), m), np.nan)
+        elif stat == "min":
+            out[(w, stat)] = windows_view.min(axis=2)
+        else:
+            out[(w, stat)] = windows_view.max(axis=2)
+
+    return out
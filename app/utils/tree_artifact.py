@@ -0,0 +1,497 @@
+"""
+Flat Tree-Ensemble Artifacts
+----------------------------
+Exports a fitted tree ensemble (RandomForest / ExtraTrees /
+GradientBoosting / XGBoost) as a few contiguous arrays:
+
+    feature    int32    split feature per node
+    threshold  float32  go left when x <= threshold
+    left/right int32    child node (global index); leaves have
+                        left = -1 - leaf_index
+    nan_left   bool     direction for missing values
+    value      float64  leaf values (n_leaves, n_outputs)
+    roots      int32    first node of every tree
+
+File layout: MAGIC, uint64 header length, JSON header, then each
+array 64-byte aligned. Uncompressed files are memory-mapped on
+load; compressed (zlib) ones are inflated into memory.
+
+Thresholds are stored as the largest float32 <= the original
+split value. Models predict on float32 inputs, so `x <= t32`
+takes exactly the same branch as the original comparison.
+"""
+
+import io
+import json
+import zlib
+import struct
+
+import numpy as np
+
+
+MAGIC = b"AQIFLAT1"
+ALIGN = 64
+
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "nan_left", "value", "roots"]
+
+# Largest allowed |difference| in the round-trip check
+ROUND_TRIP_ATOL = {"mean": 0.0, "sum": 0.0, "xgboost": 1e-4}
+
+
+class FlatEnsemble:
+    """
+    Array form of a tree ensemble.
+
+    aggregation: "mean"    -> average of tree outputs (forests)
+                 "sum"     -> base_score + sum of (pre-scaled) outputs (sklearn GB)
+                 "xgboost" -> base_score + sum, float32 result
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.nan_left = arrays["nan_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        self.aggregation = meta["aggregation"]
+        self.base_score = meta.get("base_score", 0.0)
+        self.n_outputs = meta["n_outputs"]
+        self.feature_names = meta.get("feature_names")
+
+        # Set by load_flat for artifacts read from a zlib file
+        self.compressed = False
+
+        self._loops = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def _traversal(self):
+        """
+        Children with leaves pointing at themselves, plus the
+        deepest level, so traversal needs no active-node masks.
+        Built once per loaded ensemble.
+        """
+
+        if self._loops is None:
+
+            nodes = np.arange(len(self.left), dtype=np.int32)
+            is_leaf = self.left < 0
+
+            # children[2 * node] = left, children[2 * node + 1] = right
+            children = np.empty(2 * len(nodes), dtype=np.int32)
+            children[0::2] = np.where(is_leaf, nodes, self.left)
+            children[1::2] = np.where(is_leaf, nodes, self.right)
+
+            depth = 0
+            frontier = np.asarray(self.roots)
+            while True:
+                frontier = frontier[self.left[frontier] >= 0]
+                if not len(frontier):
+                    break
+                frontier = np.concatenate([self.left[frontier], self.right[frontier]])
+                depth += 1
+
+            self._loops = (children, depth)
+
+        return self._loops
+
+    def apply(self, X):
+        """
+        Leaf index reached in every tree: (n_samples, n_trees).
+        All trees and rows advance together, one level per step.
+        """
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        children, depth = self._traversal()
+
+        n_samples, n_features = X.shape
+        values = X.ravel()
+        offsets = (np.arange(n_samples, dtype=np.int64) * n_features)[:, None]
+
+        node = np.broadcast_to(self.roots, (n_samples, self.n_trees)).astype(np.int64)
+        has_nan = bool(np.isnan(values).any())
+
+        for _ in range(depth):
+
+            x = values.take(offsets + self.feature.take(node))
+            go_right = ~(x <= self.threshold.take(node))
+
+            if has_nan:
+                go_right &= ~(np.isnan(x) & self.nan_left.take(node))
+
+            node = children.take(2 * node + go_right)
+
+        return -1 - self.left.take(node)
+
+    def predict_per_tree(self, X):
+        """Every tree's output: (n_samples, n_trees, n_outputs)."""
+
+        return self.value[self.apply(X)]
+
+    def predict(self, X):
+
+        per_tree = self.predict_per_tree(X)
+
+        if self.aggregation == "mean":
+            # Sequential sum in tree order, as sklearn accumulates it
+            total = np.cumsum(per_tree, axis=1)[:, -1]
+            out = total / self.n_trees
+
+        elif self.aggregation == "sum":
+            base = np.full((len(per_tree), 1, self.n_outputs), self.base_score)
+            out = np.cumsum(np.concatenate([base, per_tree], axis=1), axis=1)[:, -1]
+
+        else:  # xgboost: float32 running sum from the base score
+            base = np.full((len(per_tree), 1, self.n_outputs), self.base_score, dtype=np.float32)
+            steps = np.concatenate([base, per_tree.astype(np.float32)], axis=1)
+            out = np.cumsum(steps, axis=1, dtype=np.float32)[:, -1]
+
+        return out[:, 0] if self.n_outputs == 1 else out
+
+
+# ==================================================
+# Flattening
+# ==================================================
+def _floor_float32(values):
+    """Largest float32 <= each float64 value."""
+
+    values = np.asarray(values, dtype=np.float64)
+    down = values.astype(np.float32)
+
+    too_big = down.astype(np.float64) > values
+    down[too_big] = np.nextafter(down[too_big], np.float32(-np.inf))
+
+    return down
+
+
+def _sklearn_trees(model):
+    """(tree_, leaf value scale) for each sklearn tree, plus aggregation meta."""
+
+    from sklearn.ensemble import (
+        RandomForestRegressor,
+        ExtraTreesRegressor,
+        GradientBoostingRegressor
+    )
+
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        trees = [(est.tree_, 1.0) for est in model.estimators_]
+        return trees, {"aggregation": "mean", "n_outputs": model.n_outputs_}
+
+    if isinstance(model, GradientBoostingRegressor):
+
+        init = model.init_
+        if not hasattr(init, "constant_"):
+            raise ValueError("Only constant GradientBoosting init estimators can be flattened")
+
+        if model.loss not in ("squared_error", "absolute_error", "huber", "quantile"):
+            raise ValueError(f"Unsupported GradientBoosting loss: {model.loss}")
+
+        trees = [(est.tree_, model.learning_rate) for est in model.estimators_[:, 0]]
+        meta = {
+            "aggregation": "sum",
+            "n_outputs": 1,
+            "base_score": float(np.ravel(init.constant_)[0]),
+        }
+        return trees, meta
+
+    raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+
+def _flatten_sklearn(model):
+
+    trees, meta = _sklearn_trees(model)
+
+    parts = {name: [] for name in ARRAY_NAMES}
+    node_offset = 0
+    leaf_offset = 0
+
+    for tree, scale in trees:
+
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        is_leaf = left == -1
+
+        leaf_ids = np.cumsum(is_leaf) - 1 + leaf_offset
+
+        # Same product sklearn forms when scaling stage outputs
+        values = tree.value[is_leaf][:, :, 0]
+        if scale != 1.0:
+            values = scale * values
+
+        missing = getattr(tree, "missing_go_to_left", None)
+
+        parts["feature"].append(np.where(is_leaf, 0, tree.feature))
+        parts["threshold"].append(np.where(is_leaf, np.float32(0), _floor_float32(tree.threshold)))
+        parts["left"].append(np.where(is_leaf, -1 - leaf_ids, left + node_offset))
+        parts["right"].append(np.where(is_leaf, -1 - leaf_ids, right + node_offset))
+        parts["nan_left"].append(
+            np.zeros(len(left), dtype=bool) if missing is None else missing.astype(bool)
+        )
+        parts["value"].append(values)
+        parts["roots"].append([node_offset])
+
+        node_offset += len(left)
+        leaf_offset += int(is_leaf.sum())
+
+    return parts, meta
+
+
+def _xgboost_json(booster):
+
+    try:
+        raw = booster.save_raw(raw_format="json")
+    except TypeError:  # older xgboost
+        raw = booster.save_raw("json")
+
+    return json.loads(bytes(raw))
+
+
+def _flatten_xgboost(model):
+
+    learner = _xgboost_json(model.get_booster())["learner"]
+    trees = learner["gradient_booster"]["model"]["trees"]
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+
+    parts = {name: [] for name in ARRAY_NAMES}
+    node_offset = 0
+    leaf_offset = 0
+
+    for tree in trees:
+
+        if any(tree.get("split_type", [])):
+            raise ValueError("Categorical XGBoost splits cannot be flattened")
+
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        right = np.asarray(tree["right_children"], dtype=np.int64)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        is_leaf = left == -1
+
+        leaf_ids = np.cumsum(is_leaf) - 1 + leaf_offset
+
+        # XGBoost goes left on x < split; as x <= t that is the
+        # float32 just below the split value
+        threshold = np.nextafter(conditions, np.float32(-np.inf))
+
+        parts["feature"].append(np.where(is_leaf, 0, tree["split_indices"]))
+        parts["threshold"].append(np.where(is_leaf, np.float32(0), threshold))
+        parts["left"].append(np.where(is_leaf, -1 - leaf_ids, left + node_offset))
+        parts["right"].append(np.where(is_leaf, -1 - leaf_ids, right + node_offset))
+        parts["nan_left"].append(np.asarray(tree["default_left"], dtype=bool))
+        parts["value"].append(conditions[is_leaf].astype(np.float64)[:, None])
+        parts["roots"].append([node_offset])
+
+        node_offset += len(left)
+        leaf_offset += int(is_leaf.sum())
+
+    meta = {"aggregation": "xgboost", "n_outputs": 1, "base_score": base_score}
+
+    return parts, meta
+
+
+DTYPES = {
+    "feature": np.int32,
+    "threshold": np.float32,
+    "left": np.int32,
+    "right": np.int32,
+    "nan_left": np.bool_,
+    "value": np.float64,
+    "roots": np.int32,
+}
+
+
+def flatten_ensemble(model, feature_names=None):
+    """
+    FlatEnsemble for a fitted tree model.
+    Raises ValueError for unsupported model types.
+    """
+
+    if type(model).__name__ == "XGBRegressor":
+        parts, meta = _flatten_xgboost(model)
+    else:
+        parts, meta = _flatten_sklearn(model)
+
+    arrays = {
+        name: np.ascontiguousarray(np.concatenate(parts[name]), dtype=DTYPES[name])
+        for name in ARRAY_NAMES
+    }
+
+    if feature_names is None and hasattr(model, "feature_names_in_"):
+        feature_names = list(model.feature_names_in_)
+
+    meta["feature_names"] = list(feature_names) if feature_names is not None else None
+    meta["model_type"] = type(model).__name__
+
+    return FlatEnsemble(arrays, meta)
+
+
+def is_supported(model):
+    try:
+        if type(model).__name__ == "XGBRegressor":
+            return True
+        _sklearn_trees(model)
+        return True
+    except ValueError:
+        return False
+
+
+# ==================================================
+# File format
+# ==================================================
+def write_flat(flat, f, compress=False):
+    """Write a FlatEnsemble to a binary file object."""
+
+    blobs = {}
+    header = {**flat.meta, "compression": "zlib" if compress else "none", "arrays": {}}
+
+    offset = 0
+    for name in ARRAY_NAMES:
+
+        array = flat.arrays[name]
+        blob = array.tobytes()
+        if compress:
+            blob = zlib.compress(blob, 6)
+
+        offset = -(-offset // ALIGN) * ALIGN
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+            "nbytes": len(blob),
+        }
+        blobs[name] = blob
+        offset += len(blob)
+
+    header_bytes = json.dumps(header).encode()
+
+    # Data section starts aligned after magic + length + header
+    prefix = len(MAGIC) + 8 + len(header_bytes)
+    data_start = -(-prefix // ALIGN) * ALIGN
+    header_bytes += b" " * (data_start - prefix)
+
+    f.write(MAGIC)
+    f.write(struct.pack("<Q", len(header_bytes)))
+    f.write(header_bytes)
+
+    position = 0
+    for name in ARRAY_NAMES:
+        spec = header["arrays"][name]
+        f.write(b"\0" * (spec["offset"] - position))
+        f.write(blobs[name])
+        position = spec["offset"] + spec["nbytes"]
+
+
+def dumps_flat(flat, compress=False):
+    buffer = io.BytesIO()
+    write_flat(flat, buffer, compress)
+    return buffer.getvalue()
+
+
+def _read_header(f):
+
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a flat tree-ensemble artifact")
+
+    (length,) = struct.unpack("<Q", f.read(8))
+    header = json.loads(f.read(length))
+
+    return header, len(MAGIC) + 8 + length
+
+
+def load_flat(path, mmap=True):
+    """
+    Load a flat artifact. Uncompressed arrays are memory-mapped
+    read-only (no copy until pages are touched).
+    """
+
+    with open(path, "rb") as f:
+        header, data_start = _read_header(f)
+
+        arrays = {}
+
+        for name, spec in header["arrays"].items():
+
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+
+            if header["compression"] == "none" and mmap:
+                if spec["nbytes"] == 0:
+                    arrays[name] = np.empty(shape, dtype=dtype)
+                    continue
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r",
+                    offset=data_start + spec["offset"], shape=shape
+                )
+                continue
+
+            f.seek(data_start + spec["offset"])
+            blob = f.read(spec["nbytes"])
+            if header["compression"] == "zlib":
+                blob = zlib.decompress(blob)
+            arrays[name] = np.frombuffer(blob, dtype=dtype).reshape(shape)
+
+    meta = {
+        key: value for key, value in header.items()
+        if key not in ("arrays", "compression")
+    }
+
+    flat = FlatEnsemble(arrays, meta)
+    flat.compressed = header["compression"] != "none"
+
+    return flat
+
+
+# ==================================================
+# Verification
+# ==================================================
+def check_round_trip(model, flat, X):
+    """
+    Compare flat predictions to model.predict on X.
+    Returns the max absolute difference; raises if it exceeds
+    the tolerance for the ensemble type.
+    """
+
+    expected = np.asarray(model.predict(X), dtype=np.float64)
+    actual = np.asarray(flat.predict(np.asarray(X, dtype=np.float32)), dtype=np.float64)
+
+    diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    scale = max(1.0, float(np.max(np.abs(expected)))) if len(X) else 1.0
+
+    if diff > ROUND_TRIP_ATOL[flat.aggregation] * scale:
+        raise RuntimeError(
+            f"Flat {flat.meta['model_type']} differs from model.predict by {diff:.3g}"
+        )
+
+    return diff
+
+
+def export_flat(model, X_check, feature_names=None, compress=True):
+    """
+    Flatten, verify against model.predict on X_check and serialize.
+    Returns the artifact bytes, or None for unsupported models or
+    a failed round-trip check (the pickled model still serves).
+    """
+
+    if not is_supported(model):
+        return None
+
+    try:
+        flat = flatten_ensemble(model, feature_names)
+        check_round_trip(model, flat, X_check)
+    except (ValueError, RuntimeError) as e:
+        print(f"⚠️ Flat export skipped: {e}")
+        return None
+
+    return dumps_flat(flat, compress)
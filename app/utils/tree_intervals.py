@@ -0,0 +1,113 @@
+"""
+Forest Prediction Intervals
+---------------------------
+A random forest already holds n_estimators independent
+predictors; their spread is the interval, no quantile models
+needed:
+
+- per_tree_predictions() : every tree's output for a feature
+                           matrix, from one vectorized traversal
+                           of the flat artifact
+- tree_quantiles()       : any quantiles across the trees
+- conformal scores       : |y - mean| / tree std on recent,
+                           out-of-sample rows, kept as a bounded
+                           buffer on the registry doc
+                           (conformal_scores)
+
+With enough stored scores the interval for coverage c is
+mean ± q_c(scores) * tree std (normalized split-conformal), which
+holds for any coverage from one buffer. Otherwise the raw tree
+quantiles are returned.
+"""
+
+import os
+
+import numpy as np
+
+
+DEFAULT_COVERAGE = float(os.getenv("INTERVAL_COVERAGE", "0.8"))
+
+# Scores kept per registry doc, and needed before they are used
+CONFORMAL_BUFFER_SIZE = int(os.getenv("CONFORMAL_BUFFER_SIZE", "2000"))
+CONFORMAL_MIN_SCORES = int(os.getenv("CONFORMAL_MIN_SCORES", "50"))
+
+
+def per_tree_predictions(model, X, flat=None, output_index=None):
+    """
+    Every tree's prediction: (n_samples, n_trees).
+    Uses the flat artifact (one traversal for all trees) when
+    there is one, else the fitted sklearn estimators.
+    """
+
+    index = output_index or 0
+
+    if flat is not None:
+
+        if flat.aggregation != "mean":
+            raise RuntimeError("Prediction intervals need an averaging forest")
+
+        return flat.predict_per_tree(np.asarray(X, dtype=np.float32))[:, :, index]
+
+    estimators = getattr(model, "estimators_", None)
+
+    if estimators is None or type(model).__name__ not in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        raise RuntimeError(f"{type(model).__name__} has no per-tree predictions")
+
+    X = np.asarray(X, dtype=np.float32)
+    outputs = [np.asarray(tree.predict(X)) for tree in estimators]
+
+    return np.stack([out if out.ndim == 1 else out[:, index] for out in outputs], axis=1)
+
+
+def tree_quantiles(per_tree, quantiles):
+    """Quantiles across trees: (len(quantiles), n_samples)."""
+
+    return np.quantile(per_tree, quantiles, axis=1)
+
+
+# ==========================================================
+# Conformal calibration
+# ==========================================================
+def conformal_scores(per_tree, y):
+    """Normalized residuals |y - mean| / tree std."""
+
+    mean = per_tree.mean(axis=1)
+    spread = np.maximum(per_tree.std(axis=1), 1e-9)
+
+    return np.abs(np.asarray(y, dtype=np.float64) - mean) / spread
+
+
+def conformal_quantile(scores, coverage):
+    """Finite-sample corrected score quantile, or None if too few."""
+
+    scores = np.asarray([] if scores is None else scores, dtype=np.float64)
+    n = len(scores)
+
+    if n < CONFORMAL_MIN_SCORES:
+        return None
+
+    level = min(1.0, np.ceil((n + 1) * coverage) / n)
+
+    return float(np.quantile(scores, level, method="higher"))
+
+
+def prediction_interval(per_tree, coverage=DEFAULT_COVERAGE, scores=None):
+    """
+    (mean, lower, upper, calibrated) arrays for every row.
+    `scores` is the stored conformal buffer (may be None).
+    """
+
+    if not 0 < coverage < 1:
+        raise ValueError("coverage must be between 0 and 1")
+
+    mean = per_tree.mean(axis=1)
+    q = conformal_quantile(scores, coverage)
+
+    if q is not None:
+        spread = per_tree.std(axis=1)
+        return mean, mean - q * spread, mean + q * spread, True
+
+    alpha = 1.0 - coverage
+    lower, upper = tree_quantiles(per_tree, [alpha / 2, 1.0 - alpha / 2])
+
+    return mean, lower, upper, False
@@ -69,24 +69,43 @@ st.markdown("---")
 
 BASE_URL = "https://web-production-382ce.up.railway.app"
 
-FORECAST_URL = f"{BASE_URL}/forecast"
-BEST_MODEL_URL = f"{BASE_URL}/models/best"
-FEATURE_URL = f"{BASE_URL}/features/importance?horizon=1"
+DASHBOARD_URL = f"{BASE_URL}/dashboard"
 
 # ==========================================================
-# FETCH FORECAST
+# FETCH DASHBOARD (ONE REQUEST, ETAG REVALIDATION)
 # ==========================================================
+# The last payload and its ETag live in session_state; reruns
+# send If-None-Match and reuse the payload on a 304.
+
+def fetch_dashboard(timeout=30):
+
+    cached = st.session_state.get("dashboard")
+    headers = {}
+
+    if cached is not None:
+        headers["If-None-Match"] = st.session_state["dashboard_etag"]
 
-def fetch_data(url, timeout=30):
     try:
-        response = requests.get(url, timeout=timeout)
+        response = requests.get(DASHBOARD_URL, headers=headers, timeout=timeout)
+
+        if response.status_code == 304:
+            return cached
+
         response.raise_for_status()
-        return response.json()
+        payload = response.json()
     except:
-        return None
+        return cached
+
+    if response.headers.get("ETag"):
+        st.session_state["dashboard"] = payload
+        st.session_state["dashboard_etag"] = response.headers["ETag"]
+
+    return payload
 
 with st.spinner("🔄 Connecting to backend..."):
-    results = fetch_data(FORECAST_URL)
+    dashboard = fetch_dashboard()
+
+results = dashboard["forecast"] if dashboard else None
 
 if results is None:
     st.error("Backend unavailable. Please try again.")
@@ -223,7 +242,7 @@ else:
 st.markdown("---")
 st.markdown("## 🏆 Best Production Model")
 
-best_model_data = fetch_data(BEST_MODEL_URL)
+best_model_data = dashboard.get("best_model")
 
 if best_model_data and "model" in best_model_data:
 
@@ -253,7 +272,7 @@ else:
 st.markdown("---")
 st.markdown("## 📊 Top Feature Importance")
 
-feature_data = fetch_data(FEATURE_URL)
+feature_data = dashboard.get("feature_importance")
 
 if feature_data and "features" in feature_data:
 
@@ -0,0 +1,186 @@
+"""
+Test setup: every Mongo-backed path runs against mongomock, and
+every on-disk cache lives in a throwaway directory.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+_CACHE_ROOT = tempfile.mkdtemp(prefix="aqi-tests-")
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ["MODEL_CACHE_DIR"] = os.path.join(_CACHE_ROOT, "models")
+os.environ["BACKTEST_CACHE_DIR"] = os.path.join(_CACHE_ROOT, "backtest")
+os.environ["OPENMETEO_CACHE_DIR"] = os.path.join(_CACHE_ROOT, "openmeteo")
+os.environ["OPENMETEO_CACHE"] = "0"
+os.environ["OPENMETEO_BACKOFF_SECONDS"] = "0"
+
+import mongomock
+import mongomock.gridfs
+import numpy as np
+import pymongo
+import pytest
+
+# Must run before app.db.mongo creates its client
+mongomock.gridfs.enable_gridfs_integration()
+pymongo.MongoClient = mongomock.MongoClient
+
+
+# mongomock predates some pymongo APIs the app uses; run them
+# through the plain collection methods
+from bson import encode  # noqa: E402
+from mongomock.collection import Collection  # noqa: E402
+from pymongo import InsertOne, ReplaceOne, UpdateMany, UpdateOne  # noqa: E402
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    for op in requests:
+        if isinstance(op, UpdateOne):
+            self.update_one(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, UpdateMany):
+            self.update_many(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, ReplaceOne):
+            self.replace_one(op._filter, op._doc, upsert=op._upsert)
+        elif isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+        else:
+            raise TypeError(f"Unsupported bulk operation: {op!r}")
+
+
+def _find_raw_batches(self, filter=None, projection=None, sort=None, batch_size=0, **kwargs):
+    cursor = self.find(filter, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    docs = list(cursor)
+    size = batch_size or 101
+    for i in range(0, len(docs), size):
+        yield b"".join(encode(doc) for doc in docs[i:i + size])
+
+
+Collection.bulk_write = _bulk_write
+Collection.find_raw_batches = _find_raw_batches
+
+from app.db import mongo  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def db():
+    """Empty database for every test."""
+
+    mongo.client.drop_database(mongo.DATABASE_NAME)
+
+    yield mongo.get_db()
+
+    mongo.client.drop_database(mongo.DATABASE_NAME)
+
+
+def make_history(hours, start=datetime(2025, 1, 1), seed=0):
+    """Hourly pollutant rows with a daily cycle plus noise."""
+
+    rng = np.random.default_rng(seed)
+
+    return [
+        {
+            "datetime": start + timedelta(hours=i),
+            "pm2_5": float(40 + 10 * np.sin(2 * np.pi * i / 24) + rng.normal(0, 3)),
+            "pm10": float(80 + rng.normal(0, 5)),
+            "carbon_monoxide": float(300 + rng.normal(0, 10)),
+            "nitrogen_dioxide": float(20 + rng.normal()),
+            "sulphur_dioxide": float(10 + rng.normal()),
+            "ozone": float(50 + rng.normal()),
+        }
+        for i in range(hours)
+    ]
+
+
+@pytest.fixture
+def seed_history(db):
+    """Insert `hours` of history into historical_hourly_data."""
+
+    def seed(hours=600, **kwargs):
+        rows = make_history(hours, **kwargs)
+        db["historical_hourly_data"].insert_many([dict(r) for r in rows])
+        return rows
+
+    return seed
+
+
+SERVING_FEATURES = ["hour", "day", "month", "lag_1", "lag_3", "lag_6", "roll_mean_6", "roll_mean_12"]
+
+
+def seed_feature_rows(db, hours=200):
+    """Insert serving feature rows (the original builder's columns)."""
+
+    import pandas as pd
+
+    df = pd.DataFrame(make_history(hours))
+    df["aqi_pm25"] = df["pm2_5"]
+    df["hour"] = df["datetime"].dt.hour
+    df["day"] = df["datetime"].dt.day
+    df["month"] = df["datetime"].dt.month
+    for n in (1, 3, 6):
+        df[f"lag_{n}"] = df["pm2_5"].shift(n)
+    for n in (6, 12):
+        df[f"roll_mean_{n}"] = df["pm2_5"].rolling(n).mean()
+
+    df = df.dropna().reset_index(drop=True)
+    db["feature_store"].insert_many(df.to_dict("records"))
+
+    return df
+
+
+def store_model(db, horizon, model, features=SERVING_FEATURES, **fields):
+    """Put `model` in GridFS and make it the horizon's served model."""
+
+    import io
+
+    import gridfs
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    registry = db["model_registry"]
+    registry.update_many({"horizon": horizon}, {"$set": {"is_best": False, "status": "archived"}})
+
+    doc = {
+        "horizon": horizon,
+        "model_name": "random_forest",
+        "features": list(features),
+        "gridfs_id": gridfs.GridFS(db).put(buffer.getvalue()),
+        "rmse": 1.0,
+        "status": "production",
+        "is_best": True,
+        "registered_at": datetime.utcnow(),
+        **fields,
+    }
+    doc["_id"] = registry.insert_one(doc).inserted_id
+
+    return doc
+
+
+def fit_forest(df, horizon, seed=0):
+    from sklearn.ensemble import RandomForestRegressor
+
+    target = df["pm2_5"].shift(-24 * horizon).fillna(40)
+    return RandomForestRegressor(n_estimators=5, random_state=seed).fit(df[SERVING_FEATURES], target)
+
+
+@pytest.fixture
+def serving_api(db, monkeypatch):
+    """API module with a served forest per horizon and empty caches."""
+
+    df = seed_feature_rows(db)
+
+    for horizon in (1, 2, 3):
+        store_model(db, horizon, fit_forest(df, horizon, seed=horizon))
+
+    import app.api.main as main
+
+    monkeypatch.setattr(main, "models_cache", {})
+    monkeypatch.setattr(main, "forecast_cache", None)
+    monkeypatch.setattr(main, "dashboard_cache", None, raising=False)
+    monkeypatch.setattr(main, "interval_cache", {"key": None, "payloads": {}}, raising=False)
+
+    return main
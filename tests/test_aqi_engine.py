@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.pipelines.aqi_calculation import calculate_aqi_pm25, compute_aqi, sub_index
+from app.utils.aqi_alerts import classify_aqi, classify_aqi_array
+
+
+def reference_aqi_pm25(pm25):
+    """The per-value loop the engine replaced."""
+
+    breakpoints = [
+        (0.0, 12.0, 0, 50),
+        (12.1, 35.4, 51, 100),
+        (35.5, 55.4, 101, 150),
+        (55.5, 150.4, 151, 200),
+        (150.5, 250.4, 201, 300),
+        (250.5, 500.4, 301, 500),
+    ]
+
+    for c_low, c_high, i_low, i_high in breakpoints:
+        if c_low <= pm25 <= c_high:
+            return round(((i_high - i_low) / (c_high - c_low)) * (pm25 - c_low) + i_low)
+
+    return None
+
+
+def test_pm25_matches_the_reference_on_the_table_grid():
+
+    grid = np.round(np.arange(0, 5005) / 10, 1)
+
+    expected = [reference_aqi_pm25(float(v)) for v in grid]
+    actual = sub_index("pm2_5", grid)
+
+    for value, want, got in zip(grid, expected, actual):
+        assert want == got, value
+
+
+@pytest.mark.parametrize("pm25, aqi", [
+    (0.0, 0),
+    (12.0, 50),
+    (12.05, 50),   # truncated to 12.0, between the rows before
+    (12.1, 51),
+    (35.4, 100),
+    (35.5, 101),
+    (500.4, 500),
+    (500.5, None),
+    (-1.0, None),
+    (None, None),
+    (float("nan"), None),
+])
+def test_pm25_breakpoint_boundaries(pm25, aqi):
+
+    assert calculate_aqi_pm25(pm25) == aqi
+
+
+def test_dominant_pollutant_is_the_highest_sub_index():
+
+    df = pd.DataFrame({
+        "pm2_5": [10.0, 60.0, np.nan],
+        "pm10": [200.0, 20.0, np.nan],
+    })
+
+    out = compute_aqi(df)
+
+    assert list(out["dominant_pollutant"][:2]) == ["pm10", "pm2_5"]
+    assert pd.isna(out["dominant_pollutant"].iloc[2])
+    assert out["aqi"].iloc[0] == out["aqi_pm10"].iloc[0]
+    assert np.isnan(out["aqi"].iloc[2])
+
+
+def test_classify_aqi_array_matches_classify_aqi():
+
+    values = [0, 25, 50, 50.5, 51, 100, 100.2, 150, 151, 200, 201, 300, 300.5, 301, 500, 800]
+
+    labels, emojis = classify_aqi_array(values)
+
+    assert list(zip(labels, emojis)) == [classify_aqi(v) for v in values]
+
+    labels, emojis = classify_aqi_array([np.nan, 10])
+    assert labels[0] is None and emojis[0] is None
+    assert labels[1] == "Good"
@@ -0,0 +1,110 @@
+import hashlib
+import io
+
+import joblib
+import numpy as np
+import pytest
+from gridfs import GridFS
+from sklearn.linear_model import LinearRegression
+
+from app.utils import artifact_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Artifact store with an empty memory tier and its own disk dir."""
+
+    monkeypatch.setattr(artifact_store, "MODEL_CACHE_DIR", tmp_path)
+    artifact_store.clear_memory_cache()
+
+    yield artifact_store
+
+    artifact_store.clear_memory_cache()
+
+
+def model_bytes(slope=2.0):
+    X = np.arange(10, dtype=float).reshape(-1, 1)
+    buffer = io.BytesIO()
+    joblib.dump(LinearRegression().fit(X, slope * X[:, 0]), buffer)
+    return buffer.getvalue()
+
+
+def registry_doc(db, data, checksum=True):
+    doc = {"gridfs_id": GridFS(db).put(data, filename="model.joblib")}
+    if checksum:
+        doc["checksum"] = hashlib.sha256(data).hexdigest()
+    return doc
+
+
+def count_fetches(store, monkeypatch):
+    calls = []
+    fetch = store._fetch_gridfs
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return fetch(*args, **kwargs)
+
+    monkeypatch.setattr(store, "_fetch_gridfs", counting)
+    return calls
+
+
+def test_memory_then_disk_then_gridfs(db, store, monkeypatch):
+
+    doc = registry_doc(db, model_bytes())
+    fetches = count_fetches(store, monkeypatch)
+
+    # GridFS -> disk -> memory
+    model = store.load_model(doc)
+    assert model.predict([[3.0]])[0] == pytest.approx(6.0)
+    assert len(fetches) == 1
+    assert store._cache_path(store.artifact_key(doc)).exists()
+
+    # Memory hit: same object, no fetch
+    assert store.load_model(doc) is model
+    assert len(fetches) == 1
+
+    # Disk hit after a restart
+    store.clear_memory_cache()
+    reloaded = store.load_model(doc)
+    assert reloaded is not model
+    assert reloaded.predict([[3.0]])[0] == pytest.approx(6.0)
+    assert len(fetches) == 1
+
+
+def test_checksum_mismatch_leaves_no_file(db, store):
+
+    doc = registry_doc(db, model_bytes())
+    doc["checksum"] = "0" * 64
+
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        store.load_model(doc)
+
+    assert list(store.MODEL_CACHE_DIR.iterdir()) == []
+
+
+def test_memory_tier_evicts_least_recently_used(db, store, monkeypatch):
+
+    docs = [registry_doc(db, model_bytes(slope)) for slope in (1.0, 2.0, 3.0)]
+    size = len(model_bytes())
+
+    monkeypatch.setattr(store, "MEMORY_CACHE_BYTES", 2 * size + 1)
+
+    first = store.load_model(docs[0])
+    store.load_model(docs[1])
+    store.load_model(docs[0])  # docs[1] is now the oldest
+    store.load_model(docs[2])
+
+    stats = store.cache_stats()
+    assert stats["memory_entries"] == 2
+    assert stats["memory_bytes"] <= stats["memory_budget_bytes"]
+
+    assert store._memory_get(store.artifact_key(docs[0])) is first
+    assert store._memory_get(store.artifact_key(docs[1])) is None
+
+
+def test_gridfs_key_without_checksum(db, store):
+
+    doc = registry_doc(db, model_bytes(), checksum=False)
+
+    assert store.artifact_key(doc) == f"gridfs-{doc['gridfs_id']}"
+    assert store.load_model(doc).predict([[1.0]])[0] == pytest.approx(2.0)
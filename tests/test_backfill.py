@@ -0,0 +1,171 @@
+"""Backfill against a local stub of the Open-Meteo air-quality API."""
+
+import json
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.pipelines import backfill_openmeteo as backfill
+
+
+class StubOpenMeteo:
+    """Serves hourly rows for any date range; can fail chosen ranges."""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = {}  # start_date -> number of 503s left
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                status, body = stub.respond(params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/air-quality"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def respond(self, params):
+
+        with self.lock:
+            self.requests.append(params["start_date"])
+            if self.failures.get(params["start_date"], 0) > 0:
+                self.failures[params["start_date"]] -= 1
+                return 503, {"error": True, "reason": "busy"}
+
+        start = datetime.fromisoformat(params["start_date"])
+        end = datetime.fromisoformat(params["end_date"]) + timedelta(days=1)
+        times = []
+        t = start
+        while t < end:
+            times.append(t.strftime("%Y-%m-%dT%H:%M"))
+            t += timedelta(hours=1)
+
+        hourly = {"time": times}
+        for i, name in enumerate(params["hourly"].split(",")):
+            hourly[name] = [float(i + 1)] * len(times)
+
+        return 200, {"hourly": hourly}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubOpenMeteo()
+    yield server
+    server.close()
+
+
+def test_chunks_are_aligned_across_start_dates():
+
+    a = backfill.plan_chunks(date(2024, 1, 3), date(2024, 3, 1), 10)
+    b = backfill.plan_chunks(date(2024, 1, 4), date(2024, 3, 2), 10)
+
+    # Everything but the (cut) first and last chunks is shared
+    assert a[1:-1] == b[1:-1]
+    assert a[0][0] == date(2024, 1, 3) and b[0][0] == date(2024, 1, 4)
+    assert a[0][1] == b[0][1]
+
+    covered = set()
+    for start, end in a:
+        covered.update(start + timedelta(days=d) for d in range((end - start).days + 1))
+    assert covered == {date(2024, 1, 3) + timedelta(days=d) for d in range(59)}
+
+
+def test_backfill_never_fetches_before_the_start(stub, db):
+
+    backfill.backfill(date(2024, 1, 5), date(2024, 1, 20), base_url=stub.url, workers=2, chunk_days=10)
+
+    assert min(stub.requests) == "2024-01-05"
+    assert db[backfill.COLLECTION].count_documents({"datetime": {"$lt": datetime(2024, 1, 5)}}) == 0
+
+
+def test_recent_chunks_follow_the_client_settle_window(stub, db, monkeypatch):
+
+    monkeypatch.setattr(backfill, "ARCHIVE_SETTLE_DAYS", 7)
+    today = datetime.utcnow().date()
+
+    backfill.backfill(today - timedelta(days=30), today, base_url=stub.url, workers=2, chunk_days=5)
+
+    ends = [date.fromisoformat(doc["end_date"]) for doc in db["backfill_checkpoints"].find()]
+
+    assert ends and max(ends) < today - timedelta(days=7)
+
+
+def test_backfill_writes_every_hour_once(stub, db):
+
+    rows = backfill.backfill(date(2024, 1, 1), date(2024, 1, 31), base_url=stub.url, workers=4, chunk_days=7)
+
+    collection = db[backfill.COLLECTION]
+
+    assert rows == collection.count_documents({})
+    assert collection.count_documents({"datetime": datetime(2024, 1, 31, 23)}) == 1
+    assert len(collection.distinct("datetime")) == collection.count_documents({})
+
+
+def test_backfill_resumes_from_checkpoints(stub, db):
+
+    start, end = date(2024, 1, 1), date(2024, 2, 29)
+    failing = str(backfill.plan_chunks(start, end, 10)[2][0])
+
+    stub.failures[failing] = 10
+
+    with pytest.raises(RuntimeError, match="chunks failed"):
+        backfill.backfill(start, end, base_url=stub.url, workers=3, chunk_days=10, max_retries=1)
+
+    first_run = len(stub.requests)
+    stub.failures.clear()
+
+    backfill.backfill(start, end, base_url=stub.url, workers=3, chunk_days=10, max_retries=1)
+
+    # Only the failed chunk is fetched again
+    assert stub.requests[first_run:] == [failing]
+
+    # A later rolling window reuses the aligned checkpoints
+    backfill.backfill(start + timedelta(days=1), end, base_url=stub.url, workers=3, chunk_days=10)
+    assert len(stub.requests) == first_run + 1
+
+
+def test_backfill_retries_transient_errors(stub, db):
+
+    start, end = date(2024, 1, 1), date(2024, 1, 5)
+    chunk_start = str(backfill.plan_chunks(start, end, 10)[0][0])
+
+    stub.failures[chunk_start] = 2
+
+    backfill.backfill(start, end, base_url=stub.url, workers=1, chunk_days=10, max_retries=3)
+
+    assert stub.requests.count(chunk_start) == 3
+    assert db[backfill.COLLECTION].count_documents({
+        "datetime": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 1, 6)}
+    }) == 5 * 24
+
+
+def test_missing_hourly_block_never_deletes(stub, db, monkeypatch):
+
+    db[backfill.COLLECTION].insert_one({"datetime": datetime(2023, 1, 1), "pm2_5": 1.0})
+
+    monkeypatch.setattr(stub, "respond", lambda params: (200, {"error": True, "reason": "bad range"}))
+
+    with pytest.raises(RuntimeError):
+        backfill.backfill(date(2024, 1, 1), date(2024, 1, 5), base_url=stub.url, workers=1, chunk_days=10, max_retries=0)
+
+    assert db[backfill.COLLECTION].count_documents({}) == 1
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.pipelines import backtesting
+from app.pipelines.backtesting import load_fold_data, make_folds
+from tests.conftest import make_history
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(backtesting, "BACKTEST_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(backtesting, "_fold_cache", {})
+
+
+def test_folds_leave_a_gap_before_each_test_block():
+
+    folds = make_folds(1000, n_folds=4, gap=72)
+
+    assert len(folds) == 4
+    for train_idx, test_idx in folds:
+        assert test_idx[0] - train_idx[-1] == 73
+    assert folds[-1][1][-1] == 999
+
+
+def test_cache_hit_never_builds_the_dataset(db, seed_history, monkeypatch):
+
+    seed_history(600)
+    built = []
+
+    def build(spec=None):
+        built.append(1)
+        return original(spec)
+
+    original = backtesting.build_training_dataset
+    monkeypatch.setattr(backtesting, "build_training_dataset", build)
+
+    first = load_fold_data(n_folds=3)
+    assert len(built) == 1
+
+    # Same process and a fresh one (disk cache) skip the build
+    assert load_fold_data(n_folds=3) is first
+    monkeypatch.setattr(backtesting, "_fold_cache", {})
+    second = load_fold_data(n_folds=3)
+
+    assert len(built) == 1
+    np.testing.assert_array_equal(second["X"], first["X"])
+
+
+def test_new_history_rows_change_the_key(db, seed_history):
+
+    rows = seed_history(600)
+    first = load_fold_data(n_folds=3)
+
+    later = make_history(24, start=rows[-1]["datetime"] + (rows[1]["datetime"] - rows[0]["datetime"]), seed=1)
+    db["historical_hourly_data"].insert_many(later)
+
+    second = load_fold_data(n_folds=3)
+
+    assert second["data_until"] > first["data_until"]
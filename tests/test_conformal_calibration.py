@@ -0,0 +1,86 @@
+import io
+from datetime import datetime
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.db.mongo import get_model_registry
+from app.pipelines import conformal_calibration
+from app.pipelines.feature_spec import compile_spec
+from app.pipelines.training_orchestrator import promote_best, register_candidates
+from tests.conftest import make_history
+
+
+FEATURES = ["hour", "lag_1", "lag_3", "roll_mean_6"]
+
+
+@pytest.fixture
+def history():
+    return pd.DataFrame(make_history(600))
+
+
+def register(model_name, model, registered_at=None):
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    docs = register_candidates([{
+        "horizon": 1, "model_name": model_name,
+        "rmse": 1.0, "mae": 1.0, "r2": 0.0, "fit_seconds": 1.0,
+        "model_bytes": buffer.getvalue()
+    }], FEATURES, "cal", datetime(2025, 1, 1))
+
+    promote_best(docs)
+
+    if registered_at is not None:
+        get_model_registry().update_one({"_id": docs[0]["_id"]}, {"$set": {"registered_at": registered_at}})
+
+    return docs[0]["_id"]
+
+
+def fit(history, model):
+    df = compile_spec().transform(history, targets=True).dropna()
+    return model.fit(df[FEATURES].head(200), df["target_h1"].head(200))
+
+
+def test_scores_only_new_out_of_sample_rows(db, history):
+
+    registered_at = history["datetime"][300].to_pydatetime()
+    model_id = register("random_forest", fit(history, RandomForestRegressor(20, random_state=0)), registered_at)
+
+    added = conformal_calibration.calibrate_horizon(1, history)
+
+    doc = db["model_registry"].find_one({"_id": model_id})
+
+    # Rows after registration whose 24h target is observed
+    assert added == 600 - 301 - 24
+    assert len(doc["conformal_scores"]) == added
+    assert min(doc["conformal_scores"]) >= 0
+    assert doc["conformal_until"] == history["datetime"].iloc[-25]
+
+    # Nothing is scored twice
+    assert conformal_calibration.calibrate_horizon(1, history) == 0
+
+
+def test_buffer_keeps_the_newest_scores(db, history, monkeypatch):
+
+    monkeypatch.setattr(conformal_calibration, "CONFORMAL_BUFFER_SIZE", 50)
+
+    model_id = register("random_forest", fit(history, RandomForestRegressor(20, random_state=0)), datetime(2024, 1, 1))
+
+    conformal_calibration.calibrate_horizon(1, history)
+
+    assert len(db["model_registry"].find_one({"_id": model_id})["conformal_scores"]) == 50
+
+
+def test_non_forest_is_reported_not_scored(db, history):
+
+    model_id = register("ridge", fit(history, Ridge()), datetime(2024, 1, 1))
+
+    with pytest.raises(RuntimeError):
+        conformal_calibration.calibrate_horizon(1, history)
+
+    assert "conformal_scores" not in db["model_registry"].find_one({"_id": model_id})
@@ -0,0 +1,96 @@
+import io
+from datetime import datetime
+
+import joblib
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from mongomock.collection import Collection
+from sklearn.ensemble import RandomForestRegressor
+
+from app.pipelines.run_feature_pipeline import run
+from app.pipelines.training_orchestrator import promote_best, register_candidates
+
+
+FEATURES = ["hour", "day", "month", "lag_1", "lag_3", "lag_6", "roll_mean_6", "roll_mean_12"]
+
+
+@pytest.fixture
+def api(db, seed_history, monkeypatch):
+    """API module with one production forest per horizon."""
+
+    seed_history(300)
+    run(full_refresh=True)
+
+    df = pd.DataFrame(list(db["feature_store"].find())).dropna(subset=FEATURES)
+
+    results = []
+
+    for horizon in (1, 2, 3):
+        target = df["pm2_5"].shift(-24 * horizon).fillna(40)
+        model = RandomForestRegressor(n_estimators=10, random_state=horizon).fit(df[FEATURES], target)
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        results.append({
+            "horizon": horizon, "model_name": "random_forest",
+            "rmse": 1.0, "mae": 1.0, "r2": 0.0, "fit_seconds": 1.0,
+            "model_bytes": buffer.getvalue()
+        })
+
+    promote_best(register_candidates(results, FEATURES, "test", datetime(2025, 1, 1)))
+
+    import app.api.main as main
+
+    monkeypatch.setattr(main, "forecast_cache", None)
+    monkeypatch.setattr(main, "dashboard_cache", None)
+    monkeypatch.setattr(main, "models_cache", {})
+
+    return main
+
+
+def test_dashboard_etag_and_304(api, monkeypatch):
+
+    client = TestClient(api.app)
+
+    first = client.get("/dashboard")
+    etag = first.headers["etag"]
+
+    assert first.status_code == 200
+    assert set(first.json()) == {"forecast", "best_model", "feature_importance"}
+    assert first.json()["forecast"] == client.get("/forecast").json()
+
+    # A matching If-None-Match never reaches MongoDB or the models
+    def no_db(*args, **kwargs):
+        raise AssertionError("MongoDB queried for a 304")
+
+    with monkeypatch.context() as m:
+        for method in ("find", "find_one", "aggregate", "count_documents"):
+            m.setattr(Collection, method, no_db)
+        m.setattr(api, "build_dashboard", no_db)
+
+        for header in (etag, f"W/{etag}", f'"other", {etag}'):
+            cached = client.get("/dashboard", headers={"If-None-Match": header})
+            assert cached.status_code == 304
+            assert cached.content == b""
+            assert cached.headers["etag"] == etag
+
+    assert client.get("/dashboard", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_dashboard_etag_changes_with_the_cache_key(api, db, seed_history):
+
+    client = TestClient(api.app)
+
+    etag = client.get("/dashboard").headers["etag"]
+
+    # A new calibration changes the key
+    db["model_registry"].update_one(
+        {"horizon": 1, "is_best": True},
+        {"$set": {"conformal_updated_at": datetime(2025, 2, 1)}}
+    )
+    api.refresh_forecast_cache()
+
+    response = client.get("/dashboard", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.utils.fast_predictor import FastPredictor, sample_rows
+from app.utils.tree_artifact import dumps_flat, flatten_ensemble, load_flat
+
+
+FEATURES = ["hour", "lag_1", "lag_3", "roll_mean_6", "roll_mean_12"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(40, 10, size=(500, len(FEATURES))), columns=FEATURES)
+    X["hour"] = np.arange(500) % 24
+    y = 0.8 * X["lag_1"] + 0.1 * X["roll_mean_12"] + rng.normal(0, 2, 500)
+    return X, y
+
+
+def xgboost_model():
+    xgboost = pytest.importorskip("xgboost")
+    return xgboost.XGBRegressor(n_estimators=50, max_depth=4)
+
+
+MODELS = {
+    "random_forest": (lambda: RandomForestRegressor(n_estimators=30, random_state=0), "flat"),
+    "extra_trees": (lambda: ExtraTreesRegressor(n_estimators=30, random_state=0), "flat"),
+    "gradient_boosting": (lambda: GradientBoostingRegressor(n_estimators=50, random_state=0), "flat"),
+    "xgboost": (xgboost_model, "xgboost"),
+    "ridge": (lambda: Ridge(), "linear"),
+}
+
+
+@pytest.mark.parametrize("name", list(MODELS))
+def test_verify_keeps_the_fast_path_bit_exact(tmp_path, data, name):
+
+    build, kind = MODELS[name]
+    X, y = data
+    model = build().fit(X, y)
+
+    flat = None
+    if kind == "flat":
+        path = tmp_path / "model.flat"
+        path.write_bytes(dumps_flat(flatten_ensemble(model, FEATURES)))
+        flat = load_flat(path)
+
+    predictor = FastPredictor(model, FEATURES, flat)
+    rows = sample_rows(X.iloc[-1].to_dict(), FEATURES, n=64)
+
+    assert predictor.verify(rows) == kind
+
+    for values in rows:
+        expected = model.predict(pd.DataFrame([values], columns=FEATURES))
+        assert np.array_equal(predictor.predict_outputs(values), expected)
+
+
+def test_flat_with_another_column_order_is_not_used(data):
+
+    X, y = data
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+
+    predictor = FastPredictor(model, FEATURES, flatten_ensemble(model, FEATURES[::-1]))
+
+    assert predictor.flat is None
+    assert predictor.kind == "model"
+
+
+def test_verify_falls_back_on_a_mismatch(data):
+
+    X, y = data
+    model = Ridge().fit(X, y)
+    predictor = FastPredictor(model, FEATURES)
+
+    # A linear path that drifted from the fitted model
+    model.coef_ = model.coef_ + 1e-3
+    model.predict = lambda frame: np.asarray(frame, dtype=np.float64) @ (model.coef_ - 1e-3) + model.intercept_
+
+    assert predictor.verify(sample_rows(X.iloc[0].to_dict(), FEATURES)) == "model"
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from app.pipelines.feature_spec import FEATURE_SPEC, compile_spec, spec_from_doc
+from app.pipelines.run_feature_pipeline import run
+
+
+def feature_frame(db):
+    rows = list(db["feature_store"].find({}, {"_id": 0}))
+    return pd.DataFrame(rows).sort_values("datetime").reset_index(drop=True)
+
+
+def insert(db, rows):
+    db["historical_hourly_data"].insert_many([dict(r) for r in rows])
+
+
+def test_streaming_incremental_and_full_paths_agree(db, seed_history):
+
+    rows = seed_history(500)
+    db["historical_hourly_data"].delete_many({"datetime": {"$gte": rows[400]["datetime"]}})
+
+    run()
+
+    # Streaming engine picks up from the batch watermark
+    insert(db, rows[400:440])
+    run(streaming=True)
+
+    # Incremental batch refresh after the streamed rows
+    insert(db, rows[440:470])
+    run()
+
+    insert(db, rows[470:])
+    run(streaming=True)
+
+    incremental = feature_frame(db)
+
+    db["feature_store"].delete_many({})
+    run(full_refresh=True)
+
+    full = feature_frame(db)
+
+    assert len(incremental) == len(full) == 500
+    pd.testing.assert_frame_equal(incremental[full.columns], full, check_dtype=False)
+
+
+def test_features_match_pandas_formulas(db, seed_history):
+
+    rows = seed_history(400)
+    run(full_refresh=True)
+
+    df = feature_frame(db)
+    pm = pd.Series([r["pm2_5"] for r in rows])
+    times = pd.Series([r["datetime"] for r in rows])
+
+    expected = {
+        "aqi_pm25": pm,
+        "hour": times.dt.hour,
+        "day": times.dt.day,
+        "month": times.dt.month,
+        "day_of_week": times.dt.dayofweek,
+        "week_of_year": times.dt.isocalendar().week,
+        "hour_sin": np.sin(2 * np.pi * times.dt.hour / 24),
+        "dow_cos": np.cos(2 * np.pi * times.dt.dayofweek / 7),
+    }
+
+    for n in (1, 3, 6):
+        expected[f"lag_{n}"] = pm.shift(n)
+    for n in (6, 12):
+        expected[f"roll_mean_{n}"] = pm.rolling(n).mean()
+    for n in (1, 3, 6, 12, 24, 48, 72, 168):
+        expected[f"pm2_5_lag_{n}"] = pm.shift(n)
+    for n in (6, 12, 24, 48):
+        expected[f"pm2_5_roll_mean_{n}"] = pm.rolling(n).mean()
+        expected[f"pm2_5_roll_std_{n}"] = pm.rolling(n).std()
+
+    assert set(expected) <= set(compile_spec().feature_names) | {"aqi_pm25"}
+
+    for column, values in expected.items():
+        np.testing.assert_allclose(
+            df[column].astype(float), values.astype(float),
+            atol=1e-9, rtol=0, err_msg=column
+        )
+
+
+def test_incremental_refresh_rewrites_revised_source_rows(db, seed_history):
+
+    rows = seed_history(400)
+    run(full_refresh=True)
+
+    # The archive revises an hour a day before the watermark
+    revised = rows[-24]["datetime"]
+    db["historical_hourly_data"].update_one({"datetime": revised}, {"$set": {"pm2_5": 999.0}})
+
+    run()
+
+    df = feature_frame(db).set_index("datetime")
+    after = revised + (rows[1]["datetime"] - rows[0]["datetime"])
+
+    assert df.loc[revised, "aqi_pm25"] == 999.0
+    assert df.loc[after, "lag_1"] == 999.0
+    assert df["roll_mean_6"].loc[revised:].iloc[:6].gt(150).all()
+
+
+def test_docs_without_a_spec_use_the_legacy_features():
+
+    legacy = compile_spec(spec_from_doc({"horizon": 1}))
+
+    assert legacy.feature_names == [
+        "aqi_pm25", "hour", "day", "month",
+        "lag_1", "lag_3", "lag_6", "roll_mean_6", "roll_mean_12"
+    ]
+    assert spec_from_doc({"feature_spec": FEATURE_SPEC}) is FEATURE_SPEC
+    assert len(set(compile_spec().feature_names)) == len(compile_spec().feature_names)
@@ -0,0 +1,46 @@
+import pandas as pd
+from fastapi.testclient import TestClient
+from sklearn.dummy import DummyRegressor
+
+from tests.conftest import SERVING_FEATURES, store_model
+
+
+def constant_model(db, value):
+    df = pd.DataFrame(list(db["feature_store"].find()))
+    return DummyRegressor(strategy="constant", constant=value).fit(df[SERVING_FEATURES], df["pm2_5"])
+
+
+def test_unchanged_key_serves_the_cached_payload(serving_api, monkeypatch):
+
+    main = serving_api
+    client = TestClient(main.app)
+
+    first = client.get("/forecast").json()
+
+    def no_recompute(*args, **kwargs):
+        raise AssertionError("forecast recomputed for an unchanged key")
+
+    monkeypatch.setattr(main, "compute_forecast", no_recompute)
+
+    assert main.refresh_forecast_cache() == first
+    assert client.get("/forecast").json() == first
+
+
+def test_promotion_changes_the_key_and_the_forecast(serving_api, db):
+
+    main = serving_api
+
+    main.refresh_forecast_cache()
+    key = main.get_forecast_cache_key()
+
+    promoted = store_model(db, 2, constant_model(db, 123.0))
+
+    new_key = main.get_forecast_cache_key()
+    assert new_key != key
+    assert (2, str(promoted["_id"])) in new_key[1]
+
+    payload = main.refresh_forecast_cache()
+
+    assert payload["2_day"]["value"] == 123.0
+    assert main.forecast_cache["key"] == new_key
+    assert main.models_cache[2][2] == promoted["_id"]
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.history_loader import load_history_frame
+
+
+def plain_frame(db, query=None):
+    rows = list(db["historical_hourly_data"].find(query or {}, {"_id": 0}).sort("datetime", 1))
+    return pd.DataFrame(rows)
+
+
+def test_matches_a_plain_find(db, seed_history):
+
+    seed_history(250)
+    db["historical_hourly_data"].update_one({"datetime": datetime(2025, 1, 2)}, {"$set": {"pm10": None}})
+
+    df = load_history_frame(batch_size=7)
+    expected = plain_frame(db)
+
+    assert list(df.columns) == ["datetime", "pm2_5", "pm10", "carbon_monoxide",
+                                "nitrogen_dioxide", "sulphur_dioxide", "ozone"]
+    assert df["datetime"].dtype == "datetime64[ns]"
+    assert np.isnan(df.loc[df["datetime"] == datetime(2025, 1, 2), "pm10"]).all()
+    pd.testing.assert_frame_equal(df, expected[df.columns].astype(df.dtypes.to_dict()))
+
+
+def test_range_and_projection(db, seed_history):
+
+    seed_history(100)
+    start, end = datetime(2025, 1, 2), datetime(2025, 1, 3)
+
+    df = load_history_frame(start=start, end=end, columns=["pm2_5"])
+
+    assert list(df.columns) == ["datetime", "pm2_5"]
+    assert df["datetime"].iloc[0] == start and df["datetime"].iloc[-1] == end
+    assert len(df) == 25
+
+
+def test_unknown_columns_are_rejected(db):
+
+    with pytest.raises(ValueError, match="Unknown history columns"):
+        load_history_frame(columns=["pm2_5", "aqi"])
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.pipelines import hyperparameter_search as search
+
+
+def make_split(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=["a", "b", "c", "d"])
+    y = pd.Series(X["a"] * 2 - X["b"] + rng.normal(0, 0.1, n))
+    cut = int(n * 0.8)
+    return X[:cut], y[:cut], X[cut:], y[cut:]
+
+
+def test_trials_return_scores_only():
+
+    X_train, y_train, X_val, y_val = make_split()
+
+    trial = search._run_trial("ridge", {"alpha": 1.0}, 1 / 3, X_train, y_train, X_val, y_val)
+
+    assert "model" not in trial
+    assert trial["resource"] == int(len(X_train) / 3)
+
+
+def test_halving_keeps_the_best_third_each_rung(db):
+
+    X_train, y_train, X_val, y_val = make_split()
+
+    winner = search.successive_halving(
+        X_train, y_train, X_val, y_val,
+        horizon=1, run_id="run", families=["ridge", "random_forest"],
+        budget_seconds=600, n_candidates=6, n_jobs=1
+    )
+
+    trials = list(db["model_registry"].find({"status": "trial"}))
+    per_rung = [sum(t["rung"] == rung for t in trials) for rung in range(3)]
+
+    assert per_rung == [6, 2, 1]
+    final = next(t for t in trials if t["rung"] == 2)
+    assert (winner["model_name"], winner["params"]) == (final["model_name"], final["params"])
+
+    # The winner is refit in this process and scored again
+    rmse = np.sqrt(np.mean((winner["model"].predict(X_val) - y_val) ** 2))
+    assert winner["rmse"] == pytest.approx(rmse)
+
+
+def test_spent_budget_stops_after_the_first_rung(db):
+
+    X_train, y_train, X_val, y_val = make_split()
+
+    winner = search.successive_halving(
+        X_train, y_train, X_val, y_val,
+        horizon=1, run_id="run", families=["ridge"],
+        budget_seconds=0, n_candidates=6, n_jobs=1
+    )
+
+    rungs = db["model_registry"].distinct("rung", {"search_id": winner["search_id"]})
+
+    assert rungs == [0]
+    assert winner["resource"] == max(10, int(len(X_train) * search.MIN_RESOURCE))
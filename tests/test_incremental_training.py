@@ -0,0 +1,283 @@
+import io
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.pipelines import incremental_training as inc
+from app.pipelines.model_rollback import rollback_model
+from app.pipelines.train_models import fit_model
+from app.pipelines.training_orchestrator import promote_best, register_candidates, run_training_grid
+
+
+FEATURES = ["f0", "f1", "f2", "f3"]
+TARGETS = ["target_h1", "target_h2", "target_h3"]
+
+
+def make_dataset(n=700, seed=0):
+    """Training-dataset shaped frame: datetime, features, targets."""
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(FEATURES)))
+
+    df = pd.DataFrame(X, columns=FEATURES)
+    df.insert(0, "datetime", pd.date_range("2025-01-01", periods=n, freq="h"))
+
+    for h, target in enumerate(TARGETS, start=1):
+        df[target] = X @ np.array([1.0, -2.0, 0.5, h]) + rng.normal(0, 0.1, n)
+
+    return df
+
+
+def register_parent(model, horizon, trained_until, run_id="parent", rmse=None, model_name=None):
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    result = {
+        "horizon": horizon,
+        "model_name": model_name or {"Ridge": "ridge"}.get(type(model).__name__, "random_forest"),
+        "rmse": 0.1 if rmse is None else rmse,
+        "mae": 0.1, "r2": 0.9, "fit_seconds": 1.0,
+        "model_bytes": buffer.getvalue()
+    }
+
+    docs = register_candidates([result], FEATURES, run_id, trained_until)
+    promote_best(docs)
+
+    return docs[0]
+
+
+def split(df, until, horizon=1):
+    fit = df[df["datetime"] <= until]
+    return fit[FEATURES], fit[f"target_h{horizon}"]
+
+
+def test_grid_records_the_end_of_its_training_split(db):
+
+    df = make_dataset()
+
+    docs = run_training_grid(horizons=[1], families=["ridge"], cpu_budget=1, promote=False, df=df)
+
+    # Validation rows (the last 20%) were not fitted on
+    assert docs[0]["trained_until"] == df["datetime"].iloc[int(len(df) * 0.8) - 1]
+
+
+# ==========================================================
+# Continuation per family
+# ==========================================================
+def test_ridge_continuation_equals_refit_on_all_rows():
+
+    df = make_dataset()
+    old, new = df.iloc[:400], df.iloc[400:]
+
+    parent = fit_model(Ridge(alpha=3.0), old[FEATURES], old["target_h1"])
+    child = inc.continue_model(
+        "ridge", parent, new[FEATURES], new["target_h1"],
+        None, None, None, None
+    )
+
+    full = Ridge(alpha=3.0).fit(df[FEATURES], df["target_h1"])
+
+    np.testing.assert_allclose(child.coef_, full.coef_, atol=1e-8)
+    assert child.intercept_ == pytest.approx(full.intercept_, abs=1e-8)
+    assert parent.sufficient_stats_["n"] == 400
+
+
+def test_ridge_without_statistics_uses_its_training_rows():
+
+    df = make_dataset()
+    old, new = df.iloc[:400], df.iloc[400:]
+
+    parent = Ridge().fit(old[FEATURES], old["target_h1"])
+    child = inc.continue_model(
+        "ridge", parent, new[FEATURES], new["target_h1"],
+        None, None, old[FEATURES], old["target_h1"]
+    )
+
+    full = Ridge().fit(df[FEATURES], df["target_h1"])
+
+    np.testing.assert_allclose(child.coef_, full.coef_, atol=1e-8)
+
+
+def test_forest_continuation_adds_and_retires_trees(monkeypatch):
+
+    df = make_dataset()
+    monkeypatch.setattr(inc, "ADD_TREES", 5)
+    monkeypatch.setattr(inc, "MAX_TREES", 12)
+
+    parent = RandomForestRegressor(n_estimators=10, random_state=0).fit(df[FEATURES][:300], df["target_h1"][:300])
+    parent_trees = list(parent.estimators_)
+
+    child = inc.continue_model(
+        "random_forest", parent, None, None,
+        df[FEATURES][300:], df["target_h1"][300:], None, None
+    )
+
+    # 10 + 5 trees, the 3 oldest retired
+    assert len(child.estimators_) == child.n_estimators == 12
+    np.testing.assert_array_equal(
+        child.estimators_[0].predict(df[FEATURES].to_numpy(np.float32)),
+        parent_trees[3].predict(df[FEATURES].to_numpy(np.float32))
+    )
+    assert len(parent.estimators_) == 10
+
+
+def test_gradient_boosting_continuation_keeps_parent_stages(monkeypatch):
+
+    df = make_dataset()
+    monkeypatch.setattr(inc, "ADD_STAGES", 7)
+
+    parent = GradientBoostingRegressor(n_estimators=20, random_state=0).fit(df[FEATURES][:400], df["target_h1"][:400])
+    child = inc.continue_model(
+        "gradient_boosting", parent, df[FEATURES][400:], df["target_h1"][400:],
+        None, None, None, None
+    )
+
+    assert child.n_estimators_ == 27
+    assert parent.n_estimators_ == 20
+
+    X = df[FEATURES][400:]
+    parent_stages = list(parent.staged_predict(X))
+    child_stages = list(child.staged_predict(X))
+    np.testing.assert_allclose(child_stages[19], parent_stages[-1])
+
+
+def test_xgboost_continuation_boosts_from_the_parent(monkeypatch):
+
+    xgboost = pytest.importorskip("xgboost")
+    df = make_dataset()
+    monkeypatch.setattr(inc, "ADD_ROUNDS", 5)
+
+    parent = xgboost.XGBRegressor(n_estimators=10, max_depth=3).fit(df[FEATURES][:400], df["target_h1"][:400])
+    child = inc.continue_model(
+        "xgboost", parent, df[FEATURES][400:], df["target_h1"][400:],
+        None, None, None, None, n_jobs=1
+    )
+
+    assert child.get_booster().num_boosted_rounds() == 15
+    assert parent.get_booster().num_boosted_rounds() == 10
+
+    first = child.predict(df[FEATURES][400:], iteration_range=(0, 10))
+    np.testing.assert_allclose(first, parent.predict(df[FEATURES][400:]), rtol=1e-6)
+
+
+# ==========================================================
+# Gates
+# ==========================================================
+def test_child_is_registered_with_lineage(db):
+
+    df = make_dataset()
+    until = df["datetime"][399].to_pydatetime()
+    parent = register_parent(fit_model(Ridge(), *split(df, until)), 1, until)
+
+    docs, reason = inc.continue_production_artifact([parent], df, "child")
+
+    assert reason is None
+    child = docs[0]
+    assert child["parent_id"] == parent["_id"]
+    assert child["lineage_depth"] == 1
+    assert child["training_mode"] == "incremental"
+    # The newest HOLDOUT_HOURS judge the child and stay untrained
+    assert child["trained_until"] == df["datetime"].iloc[-inc.HOLDOUT_HOURS - 1]
+    assert db["model_registry"].count_documents({"parent_id": parent["_id"]}) == 1
+
+
+def test_drift_gate_sends_parent_to_full_refit(db):
+
+    df = make_dataset()
+    until = df["datetime"][399].to_pydatetime()
+    parent = register_parent(fit_model(Ridge(), *split(df, until)), 1, until, rmse=1e-6)
+
+    docs, reason = inc.continue_production_artifact([parent], df, "child")
+
+    assert docs == []
+    assert reason.startswith("drift")
+
+
+def test_worse_child_is_rejected(db, monkeypatch):
+
+    df = make_dataset()
+    until = df["datetime"][399].to_pydatetime()
+    parent = register_parent(fit_model(Ridge(), *split(df, until)), 1, until)
+
+    def worse(family, model, X_new, y_new, *args, **kwargs):
+        return Ridge().fit(X_new, y_new * 0)
+
+    monkeypatch.setattr(inc, "continue_model", worse)
+
+    docs, reason = inc.continue_production_artifact([parent], df, "child")
+
+    assert docs == []
+    assert reason.startswith("child worse than parent")
+    assert db["model_registry"].count_documents({"training_mode": "incremental"}) == 0
+
+
+@pytest.mark.parametrize("change, expected", [
+    ({"model_name": "gradient_boosting_chain"}, "cannot be continued"),
+    ({"trained_until": None}, "no trained_until"),
+    ({"lineage_depth": 99}, "lineage depth"),
+    ({"gridfs_id": None}, "no artifact"),
+])
+def test_full_refit_reasons(db, change, expected):
+
+    df = make_dataset()
+    until = df["datetime"][399].to_pydatetime()
+    parent = register_parent(fit_model(Ridge(), *split(df, until)), 1, until)
+
+    docs, reason = inc.continue_production_artifact([{**parent, **change}], df, "child")
+
+    assert docs == []
+    assert expected in reason
+
+
+def test_no_new_hours_is_a_no_op(db):
+
+    df = make_dataset()
+    until = df["datetime"].iloc[-10].to_pydatetime()
+    parent = register_parent(fit_model(Ridge(), *split(df, until)), 1, until)
+
+    assert inc.continue_production_artifact([parent], df, "child") == ([], None)
+
+
+# ==========================================================
+# Daily run
+# ==========================================================
+def test_continue_rollback_continue(db, monkeypatch):
+
+    df = make_dataset(900)
+
+    def no_refit(*args, **kwargs):
+        raise AssertionError("unexpected full refit")
+
+    monkeypatch.setattr(inc, "build_training_dataset", lambda spec=None: df)
+    monkeypatch.setattr(inc, "run_training_grid", no_refit)
+
+    until = df["datetime"][499].to_pydatetime()
+    parents = {
+        h: register_parent(fit_model(Ridge(), *split(df, until, h)), h, until, run_id="v0")
+        for h in (1, 2, 3)
+    }
+
+    first = inc.run_incremental_training()
+    assert {doc["parent_id"] for doc in first} == {doc["_id"] for doc in parents.values()}
+
+    # Roll H1 back to the original model: only is_best moves
+    rollback_model(1, "v0")
+    served = db["model_registry"].find_one({"horizon": 1, "is_best": True})
+    assert served["_id"] == parents[1]["_id"]
+    assert served["status"] != "production"
+
+    # Later hours arrive; H1 continues from the rolled-back model
+    df = make_dataset(1000)
+    monkeypatch.setattr(inc, "build_training_dataset", lambda spec=None: df)
+
+    second = inc.run_incremental_training()
+    h1 = next(doc for doc in second if doc["horizon"] == 1)
+
+    assert h1["parent_id"] == parents[1]["_id"]
+    assert db["model_registry"].count_documents({"horizon": 1, "is_best": True}) == 1
+    assert db["model_registry"].find_one({"horizon": 1, "is_best": True})["_id"] == h1["_id"]
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import app.api.main as main
+from app.db.indexes import ensure_indexes
+
+
+def test_unique_index_with_duplicates_is_skipped(db):
+
+    rows = [{"datetime": datetime(2025, 1, 1, h % 3)} for h in range(5)]
+    db["feature_store"].insert_many(rows)
+
+    skipped = ensure_indexes(db)
+
+    assert skipped == ["feature_store.datetime_unique"]
+    assert "datetime_unique" in db["historical_hourly_data"].index_information()
+    assert "horizon_run_id" in db["model_registry"].index_information()
+
+
+def test_clean_collections_get_every_index(db):
+
+    db["feature_store"].insert_many([{"datetime": datetime(2025, 1, 1, h)} for h in range(5)])
+
+    assert ensure_indexes(db) == []
+    assert db["feature_store"].index_information()["datetime_unique"]["unique"]
+
+
+def started_threads(monkeypatch, flag):
+    """Names of the threads the API lifespan starts."""
+
+    names = []
+
+    class RecordingThread:
+        def __init__(self, target, name, daemon):
+            names.append(name)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(main, "ENSURE_INDEXES_ON_STARTUP", flag)
+    monkeypatch.setattr(main, "threading", SimpleNamespace(Thread=RecordingThread))
+
+    async def start_and_stop():
+        async with main.lifespan(main.app):
+            pass
+
+    asyncio.run(start_and_stop())
+
+    return names
+
+
+def test_workers_skip_index_bootstrap_by_default(monkeypatch):
+
+    names = started_threads(monkeypatch, False)
+
+    assert "index-bootstrap" not in names
+    assert {"registry-watcher", "forecast-cache"} <= set(names)
+
+
+def test_index_bootstrap_runs_off_the_startup_path(monkeypatch):
+
+    assert "index-bootstrap" in started_threads(monkeypatch, True)
@@ -0,0 +1,76 @@
+import io
+from datetime import datetime
+
+import joblib
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.pipelines.run_feature_pipeline import run
+from app.pipelines.training_orchestrator import promote_best, register_candidates
+
+
+FEATURES = ["hour", "day", "month", "lag_1", "lag_3", "lag_6", "roll_mean_6", "roll_mean_12"]
+
+
+@pytest.fixture
+def api(db, seed_history, monkeypatch):
+    """API module serving forests for H1 and H2 and a Ridge for H3."""
+
+    seed_history(300)
+    run(full_refresh=True)
+
+    df = pd.DataFrame(list(db["feature_store"].find())).dropna(subset=FEATURES)
+
+    results = []
+
+    for horizon, model in ((1, RandomForestRegressor(10, random_state=0)),
+                           (2, RandomForestRegressor(10, random_state=1)),
+                           (3, Ridge())):
+        model.fit(df[FEATURES], df["pm2_5"].shift(-24 * horizon).fillna(40))
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        results.append({
+            "horizon": horizon, "model_name": "ridge" if horizon == 3 else "random_forest",
+            "rmse": 1.0, "mae": 1.0, "r2": 0.0, "fit_seconds": 1.0,
+            "model_bytes": buffer.getvalue()
+        })
+
+    promote_best(register_candidates(results, FEATURES, "test", datetime(2025, 1, 1)))
+
+    import app.api.main as main
+
+    monkeypatch.setattr(main, "forecast_cache", None)
+    monkeypatch.setattr(main, "interval_cache", {"key": None, "payloads": {}})
+    monkeypatch.setattr(main, "models_cache", {})
+
+    return main
+
+
+def test_non_forest_horizon_gets_null_bounds(api):
+
+    client = TestClient(api.app)
+
+    response = client.get("/forecast", params={"interval": True})
+    body = response.json()
+
+    assert response.status_code == 200
+    for day in ("1_day", "2_day"):
+        assert body[day]["lower"] <= body[day]["upper"]
+    assert body["3_day"]["lower"] is None and body["3_day"]["upper"] is None
+    assert body["3_day"]["value"] == client.get("/forecast").json()["3_day"]["value"]
+
+
+def test_coverage_is_quantized_and_validated(api):
+
+    client = TestClient(api.app)
+
+    for coverage in (0.8, 0.80001, 0.7999, 0.801):
+        assert client.get("/forecast", params={"interval": True, "coverage": coverage}).json()["1_day"]["coverage"] == 0.8
+
+    assert list(api.interval_cache["payloads"]) == [0.8]
+
+    for coverage in (0, 1, 1.5, 0.001):
+        assert client.get("/forecast", params={"interval": True, "coverage": coverage}).status_code == 422
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from app.pipelines.training_orchestrator import run_training_grid
+from app.utils.artifact_store import load_model
+from app.utils.fast_predictor import FastPredictor
+from app.utils.multi_output import output_index, select_output
+from tests.conftest import SERVING_FEATURES, store_model
+
+
+def make_dataset(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+
+    df = pd.DataFrame(X, columns=["f0", "f1", "f2"])
+    df.insert(0, "datetime", pd.date_range("2025-01-01", periods=n, freq="h"))
+    for h in (1, 2, 3):
+        df[f"target_h{h}"] = X @ np.array([1.0, -1.0, h]) + rng.normal(0, 0.1, n)
+
+    return df
+
+
+def test_select_output_is_one_column_of_the_shared_model():
+
+    df = make_dataset()
+    X, Y = df[["f0", "f1", "f2"]], df[["target_h1", "target_h2", "target_h3"]]
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, Y)
+
+    doc = {"multi_output": True, "output_index": 2}
+    view = select_output(model, doc)
+
+    np.testing.assert_array_equal(view.predict(X), model.predict(X)[:, 2])
+    assert view.n_estimators == 5
+    assert select_output(model, {"horizon": 1}) is model
+    assert output_index({"horizon": 1}) is None
+
+
+def test_one_artifact_is_registered_per_horizon(db):
+
+    docs = run_training_grid(
+        horizons=[1, 2, 3], families=["ridge"], cpu_budget=2,
+        promote=False, multi_output=True, df=make_dataset()
+    )
+
+    forests = sorted(
+        (doc for doc in docs if doc["model_name"] == "random_forest_multi"),
+        key=lambda doc: doc["horizon"]
+    )
+
+    assert [doc["output_index"] for doc in forests] == [0, 1, 2]
+    assert len({doc["gridfs_id"] for doc in forests}) == 1
+    assert all(doc["targets"] == ["target_h1", "target_h2", "target_h3"] for doc in forests)
+
+    # Each horizon's metrics score its own column
+    val = make_dataset().iloc[240:]
+    preds = load_model(forests[1]).predict(val[["f0", "f1", "f2"]])[:, 1]
+
+    assert forests[1]["rmse"] == pytest.approx(np.sqrt(np.mean((preds - val["target_h2"]) ** 2)))
+
+
+def test_api_predicts_once_per_shared_artifact(serving_api, db, monkeypatch):
+
+    main = serving_api
+    df = pd.DataFrame(list(db["feature_store"].find()))
+    Y = np.column_stack([df["pm2_5"].shift(-24 * h).fillna(40) for h in (1, 2, 3)])
+
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(df[SERVING_FEATURES], Y)
+    fields = {"multi_output": True, "targets": ["target_h1", "target_h2", "target_h3"]}
+
+    shared = store_model(db, 1, model, output_index=0, **fields)
+    for horizon in (2, 3):
+        db["model_registry"].update_many({"horizon": horizon}, {"$set": {"is_best": False}})
+        db["model_registry"].insert_one({
+            **{k: v for k, v in shared.items() if k != "_id"},
+            "horizon": horizon, "output_index": horizon - 1
+        })
+
+    calls = []
+    original = FastPredictor.predict_outputs
+
+    def counting(self, values):
+        calls.append(1)
+        return original(self, values)
+
+    monkeypatch.setattr(FastPredictor, "predict_outputs", counting)
+
+    payload = main.refresh_forecast_cache()
+
+    latest = df.sort_values("datetime").iloc[-1]
+    expected = model.predict(pd.DataFrame([latest[SERVING_FEATURES]]))[0]
+
+    assert len(calls) == 1
+    assert [payload[f"{h}_day"]["value"] for h in (1, 2, 3)] == [round(float(v), 2) for v in expected]
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app.pipelines.online_features import get_latest_features, update_latest_from_df, update_latest_row
+from tests.conftest import seed_feature_rows
+
+
+def test_read_falls_back_to_feature_store_and_repopulates(db):
+
+    df = seed_feature_rows(db, 50)
+
+    row = get_latest_features(["lag_1", "hour"])
+
+    assert row["datetime"] == df["datetime"].iloc[-1]
+    assert set(row) <= {"_id", "datetime", "lag_1", "hour"}
+    assert row["lag_1"] == df["lag_1"].iloc[-1]
+
+    online = db["online_features"].find_one({"_id": "karachi"})
+    assert online["datetime"] == df["datetime"].iloc[-1]
+
+
+def test_projection_reads_only_the_model_columns(db):
+
+    update_latest_row({"datetime": datetime(2025, 1, 2), "lag_1": 3.0, "hour": 5, "month": 1})
+
+    row = get_latest_features(["lag_1"])
+
+    assert row["lag_1"] == 3.0
+    assert "month" not in row and "hour" not in row
+
+
+def test_older_rows_never_replace_a_newer_one(db):
+
+    update_latest_row({"datetime": datetime(2025, 1, 2), "lag_1": 1.0})
+
+    assert not update_latest_row({"datetime": datetime(2025, 1, 1), "lag_1": 9.0})
+    assert get_latest_features(["lag_1"])["lag_1"] == 1.0
+
+
+def test_nan_values_are_stored_as_null(db):
+
+    df = seed_feature_rows(db, 30)
+    df.loc[df.index[-1], "lag_1"] = float("nan")
+
+    update_latest_from_df(df, location=" Karachi ")
+
+    assert get_latest_features(["lag_1"])["lag_1"] is None
@@ -0,0 +1,118 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.utils import openmeteo_client as client
+
+
+URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
+HOURLY = {"hourly": {"time": ["2024-01-01T00:00"], "pm2_5": [1.0]}}
+
+
+class FakeResponse:
+
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.body = body if body is not None else HOURLY
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise client.requests.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def session(monkeypatch, tmp_path):
+
+    fake = FakeSession([])
+    sleeps = []
+
+    monkeypatch.setattr(client, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(client, "get_session", lambda: fake)
+    monkeypatch.setattr(client.time, "sleep", sleeps.append)
+    fake.sleeps = sleeps
+
+    return fake
+
+
+def params(end):
+    return {"latitude": 24.86, "start_date": str(end - timedelta(days=3)), "end_date": str(end)}
+
+
+def test_retry_after_is_honoured(session):
+
+    session.responses = [
+        FakeResponse(429, headers={"Retry-After": "3"}),
+        FakeResponse(503),
+        FakeResponse(200),
+    ]
+
+    assert client.get_json(URL, params(date(2024, 1, 5)), use_cache=False) == HOURLY
+    assert session.sleeps == [3.0, client.BACKOFF_SECONDS * 2]
+
+
+def test_exhausted_retries_raise(session):
+
+    session.responses = [FakeResponse(500)] * 3
+
+    with pytest.raises(RuntimeError, match="after 3 attempts"):
+        client.get_json(URL, params(date(2024, 1, 5)), use_cache=False, max_retries=2)
+
+
+def test_settled_ranges_are_cached_forever(session):
+
+    old = params(date(2024, 1, 5))
+    session.responses = [FakeResponse(200)]
+
+    client.get_json(URL, old, ttl=60, use_cache=True)
+
+    # Far past any TTL, still served from disk
+    path = client._cache_path(client.cache_key(URL, old))
+    os.utime(path, (time.time() - 10 ** 7, time.time() - 10 ** 7))
+
+    assert client.get_json(URL, old, ttl=60, use_cache=True) == HOURLY
+    assert session.calls == 1
+
+
+def test_recent_ranges_expire_after_the_ttl(session):
+
+    recent = params(datetime.utcnow().date())
+    session.responses = [FakeResponse(200), FakeResponse(200)]
+
+    client.get_json(URL, recent, ttl=60, use_cache=True)
+    client.get_json(URL, recent, ttl=60, use_cache=True)
+    assert session.calls == 1
+
+    path = client._cache_path(client.cache_key(URL, recent))
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    client.get_json(URL, recent, ttl=60, use_cache=True)
+    assert session.calls == 2
+
+
+def test_error_bodies_are_not_cached(session):
+
+    old = params(date(2024, 1, 5))
+    session.responses = [FakeResponse(200, {"error": True, "reason": "bad"}), FakeResponse(200)]
+
+    with pytest.raises(RuntimeError, match="no hourly data"):
+        client.fetch_hourly(URL, old, use_cache=True)
+
+    assert list(client.fetch_hourly(URL, old, use_cache=True)["pm2_5"]) == [1.0]
+    assert session.calls == 2
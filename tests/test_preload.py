@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def starting(serving_api, monkeypatch):
+    """API that has not preloaded yet."""
+
+    monkeypatch.setitem(serving_api.app_state, "ready", False)
+    monkeypatch.setitem(serving_api.app_state, "preload_error", None)
+
+    return serving_api
+
+
+def test_preload_loads_every_horizon_before_ready(starting):
+
+    main = starting
+    client = TestClient(main.app)
+
+    assert client.get("/health").status_code == 503
+
+    main.preload_loop()
+
+    assert sorted(main.models_cache) == [1, 2, 3]
+    assert main.forecast_cache is not None
+    assert client.get("/health").json() == {"status": "ok", "ready": True}
+
+
+def test_failed_preload_reports_and_retries(starting, db, monkeypatch):
+
+    main = starting
+    db["model_registry"].delete_many({"horizon": 3})
+
+    def sleep(seconds):
+        assert seconds == main.PRELOAD_RETRY_SECONDS
+        raise Stop
+
+    monkeypatch.setattr(main.time, "sleep", sleep)
+
+    with pytest.raises(Stop):
+        main.preload_loop()
+
+    response = TestClient(main.app).get("/health")
+
+    assert response.status_code == 503
+    assert response.json()["error"] == "No production model found"
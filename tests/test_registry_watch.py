@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from app.db.mongo import bump_registry_version
+from tests.conftest import fit_forest, store_model
+
+
+class Stop(Exception):
+    pass
+
+
+def test_sync_swaps_only_promoted_horizons(serving_api, db):
+
+    main = serving_api
+
+    assert main.sync_production_models() == [1, 2, 3]
+    assert main.sync_production_models() == []
+
+    df = pd.DataFrame(list(db["feature_store"].find()))
+    promoted = store_model(db, 2, fit_forest(df, 2, seed=99))
+    before = {h: main.models_cache[h] for h in (1, 3)}
+
+    assert main.sync_production_models() == [2]
+    assert main.models_cache[2][2] == promoted["_id"]
+    assert all(main.models_cache[h] is before[h] for h in (1, 3))
+
+
+def test_polling_syncs_when_the_version_moves(serving_api, monkeypatch):
+
+    main = serving_api
+    calls = []
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            bump_registry_version()
+        if len(sleeps) == 4:
+            raise Stop
+
+    monkeypatch.setattr(main, "on_registry_change", lambda: calls.append(1))
+    monkeypatch.setattr(main, "REGISTRY_RESYNC_SECONDS", 1e9)
+    monkeypatch.setattr(main.time, "sleep", sleep)
+
+    with pytest.raises(Stop):
+        main.poll_registry_version()
+
+    # First poll, then once after the bump
+    assert len(calls) == 2
+
+
+def test_watch_falls_back_to_polling(serving_api, monkeypatch):
+
+    main = serving_api
+    polled = []
+
+    def no_change_streams():
+        raise RuntimeError("change streams need a replica set")
+
+    monkeypatch.setattr(main, "watch_registry_changes", no_change_streams)
+    monkeypatch.setattr(main, "poll_registry_version", lambda: polled.append(1))
+
+    main.registry_watch_loop()
+
+    assert polled == [1]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.rolling_kernel import rolling_columns, rolling_stats, rolling_tail
+
+
+WINDOWS = [1, 3, 6, 24, 168]
+STATS = ["mean", "std", "min", "max", "ewm"]
+
+
+def pandas_stat(series, w, stat):
+    if stat == "ewm":
+        return series.ewm(span=w, adjust=True).mean()
+    return getattr(series.rolling(w), stat)()
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = 1000 + 50 * np.sin(np.arange(3000) / 24) + rng.normal(0, 5, 3000)
+    x[[10, 500, 501, 2400]] = np.nan
+    return x
+
+
+def test_rolling_stats_match_pandas(series):
+
+    out = rolling_stats(series, WINDOWS, STATS, dtype=np.float64)
+    s = pd.Series(series)
+
+    for col, (w, stat) in enumerate(rolling_columns(WINDOWS, STATS)):
+        np.testing.assert_allclose(
+            out[:, col], pandas_stat(s, w, stat),
+            atol=1e-6, rtol=0, err_msg=f"{stat}_{w}"
+        )
+
+
+def test_short_series_is_all_nan():
+
+    out = rolling_stats([1.0, 2.0], [6], ["mean", "std"])
+
+    assert np.isnan(out).all()
+
+
+def test_rolling_tail_matches_rolling_stats(series):
+
+    rng = np.random.default_rng(1)
+    paths = np.stack([series[-400:], series[-400:] + rng.normal(0, 1, 400)])
+    m = 24
+
+    tail = rolling_tail(paths, WINDOWS, STATS, m)
+
+    for index, row in enumerate(paths):
+        full = rolling_stats(row, WINDOWS, STATS, dtype=np.float64)
+        for col, key in enumerate(rolling_columns(WINDOWS, STATS)):
+            np.testing.assert_allclose(
+                tail[key][index], full[-m:, col],
+                atol=1e-6, rtol=0, err_msg=str(key)
+            )
+
+
+def test_rolling_tail_needs_enough_history():
+
+    with pytest.raises(ValueError):
+        rolling_tail(np.zeros((2, 10)), [8], ["mean"], 5)
+
+
+def test_rolling_feature_builder_keeps_float64(series):
+
+    from app.pipelines.feature_engineering_rolling import add_rolling_features
+
+    df = add_rolling_features(pd.DataFrame({"pm2_5": series}))
+
+    for w in (6, 12, 24, 48):
+        column = df[f"pm2_5_roll_mean_{w}"]
+        assert column.dtype == np.float64
+        np.testing.assert_allclose(column, pd.Series(series).rolling(w).mean(), atol=1e-9, rtol=0)
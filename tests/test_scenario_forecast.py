@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from app.pipelines import predict_multi_day as forecast
+from app.pipelines.feature_spec import LEGACY_FEATURE_SPEC, compile_spec
+from app.utils.tree_artifact import flatten_ensemble
+from tests.conftest import SERVING_FEATURES, make_history
+
+
+@pytest.fixture
+def history():
+    return pd.DataFrame(make_history(600))
+
+
+@pytest.fixture
+def step_model(history):
+    """H1 forest on the legacy features, as load_step_model() returns it."""
+
+    plan = compile_spec(LEGACY_FEATURE_SPEC)
+    df = plan.transform(history, targets=True).dropna()
+    model = RandomForestRegressor(n_estimators=8, random_state=0).fit(
+        df[SERVING_FEATURES].to_numpy(), df["target_h1"]
+    )
+
+    return {
+        "doc": {"horizon": 1},
+        "model": model,
+        "flat": flatten_ensemble(model),
+        "output": 0,
+        "features": SERVING_FEATURES,
+        "plan": plan,
+        "step": 24,
+    }
+
+
+def recursive_path(step_model, history, hours):
+    """One path, hour blocks fed back through plan.transform."""
+
+    plan = step_model["plan"]
+    df = history[["datetime", "pm2_5"]].copy()
+    out = []
+
+    while len(out) < hours:
+        features = plan.transform(df)[SERVING_FEATURES].tail(24).to_numpy()
+        block = np.maximum(step_model["model"].predict(features), 0.0)
+        times = df["datetime"].iloc[-1] + pd.to_timedelta(np.arange(1, 25), unit="h")
+        df = pd.concat([df, pd.DataFrame({"datetime": times, "pm2_5": block})], ignore_index=True)
+        out.extend(block)
+
+    return np.array(out[:hours])
+
+
+@pytest.mark.parametrize("mode", ["trees", "residual", "perturbed"])
+def test_scenario_zero_is_the_deterministic_path(step_model, history, mode):
+
+    times, values = forecast.simulate_paths(step_model, history, 72, n_scenarios=16, mode=mode, seed=0)
+
+    assert values.shape == (16, 72)
+    assert times[0] == history["datetime"].iloc[-1] + pd.Timedelta(hours=1)
+
+    np.testing.assert_allclose(values[0], recursive_path(step_model, history, 72), atol=1e-9)
+
+    # The other scenarios spread around it
+    assert values[1:].std(axis=0).mean() > 0
+
+
+def test_one_batched_predict_per_block(step_model, history, monkeypatch):
+
+    calls = []
+    original = forecast._predict
+
+    def counting(step_model, X, per_tree=False):
+        calls.append(len(X))
+        return original(step_model, X, per_tree)
+
+    monkeypatch.setattr(forecast, "_predict", counting)
+
+    forecast.simulate_paths(step_model, history, 72, n_scenarios=50, mode="trees", seed=0)
+
+    assert calls == [50 * 24] * 3
+
+
+def test_trees_without_a_flat_forest_fall_back_to_residuals(step_model):
+
+    assert forecast.scenario_mode({**step_model, "flat": None}, "trees") == "residual"
+
+    with pytest.raises(ValueError):
+        forecast.scenario_mode(step_model, "bogus")
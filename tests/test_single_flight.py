@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+def test_concurrent_loads_share_one_download(serving_api, db, monkeypatch):
+
+    main = serving_api
+    doc = db["model_registry"].find_one({"horizon": 1, "is_best": True})
+
+    loads = []
+
+    def slow_load(doc):
+        loads.append(doc["_id"])
+        time.sleep(0.3)
+        return object()
+
+    monkeypatch.setattr(main, "load_model", slow_load)
+    before = dict(main.load_metrics)
+
+    n = 8
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        results[i] = main.load_model_once(doc)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert main.load_metrics["model_loads"] - before["model_loads"] == 1
+    assert main.load_metrics["model_loads_deduplicated"] - before["model_loads_deduplicated"] == n - 1
+    assert main.inflight_loads == {}
+
+
+def test_failed_load_reaches_every_waiter_and_is_retried(serving_api, db, monkeypatch):
+
+    main = serving_api
+    doc = db["model_registry"].find_one({"horizon": 1, "is_best": True})
+
+    def broken(doc):
+        time.sleep(0.1)
+        raise OSError("GridFS unavailable")
+
+    monkeypatch.setattr(main, "load_model", broken)
+
+    errors = []
+
+    def worker():
+        try:
+            main.load_model_once(doc)
+        except OSError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["GridFS unavailable"] * 4
+
+    # Nothing poisoned: the next call loads again
+    monkeypatch.setattr(main, "load_model", lambda doc: "model")
+    assert main.load_model_once(doc) == "model"
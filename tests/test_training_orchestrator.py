@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db.mongo import get_registry_version
+from app.pipelines.training_orchestrator import plan_workers, run_training_grid, split_dataset
+
+
+FEATURES = ["f0", "f1", "f2"]
+
+
+def make_dataset(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(FEATURES)))
+
+    df = pd.DataFrame(X, columns=FEATURES)
+    df.insert(0, "datetime", pd.date_range("2025-01-01", periods=n, freq="h"))
+    for h in (1, 2, 3):
+        df[f"target_h{h}"] = X @ np.array([1.0, -1.0, h]) + rng.normal(0, 0.1, n)
+
+    return df
+
+
+@pytest.mark.parametrize("n_tasks, budget, expected", [
+    (10, 4, (4, 1)),
+    (2, 8, (2, 4)),
+    (3, 8, (3, 2)),
+    (5, 0, (1, 1)),
+])
+def test_plan_workers_splits_the_cpu_budget(n_tasks, budget, expected):
+
+    assert plan_workers(n_tasks, budget) == expected
+
+
+def test_split_is_time_ordered():
+
+    df = make_dataset(100)
+
+    X_train, X_val, targets_train, targets_val = split_dataset(df)
+
+    assert list(X_train.columns) == FEATURES
+    assert X_train.index.max() < X_val.index.min()
+    assert len(X_val) == len(targets_val) == 20
+
+
+def test_grid_registers_every_pair_and_promotes_one_per_horizon(db):
+
+    version = get_registry_version()
+
+    docs = run_training_grid(
+        horizons=[1, 2], families=["ridge", "random_forest"],
+        cpu_budget=2, df=make_dataset()
+    )
+
+    registry = db["model_registry"]
+
+    assert len(docs) == registry.count_documents({}) == 4
+    assert len({doc["run_id"] for doc in docs}) == 1
+    assert get_registry_version() != version
+
+    for horizon in (1, 2):
+        served = list(registry.find({"horizon": horizon, "is_best": True}))
+        best = min((d for d in docs if d["horizon"] == horizon), key=lambda d: d["rmse"])
+        assert [doc["_id"] for doc in served] == [best["_id"]]
+        assert served[0]["status"] == "production"
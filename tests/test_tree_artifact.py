@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from app.utils.tree_artifact import (
+    check_round_trip,
+    dumps_flat,
+    export_flat,
+    flatten_ensemble,
+    load_flat
+)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6)).astype(np.float32)
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(0, 0.1, size=300)
+    return X, y
+
+
+def reload(tmp_path, artifact):
+    path = tmp_path / "model.flat"
+    path.write_bytes(artifact)
+    return load_flat(path)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_random_forest_round_trip_is_exact(tmp_path, data, compress):
+
+    X, y = data
+    model = RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y)
+
+    flat = reload(tmp_path, export_flat(model, X, compress=compress))
+
+    assert flat.n_trees == 25
+    assert check_round_trip(model, flat, X) == 0.0
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+
+def test_per_tree_outputs_match_estimators(data):
+
+    X, y = data
+    model = RandomForestRegressor(n_estimators=10, random_state=1).fit(X, y)
+
+    per_tree = flatten_ensemble(model).predict_per_tree(X)
+    expected = np.stack([tree.predict(X) for tree in model.estimators_], axis=1)
+
+    assert per_tree.shape == (len(X), 10, 1)
+    np.testing.assert_array_equal(per_tree[:, :, 0], expected)
+
+
+def test_multi_output_forest(data):
+
+    X, y = data
+    Y = np.stack([y, 2 * y, -y], axis=1)
+    model = RandomForestRegressor(n_estimators=10, random_state=2).fit(X, Y)
+
+    flat = flatten_ensemble(model)
+
+    assert flat.predict(X).shape == (len(X), 3)
+    assert check_round_trip(model, flat, X) == 0.0
+
+
+def test_gradient_boosting_round_trip(tmp_path, data):
+
+    X, y = data
+    model = GradientBoostingRegressor(n_estimators=30, random_state=0).fit(X, y)
+
+    flat = reload(tmp_path, dumps_flat(flatten_ensemble(model)))
+
+    np.testing.assert_allclose(flat.predict(X), model.predict(X), atol=1e-9)
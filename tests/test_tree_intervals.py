@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.utils.tree_artifact import flatten_ensemble
+from app.utils.tree_intervals import (
+    conformal_quantile,
+    conformal_scores,
+    per_tree_predictions,
+    prediction_interval,
+    tree_quantiles
+)
+
+
+def heteroscedastic(n, seed):
+    """Noise grows with the first feature."""
+
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 1, size=(n, 3)).astype(np.float32)
+    y = 10 * X[:, 1] + rng.normal(0, 0.2 + 2 * X[:, 0])
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = heteroscedastic(2000, 0)
+    return RandomForestRegressor(n_estimators=50, min_samples_leaf=10, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize("flat", [False, True])
+def test_per_tree_predictions_match_estimators(forest, flat):
+
+    X, _ = heteroscedastic(100, 1)
+    expected = np.stack([tree.predict(X) for tree in forest.estimators_], axis=1)
+
+    per_tree = per_tree_predictions(forest, X, flat=flatten_ensemble(forest) if flat else None)
+
+    np.testing.assert_array_equal(per_tree, expected)
+    np.testing.assert_allclose(
+        tree_quantiles(per_tree, [0.1, 0.9]),
+        np.quantile(expected, [0.1, 0.9], axis=1)
+    )
+
+
+def test_multi_output_forest_picks_its_output():
+
+    X, y = heteroscedastic(300, 2)
+    model = ExtraTreesRegressor(n_estimators=10, random_state=0).fit(X, np.stack([y, -y], axis=1))
+
+    per_tree = per_tree_predictions(model, X, output_index=1)
+
+    expected = np.stack([tree.predict(X)[:, 1] for tree in model.estimators_], axis=1)
+    np.testing.assert_array_equal(per_tree, expected)
+
+
+def test_non_forest_has_no_per_tree_predictions():
+
+    X, y = heteroscedastic(50, 3)
+
+    with pytest.raises(RuntimeError):
+        per_tree_predictions(Ridge().fit(X, y), X)
+
+
+def test_conformal_quantile_covers_new_scores():
+
+    rng = np.random.default_rng(4)
+
+    for coverage in (0.5, 0.8, 0.95):
+        q = conformal_quantile(rng.exponential(size=500), coverage)
+        hits = np.mean(rng.exponential(size=50000) <= q)
+        assert coverage - 0.02 <= hits <= coverage + 0.04
+
+
+def test_too_few_scores_fall_back_to_tree_quantiles(forest):
+
+    X, _ = heteroscedastic(20, 5)
+    per_tree = per_tree_predictions(forest, X)
+
+    assert conformal_quantile(np.ones(5), 0.8) is None
+
+    mean, lower, upper, calibrated = prediction_interval(per_tree, 0.8, scores=np.ones(5))
+
+    assert not calibrated
+    np.testing.assert_allclose(lower, np.quantile(per_tree, 0.1, axis=1))
+    np.testing.assert_allclose(upper, np.quantile(per_tree, 0.9, axis=1))
+
+    with pytest.raises(ValueError):
+        prediction_interval(per_tree, 1.5)
+
+
+def test_calibrated_intervals_reach_their_coverage(forest):
+
+    X_cal, y_cal = heteroscedastic(1500, 6)
+    X_test, y_test = heteroscedastic(4000, 7)
+
+    scores = conformal_scores(per_tree_predictions(forest, X_cal), y_cal)
+    per_tree = per_tree_predictions(forest, X_test)
+
+    for coverage in (0.8, 0.9):
+        _, lower, upper, calibrated = prediction_interval(per_tree, coverage, scores)
+        hits = np.mean((y_test >= lower) & (y_test <= upper))
+
+        assert calibrated
+        assert coverage - 0.03 <= hits <= coverage + 0.03